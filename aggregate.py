@@ -0,0 +1,135 @@
+"""Summarize close approaches by group: by period of time, by NEO or by hazard flag.
+
+`NEODatabase.aggregate` finds the rows matching a `Filter` as `query` does, but
+never builds their `CloseApproach` objects: it reads their time, distance,
+velocity and NEO from the columns of the database (or from the approaches
+already built, without columns), and hands them to `summarize`.
+
+`summarize` buckets the rows by group in one pass, then computes the count,
+the approaches of hazardous NEOs, and the minimum, maximum and mean distance
+and velocity of each group with the built-in `min`, `max` and `sum` over the
+values of its rows. Time periods are found by first grouping by day, so only
+one date is computed per distinct day, not per row.
+
+The main module prints the groups as a table, or writes them with
+`write_groups_to_csv` or `write_groups_to_json`.
+"""
+import collections
+import csv
+import datetime
+import json
+
+from filters import MINUTES_PER_DAY
+
+# The ways to group approaches.
+GROUP_BY = ("year", "month", "day", "decade", "neo", "hazardous")
+
+# The summary of a group of approaches. The key is the period of time (such as
+# "2020-03" by month), the designation of the NEO, or its hazard flag; it is
+# `None` for the single group of ungrouped approaches, for approaches without
+# an NEO when grouping by hazard flag, and for approaches whose NEO is unknown.
+Group = collections.namedtuple("Group", ["key", "count", "hazardous",
+                                         "distance_min", "distance_max", "distance_mean",
+                                         "velocity_min", "velocity_max", "velocity_mean"])
+
+_EPOCH_DATE = datetime.date(1970, 1, 1)
+
+_PERIOD_LABELS = {
+    "year": lambda d: f"{d.year:04d}",
+    "month": lambda d: f"{d.year:04d}-{d.month:02d}",
+    "day": lambda d: d.isoformat(),
+    "decade": lambda d: f"{d.year // 10 * 10:04d}s",
+}
+
+def summarize(group_by, minutes, distances, velocities, neos, hazardous, neo_label=None) -> list[Group]:
+    """Summarize matching approaches, given as parallel lists of their attributes, by group.
+
+    :param group_by: One of `GROUP_BY`, or `None` for a single group of every approach.
+    :param minutes: The time of each approach, in minutes since the epoch.
+    :param distances: The distance of each approach, in au.
+    :param velocities: The velocity of each approach, in km/s.
+    :param neos: A key of the NEO of each approach, used when grouping by NEO.
+    :param hazardous: Whether the NEO of each approach is hazardous, or `None` if it is unknown.
+    :param neo_label: A function giving the designation of a key of `neos`, or `None` to use the keys.
+    :return: A list of `Group`s, sorted by key, the `None` key last.
+    """
+    if group_by == None:
+        buckets = {None: range(len(minutes))} if len(minutes) else {}
+    elif group_by == "neo":
+        buckets = _bucket(neos)
+        if neo_label != None:
+            buckets = _merge_buckets(buckets, neo_label)
+        #endif
+    elif group_by == "hazardous":
+        buckets = _bucket(hazardous)
+    elif group_by in _PERIOD_LABELS:
+        label = _PERIOD_LABELS[group_by]
+        days = _bucket([m // MINUTES_PER_DAY for m in minutes])
+        buckets = _merge_buckets(days, lambda day: label(_EPOCH_DATE + datetime.timedelta(days=day)))
+    else:
+        raise ValueError(f"Can't group close approaches by {group_by!r}; choose one of {', '.join(GROUP_BY)}.")
+    #endif
+
+    groups = []
+    for key, rows in buckets.items():
+        group_distances = [distances[pos] for pos in rows]
+        group_velocities = [velocities[pos] for pos in rows]
+        count = len(rows)
+        groups.append(Group(key, count, sum(1 for pos in rows if hazardous[pos]),
+                            min(group_distances), max(group_distances), sum(group_distances) / count,
+                            min(group_velocities), max(group_velocities), sum(group_velocities) / count))
+    #endfor
+    groups.sort(key=lambda group: (group.key == None, group.key if group.key != None else 0))
+    return groups
+#enddef
+
+def write_groups_to_csv(groups, filename):
+    """Write `Group`s to a CSV file, one row per group.
+
+    :param groups: An iterable of `Group`s.
+    :param filename: A Path-like object pointing to where the data should be saved.
+    """
+    with open(filename, "w") as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(Group._fields)
+        for group in groups:
+            writer.writerow(("" if group.key == None else group.key,) + group[1:])
+        #endfor
+    #endwith
+#enddef
+
+def write_groups_to_json(groups, filename):
+    """Write `Group`s to a JSON file, as a list of one dictionary per group.
+
+    :param groups: An iterable of `Group`s.
+    :param filename: A Path-like object pointing to where the data should be saved.
+    """
+    with open(filename, "w") as json_file:
+        json.dump([group._asdict() for group in groups], json_file, indent=4)
+    #endwith
+#enddef
+
+# SUPPORT FUNCTION
+def _bucket(keys):
+    """Return the positions of each key in `keys`, by key."""
+    buckets = collections.defaultdict(list)
+    for pos, key in enumerate(keys):
+        buckets[key].append(pos)
+    #endfor
+    return buckets
+#enddef
+
+# SUPPORT FUNCTION
+def _merge_buckets(buckets, label):
+    """Regroup buckets of positions under the label of their key, computed once per key."""
+    merged = {}
+    for key, rows in buckets.items():
+        label_key = label(key)
+        if label_key in merged:
+            merged[label_key] += rows
+        else:
+            merged[label_key] = rows
+        #endif
+    #endfor
+    return merged
+#enddef
@@ -0,0 +1,8 @@
+"""Benchmarks of the load, link, query and write phases of the project.
+
+Run the suite and save its results, then compare two saved runs, from the
+project root:
+
+    $ python3 -m benchmarks.run --scales 10000 100000 --output before.json
+    $ python3 -m benchmarks.compare before.json after.json
+"""
@@ -0,0 +1,90 @@
+"""Compare two saved benchmark runs and flag the phases that regressed.
+
+A phase at a scale regresses if its throughput dropped, or its peak memory
+grew, by more than the threshold (10% by default) from the baseline run to the
+current one. The script prints a table of every phase found in both runs, and
+exits with status 1 if any of them regressed.
+
+    $ python3 -m benchmarks.compare baseline.json current.json --threshold 0.05
+"""
+import argparse
+import json
+import sys
+
+DEFAULT_THRESHOLD = 0.10
+
+def compare(baseline: dict, current: dict, threshold: float = DEFAULT_THRESHOLD) -> list[dict]:
+    """Compare the results of two runs, phase by phase.
+
+    :param baseline: The results of the earlier run, as saved by `benchmarks.run`.
+    :param current: The results of the later run.
+    :param threshold: The relative loss of throughput or gain of peak memory counted as a regression.
+    :return: A list with the scale, phase, throughputs, peak memories, their relative changes and
+             whether it `regressed`, for each phase at each scale found in both runs.
+    """
+    earlier = {(r["scale"], r["phase"]): r for r in baseline["results"]}
+    rows = []
+    for result in current["results"]:
+        old = earlier.get((result["scale"], result["phase"]))
+        if old == None:
+            continue
+        #endif
+
+        speed = _change(old["rows_per_second"], result["rows_per_second"])
+        memory = _change(old["peak_bytes"], result["peak_bytes"])
+        rows.append({
+            "scale": result["scale"],
+            "phase": result["phase"],
+            "old_rows_per_second": old["rows_per_second"],
+            "new_rows_per_second": result["rows_per_second"],
+            "speed_change": speed,
+            "old_peak_bytes": old["peak_bytes"],
+            "new_peak_bytes": result["peak_bytes"],
+            "memory_change": memory,
+            "regressed": (speed != None and speed < -threshold) or (memory != None and memory > threshold),
+        })
+    #endfor
+    return rows
+#enddef
+
+# SUPPORT FUNCTION
+def _change(old, new):
+    """Return the relative change from `old` to `new`, or `None` if either is unknown or `old` is zero."""
+    if old == None or new == None or old == 0:
+        return None
+    #endif
+    return (new - old) / old
+#enddef
+
+# SUPPORT FUNCTION
+def _percent(change):
+    return "      -" if change == None else f"{change:+7.1%}"
+#enddef
+
+def main(argv=None):
+    """Compare two runs from the command line, returning the exit status."""
+    parser = argparse.ArgumentParser(description="Flag benchmark regressions between two saved runs.")
+    parser.add_argument("baseline", help="The JSON results of the earlier run.")
+    parser.add_argument("current", help="The JSON results of the later run.")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="The relative loss of throughput or gain of peak memory counted as a regression.")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as baseline_file, open(args.current) as current_file:
+        rows = compare(json.load(baseline_file), json.load(current_file), args.threshold)
+    #endwith
+
+    print(f"{'scale':>10}  {'phase':<45} {'rows/s':>14} {'speed':>8} {'memory':>8}")
+    for row in rows:
+        print(f"{row['scale']:>10,}  {row['phase']:<45} {row['new_rows_per_second'] or 0:>14,.0f} "
+              f"{_percent(row['speed_change'])} {_percent(row['memory_change'])}"
+              + ("  REGRESSION" if row["regressed"] else ""))
+    #endfor
+
+    regressions = sum(row["regressed"] for row in rows)
+    print(f"{regressions} regression(s) beyond {args.threshold:.0%} in {len(rows)} comparison(s).")
+    return 1 if regressions else 0
+#enddef
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+"""Time each phase of the project at several dataset scales, and save the results as JSON.
+
+For each scale, a synthetic dataset of that many close approaches (and about
+one NEO per 17 of them) is written to a temporary directory by `synthetic`,
+always from the same seed. Then each phase runs on it:
+
+- `load_neos` and `load_approaches`, reading the data files;
+- `link`, building an `NEODatabase` from the loaded objects;
+- `query:<name>`, consuming every result of one of `QUERIES`;
+- `write_to_csv` and `write_to_json`, writing every close approach.
+
+Each phase is timed `--repeat` times and the best time is kept; its throughput
+is the number of rows it handles (NEOs, approaches, or results) per second.
+Unless `--no-memory` is given, each phase then runs once more under
+`tracemalloc` to measure its peak memory.
+
+    $ python3 -m benchmarks.run --scales 10000 100000 1000000 --output results.json
+"""
+import argparse
+import datetime
+import json
+import pathlib
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters
+from synthetic import DEFAULT_SEED, generate
+from write import write_to_csv, write_to_json
+
+DEFAULT_SCALES = (10000, 100000, 300000)
+DEFAULT_REPEAT = 3
+
+# Representative queries, after the examples of the main module.
+QUERIES = {
+    "all": {},
+    "date": {"date": datetime.date(2020, 3, 2)},
+    "month_max_distance": {"start_date": datetime.date(2020, 1, 1), "end_date": datetime.date(2020, 1, 31),
+                           "distance_max": 0.025},
+    "min_distance_min_velocity": {"distance_min": 0.2, "velocity_min": 20},
+    "date_velocity_diameter_hazardous": {"date": datetime.date(2020, 3, 14), "velocity_max": 25,
+                                         "diameter_min": 0.5, "hazardous": True},
+    "max_diameter_not_hazardous": {"start_date": datetime.date(2020, 6, 1), "diameter_max": 0.1,
+                                   "hazardous": False},
+    "hazardous_max_distance_min_velocity": {"hazardous": True, "distance_max": 0.05, "velocity_min": 30},
+}
+
+def measure(function, rows: int, repeat: int, memory: bool, setup=None) -> dict:
+    """Time a phase, and optionally measure its peak memory.
+
+    :param function: The phase, as a function of the values returned by `setup`.
+    :param rows: The number of rows the phase handles, for its throughput.
+    :param repeat: The number of timed runs, of which the fastest counts.
+    :param memory: Whether to run the phase once more under `tracemalloc`.
+    :param setup: A function returning a tuple of fresh arguments for each run, untimed, or `None`.
+    :return: A dictionary of the rows, seconds, rows per second and peak bytes (or `None`) of the phase.
+    """
+    best = float("inf")
+    for _ in range(max(repeat, 1)):
+        args = setup() if setup != None else ()
+        start = time.perf_counter()
+        function(*args)
+        best = min(best, time.perf_counter() - start)
+    #endfor
+
+    peak = None
+    if memory:
+        args = setup() if setup != None else ()
+        tracemalloc.start()
+        try:
+            function(*args)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        #endtry
+    #endif
+    return {"rows": rows, "seconds": best, "rows_per_second": rows / best if best > 0 else None, "peak_bytes": peak}
+#enddef
+
+def run_scale(neo_path, cad_path, repeat: int, memory: bool, output_dir):
+    """Benchmark every phase on one dataset.
+
+    :param neo_path: The CSV file of NEOs.
+    :param cad_path: The JSON file of close approaches.
+    :param repeat: The number of timed runs of each phase.
+    :param memory: Whether to measure the peak memory of each phase.
+    :param output_dir: A directory for the files written by the write phases.
+    :yield: A `(phase, measurement)` pair per phase.
+    """
+    neos = load_neos(neo_path)
+    approaches = load_approaches(cad_path)
+    yield "load_neos", measure(lambda: load_neos(neo_path), len(neos), repeat, memory)
+    yield "load_approaches", measure(lambda: load_approaches(cad_path), len(approaches), repeat, memory)
+
+    # Linking changes the objects, so every run links freshly loaded ones
+    yield "link", measure(NEODatabase, len(approaches), repeat, memory,
+                          setup=lambda: (load_neos(neo_path), load_approaches(cad_path)))
+
+    database = NEODatabase(neos, approaches)
+    for name, criteria in QUERIES.items():
+        matches = sum(1 for _ in database.query(create_filters(**criteria)))
+        result = measure(lambda: sum(1 for _ in database.query(create_filters(**criteria))), len(approaches),
+                         repeat, memory)
+        result["matches"] = matches
+        yield f"query:{name}", result
+    #endfor
+
+    csv_path, json_path = pathlib.Path(output_dir) / "out.csv", pathlib.Path(output_dir) / "out.json"
+    yield "write_to_csv", measure(lambda: write_to_csv(database.query(), csv_path), len(approaches), repeat, memory)
+    yield "write_to_json", measure(lambda: write_to_json(database.query(), json_path), len(approaches), repeat, memory)
+#enddef
+
+def run(scales=DEFAULT_SCALES, repeat: int = DEFAULT_REPEAT, memory: bool = True, report=None,
+        seed: int = DEFAULT_SEED) -> dict:
+    """Benchmark every phase at every scale.
+
+    :param scales: The numbers of close approaches of the datasets to benchmark.
+    :param repeat: The number of timed runs of each phase.
+    :param memory: Whether to measure the peak memory of each phase.
+    :param report: A function called with each result as it is measured, or `None`.
+    :param seed: The seed of the synthetic datasets.
+    :return: A dictionary of the `meta` data of the run and its list of `results`.
+    """
+    results = []
+    for scale in scales:
+        with tempfile.TemporaryDirectory() as tmp:
+            neo_path, cad_path = generate(tmp, approaches=scale, seed=seed)
+            for phase, measurement in run_scale(neo_path, cad_path, repeat, memory, tmp):
+                result = {"scale": scale, "phase": phase, **measurement}
+                results.append(result)
+                if report != None:
+                    report(result)
+                #endif
+            #endfor
+        #endwith
+    #endfor
+
+    meta = {
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "seed": seed,
+    }
+    return {"meta": meta, "results": results}
+#enddef
+
+# SUPPORT FUNCTION
+def _print_result(result):
+    peak = f"{result['peak_bytes'] / 2**20:9.1f} MiB" if result["peak_bytes"] != None else "        -    "
+    print(f"{result['scale']:>10,}  {result['phase']:<45} {result['rows']:>10} rows  "
+          f"{result['seconds']:9.4f} s  {result['rows_per_second'] or 0:>12,.0f} rows/s  {peak}", file=sys.stderr)
+#enddef
+
+def main(argv=None):
+    """Run the benchmark suite from the command line."""
+    parser = argparse.ArgumentParser(description="Benchmark the load, link, query and write phases.")
+    parser.add_argument("--scales", type=int, nargs="+", default=list(DEFAULT_SCALES),
+                        help="The numbers of close approaches of the datasets to benchmark.")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED,
+                        help="The seed of the synthetic datasets; compared runs should use the same one.")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT,
+                        help="The number of timed runs of each phase; the fastest counts.")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="Skip measuring the peak memory of each phase.")
+    parser.add_argument("-o", "--output", type=pathlib.Path,
+                        help="The JSON file in which to save the results.")
+    args = parser.parse_args(argv)
+
+    results = run(args.scales, args.repeat, not args.no_memory, report=_print_result, seed=args.seed)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=4)
+        #endwith
+    #endif
+    return results
+#enddef
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""Keep the filterable attributes of close approaches in parallel columns, to find matching rows by index.
+
+An `ApproachColumns` keeps one typed array per attribute that a filter can
+inspect: the time (as whole minutes since the epoch), distance, velocity and
+NEO index of every close approach, and the diameter and hazard flag of every
+NEO. Row `i` of the approach columns describes the `i`-th close approach of the
+`NEODatabase`, and its NEO index points into the NEO columns (or is -1 if the
+approach has no known NEO).
+
+The `select` method finds the rows matching a `Filter` one attribute at a time,
+narrowing a list of row indexes by looping over the typed arrays instead of
+calling the filter's predicate on each `CloseApproach`. This is a row-index
+cache rather than a vectorized backend: every row is still tested in Python,
+just without the attribute lookups of the objects. Built with `from_objects`,
+the columns are kept alongside the objects, and add to the memory they take;
+only an index directory (see `store`) builds objects just for the rows a query
+returns.
+
+Rows and NEOs can be appended later. Columns mapped read-only from an index
+directory are copied into arrays on the first change.
+"""
+import array
+
+from filters import Filter, FilterType
+
+class ApproachColumns:
+    """Parallel typed arrays holding the filterable attributes of a data set."""
+
+    def __init__(self, time, distance, velocity, neo, diameter, hazardous):
+        """Create a new `ApproachColumns` from already built columns.
+
+        :param time: Approach times in minutes since the epoch (`array('q')`).
+        :param distance: Approach distances in au (`array('d')`).
+        :param velocity: Approach velocities in km/s (`array('d')`).
+        :param neo: The index of each approach's NEO, or -1 (`array('q')`).
+        :param diameter: NEO diameters in km, NaN if unknown (`array('d')`).
+        :param hazardous: NEO hazard flags, one byte per NEO (`bytearray`).
+        """
+        self.time = time
+        self.distance = distance
+        self.velocity = velocity
+        self.neo = neo
+        self.diameter = diameter
+        self.hazardous = hazardous
+
+        self._approach_columns = {FilterType.DATE: time, FilterType.DISTANCE: distance, FilterType.VELOCITY: velocity}
+        self._mask_key = self._mask = None
+    #enddef
+
+    @classmethod
+    def from_objects(cls, neos, approaches):
+        """Build the columns of already linked NEOs and close approaches.
+
+        :param neos: A list of `NearEarthObject`s.
+        :param approaches: A list of `CloseApproach`es, linked to `neos`.
+        :return: A new `ApproachColumns`.
+        """
+        neo_inx = {id(neo): inx for inx, neo in enumerate(neos)}
+
+        return cls(
+            array.array("q", (ca._minutes for ca in approaches)),
+            array.array("d", (ca.distance for ca in approaches)),
+            array.array("d", (ca.velocity for ca in approaches)),
+            array.array("q", (neo_inx.get(id(ca.neo), -1) for ca in approaches)),
+            array.array("d", (neo.diameter for neo in neos)),
+            bytearray(bool(neo.hazardous) for neo in neos),
+        )
+    #enddef
+
+    def __len__(self):
+        return len(self.time)
+    #enddef
+
+    def append_neos(self, neos):
+        """Append the diameter and hazard flag of new NEOs to the NEO columns."""
+        self._own()
+        self.diameter.extend(neo.diameter for neo in neos)
+        self.hazardous.extend(bool(neo.hazardous) for neo in neos)
+        self._mask_key = self._mask = None
+    #enddef
+
+    def append_rows(self, approaches, neo_indexes):
+        """Append rows for new close approaches.
+
+        :param approaches: The new `CloseApproach`es.
+        :param neo_indexes: The index of the NEO of each approach, or -1.
+        """
+        self._own()
+        self.time.extend(ca._minutes for ca in approaches)
+        self.distance.extend(ca.distance for ca in approaches)
+        self.velocity.extend(ca.velocity for ca in approaches)
+        self.neo.extend(neo_indexes)
+    #enddef
+
+    def link(self, rows, neo_inx: int):
+        """Point existing rows at the NEO of index `neo_inx`."""
+        self._own()
+        for row in rows:
+            self.neo[row] = neo_inx
+        #endfor
+    #enddef
+
+    def _own(self):
+        """Copy read-only columns, such as `memoryview`s of a mapped file, into arrays that can grow."""
+        if not isinstance(self.time, memoryview):
+            return
+        #endif
+        for attribute in ("time", "distance", "velocity", "neo", "diameter"):
+            column = getattr(self, attribute)
+            copy = array.array(column.format)
+            copy.frombytes(column.cast("B"))
+            setattr(self, attribute, copy)
+        #endfor
+        self.hazardous = bytearray(self.hazardous)
+        self._approach_columns = {FilterType.DATE: self.time, FilterType.DISTANCE: self.distance,
+                                  FilterType.VELOCITY: self.velocity}
+    #enddef
+
+    def select(self, filters: Filter, rows: list[int] = None, counts=None) -> list[int]:
+        """Return the indexes of the rows that satisfy every criterion of `filters`.
+
+        :param filters: The `Filter` to evaluate.
+        :param rows: Candidate row indexes, in any order, or `None` for every row.
+        :param counts: A `collections.Counter` to which to add the rows each criterion is evaluated on, or `None`.
+        :return: The matching row indexes, in the order of `rows`.
+        """
+        if filters.contradictory:
+            return []
+        #endif
+
+        # Narrow by the approach columns, most selective first
+        for filter_type in filters.filter_types:
+            column = self._approach_columns.get(filter_type)
+            if column != None:
+                if counts != None:
+                    counts[filter_type.name.lower()] += len(self) if rows == None else len(rows)
+                #endif
+                rows = _narrow(column, rows, *filters.bounds(filter_type))
+                if not rows:
+                    return []
+                #endif
+            #endif
+        #endfor
+
+        low, high = filters.bounds(FilterType.DIAMETER)
+        wanted = filters.bounds(FilterType.HAZARDOUS)[0]
+        if low == None and high == None and wanted == None:
+            return list(range(len(self))) if rows == None else rows
+        #endif
+
+        if counts != None:
+            # The NEO criteria are tested together, through one mask lookup per row
+            for filter_type in filters.filter_types:
+                if filter_type not in self._approach_columns:
+                    counts[filter_type.name.lower()] += len(self) if rows == None else len(rows)
+                #endif
+            #endfor
+        #endif
+        neo_ok = self._neo_mask(low, high, wanted)
+        neo = self.neo
+        if rows == None:
+            return [i for i, n in enumerate(neo) if neo_ok[n]]
+        #endif
+        return [i for i in rows if neo_ok[neo[i]]]
+    #enddef
+
+    def _neo_mask(self, low, high, wanted) -> bytearray:
+        """Return one byte per NEO telling whether it passes the diameter and hazard criteria.
+
+        The extra trailing entry rejects approaches with NEO index -1. The last
+        mask is kept, since a query split into row ranges asks for it once per range.
+        """
+        key = (low, high, wanted)
+        if self._mask_key != key:
+            self._mask = bytearray(
+                (low == None or low <= d) and (high == None or d <= high) and (wanted == None or bool(h) == wanted)
+                for d, h in zip(self.diameter, self.hazardous)
+            )
+            self._mask.append(0)
+            self._mask_key = key
+        #endif
+        return self._mask
+    #enddef
+#endclass
+
+# SUPPORT FUNCTION
+def _narrow(column, rows, low, high):
+    """Keep the rows whose value in `column` lies within `[low, high]`."""
+    if rows == None:
+        if low == None:
+            return [i for i, x in enumerate(column) if x <= high]
+        elif high == None:
+            return [i for i, x in enumerate(column) if x >= low]
+        #endif
+        return [i for i, x in enumerate(column) if low <= x <= high]
+    #endif
+
+    if low == None:
+        return [i for i in rows if column[i] <= high]
+    elif high == None:
+        return [i for i in rows if column[i] >= low]
+    #endif
+    return [i for i in rows if low <= column[i] <= high]
+#enddef
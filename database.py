@@ -7,13 +7,30 @@ user-specified criteria.
 
 Under normal circumstances, the main module creates one NEODatabase from the
 data on NEOs and close approaches extracted by `extract.load_neos` and
-`extract.load_approaches`.
+`extract.load_approaches`. New NEOs and close approaches, such as a daily delta
+of the data, can then be appended with `add_neos` and `add_approaches`.
 
 You'll edit this file in Tasks 2 and 3.
 """
 
+import array
+import bisect
+import itertools
+import math
+import operator
+import time
+
 from models import NearEarthObject, CloseApproach
-from filters import Filter
+from filters import Filter, MINUTES_PER_DAY
+from helpers import date_to_minutes
+from columns import ApproachColumns
+from planner import QueryPlanner, approach_keys, column_keys
+from parallel import ParallelScanner
+from store import open_index
+from names import NameIndex, DEFAULT_LIMIT
+from resultcache import ResultCache
+from querystats import QueryRecord, QueryStats
+from aggregate import summarize
 
 # INFO
 """ For those who reading/grading this, I come from C and this syntax of tabs is really bothering me so I'mma just add the tailing end for everything =)))) """
@@ -30,7 +47,8 @@ class NEODatabase:
     """
 
     # TASK - DONE
-    def __init__(self, neos: list[NearEarthObject], approaches: list[CloseApproach]):
+    def __init__(self, neos: list[NearEarthObject], approaches: list[CloseApproach], columnar: bool = False,
+                 workers: int = 1):
         """Create a new `NEODatabase`.
 
         As a precondition, this constructor assumes that the collections of NEOs
@@ -43,10 +61,14 @@ class NEODatabase:
         constructor modifies the supplied NEOs and close approaches to link them
         together - after it's done, the `.approaches` attribute of each NEO has
         a collection of that NEO's close approaches, and the `.neo` attribute of
-        each close approach references the appropriate NEO.
+        each close approach references the appropriate NEO. Each NEO's
+        approaches are sorted by time.
 
         :param neos: A collection (a list) of `NearEarthObject`s.
         :param approaches: A collection (a list) of `CloseApproach`es.
+        :param columnar: Whether to also keep the attributes of the approaches as `ApproachColumns`, a row-index
+                         cache on which queries find their rows, alongside the approaches themselves.
+        :param workers: The number of worker processes sharing full scans, or 1 to scan in this process.
         """
 
         self._neos = neos
@@ -68,13 +90,415 @@ class NEODatabase:
             inx += 1
         #endfor
 
-        for ca in self._approaches:
-            temp_neo = self.get_neo_by_designation(ca._designation)
-            if temp_neo != None:
+        # Link each approach to its NEO
+        # The rows of the approaches without an NEO, by designation, for `add_neos` to link
+        self._orphan_rows = {}
+        for row, ca in enumerate(self._approaches):
+            index_value = self._dict_des_inx.get(ca._designation, -1)
+            if index_value >= 0:
+                temp_neo = self._neos[index_value]
                 ca.neo = temp_neo
                 temp_neo.approaches.append(ca)
+            else:
+                self._orphan_rows.setdefault(ca._designation, []).append(row)
+            #endif
+        #endfor
+
+        # Keep each NEO's approaches in time order, for windowed lookups (stable, and
+        # close to linear since the data files are mostly in time order already)
+        by_time = operator.attrgetter("_minutes")
+        for neo in self._neos:
+            if len(neo.approaches) > 1:
+                neo.approaches.sort(key=by_time)
+            #endif
+        #endfor
+
+        # Optional copy of the filterable attributes in typed columns, to find matching rows by index
+        self._columns = ApproachColumns.from_objects(self._neos, self._approaches) if columnar else None
+
+        # Sorted indexes and column statistics, to pick an access path per query, built on first use
+        keys = column_keys(self._columns) if self._columns != None else approach_keys(self._approaches)
+        self._planner = QueryPlanner(keys, len(self._approaches))
+
+        # Built on the first search, from the designations and names of the NEOs
+        self._name_index = None
+        self._name_strings = None
+
+        # Row indexes of recent queries, if caching is turned on with `set_cache`
+        self._cache = None
+
+        # Counters of the work done by each query, if turned on with `set_stats`
+        self._stats = None
+
+        # Worker processes splitting full scans between them, over a shared copy of the columns
+        self._scanner = None
+        if workers > 1:
+            columns = self._columns or ApproachColumns.from_objects(self._neos, self._approaches)
+            self._scanner = ParallelScanner(columns, workers)
+        #endif
+    #enddef
+
+    @classmethod
+    def from_index(cls, index_dir, workers: int = 1):
+        """Open a database on an index directory written by `store.build_index`.
+
+        Nothing is parsed or linked up front: the columns, lookup tables and
+        query indexes are memory-mapped, queries always run on the columns, and
+        NEOs and close approaches are built (already linked) when first returned.
+
+        :param index_dir: The index directory.
+        :param workers: The number of worker processes sharing full scans, or 1 to scan in this process.
+        :return: A new `NEODatabase`.
+        """
+        dataset = open_index(index_dir)
+
+        database = cls.__new__(cls)
+        database._neos = dataset.neos
+        database._approaches = dataset.approaches
+        database._dict_des_inx = dataset.designation_lookup
+        database._dict_name_inx = dataset.name_lookup
+        database._columns = dataset.columns
+        database._planner = dataset.planner
+        database._name_index = None
+        database._name_strings = (dataset.designations, dataset.names)
+        rows, designations = dataset._orphans
+        database._orphan_rows = {}
+        for row, designation in zip(rows, designations):
+            database._orphan_rows.setdefault(designation, []).append(row)
+        #endfor
+        database._cache = None
+        database._stats = None
+        database._scanner = ParallelScanner(dataset.columns, workers) if workers > 1 else None
+        return database
+    #enddef
+
+    def set_cache(self, cache: ResultCache):
+        """Cache the rows matching each query in `cache`, or stop caching if it is `None`."""
+        self._cache = cache
+    #enddef
+
+    @property
+    def cache(self) -> ResultCache:
+        """Return the `ResultCache` of this database, or `None`."""
+        return self._cache
+    #enddef
+
+    def set_stats(self, stats: QueryStats):
+        """Record the work done by each query in `stats`, or stop recording if it is `None`."""
+        self._stats = stats
+    #enddef
+
+    @property
+    def stats(self) -> QueryStats:
+        """Return the `QueryStats` of this database, or `None`."""
+        return self._stats
+    #enddef
+
+    def add_neos(self, neos: list[NearEarthObject]):
+        """Append new NEOs to this database.
+
+        Each NEO is added to the designation and name lookups, and linked to
+        the approaches already in the database with its designation, if any.
+        This takes time in proportion to the NEOs added and the approaches they
+        link, not to the size of the database; the name search index is rebuilt
+        on the next `search_neos`.
+
+        :param neos: New, unlinked `NearEarthObject`s.
+        :raise ValueError: If an NEO has the designation of another, in this database or in `neos`.
+        """
+        designations = set()
+        for neo in neos:
+            if neo.designation in designations or self._dict_des_inx.get(neo.designation, -1) >= 0:
+                raise ValueError(f"An NEO designated {neo.designation!r} is already in the database.")
+            #endif
+            designations.add(neo.designation)
+        #endfor
+        self._make_growable()
+
+        start = len(self._neos)
+        self._neos.extend(neos)
+        if self._columns != None:
+            self._columns.append_neos(neos)
+        #endif
+
+        relinked = False
+        by_time = operator.attrgetter("_minutes")
+        for inx, neo in enumerate(neos, start):
+            self._dict_des_inx[neo.designation] = inx
+            if neo.name != None:
+                self._dict_name_inx[neo.name] = inx
+            #endif
+
+            rows = self._orphan_rows.pop(neo.designation, None)
+            if rows == None:
+                continue
+            #endif
+            for row in rows:
+                ca = self._approaches[row]
+                ca.neo = neo
+                neo.approaches.append(ca)
+            #endfor
+            neo.approaches.sort(key=by_time)
+            if self._columns != None:
+                self._columns.link(rows, inx)
+            #endif
+            self._planner.link_rows(rows, neo)
+            relinked = relinked or (self._scanner != None and rows[0] < self._scanner.row_count)
+        #endfor
+
+        if relinked:
+            # The workers hold a copy of the NEO of each row
+            self._restart_scanner()
+        #endif
+        self._changed()
+    #enddef
+
+    def add_approaches(self, approaches: list[CloseApproach]):
+        """Append new close approaches to this database.
+
+        Each approach is linked to the NEO with its designation, in time order
+        among the NEO's approaches, and added to the query indexes and columns.
+        An approach without an NEO yet is linked by a later `add_neos`. This
+        takes time in proportion to the approaches added, not to the size of
+        the database, except that the workers of parallel scans are restarted
+        on all the rows once the appended ones outnumber those they hold.
+
+        :param approaches: New, unlinked `CloseApproach`es.
+        """
+        self._make_growable()
+        start = len(self._approaches)
+        linked_neos = []
+        neo_indexes = array.array("q")
+        for row, ca in enumerate(approaches, start):
+            inx = self._dict_des_inx.get(ca._designation, -1)
+            neo = self._neos[inx] if inx >= 0 else None
+            if neo != None:
+                ca.neo = neo
+                neo.approaches.insert(bisect.bisect_right(_ApproachTimes(neo.approaches), ca._minutes), ca)
+            else:
+                self._orphan_rows.setdefault(ca._designation, []).append(row)
             #endif
+            linked_neos.append(neo)
+            neo_indexes.append(inx)
         #endfor
+
+        self._approaches.extend(approaches)
+        if self._columns != None:
+            self._columns.append_rows(approaches, neo_indexes)
+        #endif
+        self._planner.add_rows(start, approaches, linked_neos)
+        if self._scanner != None and len(self._approaches) > 2 * self._scanner.row_count:
+            # Appended rows are scanned in this process, so hand them to the workers once they are the most
+            self._restart_scanner()
+        #endif
+        self._changed()
+    #enddef
+
+    def reindex(self):
+        """Drop the query indexes and statistics, to build them again from every row on first use.
+
+        Appending keeps them up to date, but after appending most of the rows,
+        such as while loading in batches, one build from every row leaves each
+        index as a single sorted run instead of many merged appends.
+        """
+        keys = column_keys(self._columns) if self._columns != None else approach_keys(self._approaches)
+        self._planner = QueryPlanner(keys, len(self._approaches))
+    #enddef
+
+    def _make_growable(self):
+        """Let the lookups of a database opened on an index directory take new entries."""
+        if not isinstance(self._dict_des_inx, dict) and not isinstance(self._dict_des_inx, _LookupOverlay):
+            self._dict_des_inx = _LookupOverlay(self._dict_des_inx)
+            self._dict_name_inx = _LookupOverlay(self._dict_name_inx)
+        #endif
+    #enddef
+
+    def _changed(self):
+        """Drop what depends on the full set of NEOs and approaches, after adding to them."""
+        self._name_index = None
+        if self._cache != None:
+            self._cache.clear()
+        #endif
+    #enddef
+
+    def _restart_scanner(self, columns=None):
+        """Restart the workers of parallel scans on the current columns, or on `columns`."""
+        workers = self._scanner.workers
+        self._scanner.close()
+        if columns == None:
+            columns = self._columns
+        #endif
+        if columns == None:
+            columns = ApproachColumns.from_objects(self._neos, self._approaches)
+        #endif
+        self._scanner = ParallelScanner(columns, workers)
+    #enddef
+
+    def diff(self, neos: list[NearEarthObject] = None, approaches: list[CloseApproach] = None) -> "DataChanges":
+        """Compare the data of this database with newly loaded data, and prepare the update to it.
+
+        Unchanged NEOs and approaches are matched with the objects of this
+        database, which the update keeps. Everything the update needs - the new
+        lookup tables, columns and time-sorted approaches of each affected NEO -
+        is built here, without changing this database, so this can run in a
+        background thread while the database is still queried; `apply` then
+        only swaps the new state in, and the query indexes are built again on
+        first use. When the new data only adds NEOs and
+        approaches, nothing is built here, and `apply` appends them instead.
+
+        :param neos: The newly loaded, unlinked `NearEarthObject`s, or `None` if they haven't changed.
+        :param approaches: The newly loaded, unlinked `CloseApproach`es, or `None` if they haven't changed.
+        :return: The `DataChanges` to pass to `apply`.
+        """
+        changes = DataChanges()
+
+        # Keep the NEO objects whose attributes haven't changed
+        if neos == None:
+            new_neos = list(self._neos)
+        else:
+            old_neos = {neo.designation: neo for neo in self._neos}
+            new_neos = []
+            for neo in neos:
+                old = old_neos.pop(neo.designation, None)
+                if old != None and _same_neo(old, neo):
+                    new_neos.append(old)
+                else:
+                    (changes.added_neos if old == None else changes.changed_neos).append(neo)
+                    new_neos.append(neo)
+                #endif
+            #endfor
+            changes.removed_neos = list(old_neos.values())
+        #endif
+
+        # Keep the approach objects found again, with the same NEO, time, distance and velocity
+        if approaches == None:
+            new_approaches = list(self._approaches)
+        else:
+            old_rows = {}
+            for ca in self._approaches:
+                old_rows.setdefault(_approach_key(ca), []).append(ca)
+            #endfor
+            new_approaches = []
+            for ca in approaches:
+                same = old_rows.get(_approach_key(ca))
+                if same:
+                    new_approaches.append(same.pop())
+                else:
+                    changes.added_approaches.append(ca)
+                    new_approaches.append(ca)
+                #endif
+            #endfor
+            changes.removed_approaches = [ca for rest in old_rows.values() for ca in rest]
+        #endif
+        if not (changes.changed_neos or changes.removed_neos or changes.removed_approaches):
+            return changes
+        #endif
+
+        # The lookup tables of the new rows, built aside
+        dict_des_inx, dict_name_inx = {}, {}
+        for inx, neo in enumerate(new_neos):
+            dict_des_inx[neo.designation] = inx
+            if neo.name != None:
+                dict_name_inx[neo.name] = inx
+            #endif
+        #endfor
+        neo_of_row = array.array("q", (dict_des_inx.get(ca._designation, -1) for ca in new_approaches))
+        orphan_rows = {}
+        for row, inx in enumerate(neo_of_row):
+            if inx < 0:
+                orphan_rows.setdefault(new_approaches[row]._designation, []).append(row)
+            #endif
+        #endfor
+
+        # Only the NEOs with new, changed or removed objects or approaches are relinked
+        affected = {neo.designation for neo in itertools.chain(changes.added_neos, changes.changed_neos,
+                                                               changes.removed_neos)}
+        affected.update(ca._designation for ca in itertools.chain(changes.added_approaches,
+                                                                  changes.removed_approaches))
+        links = {designation: [] for designation in affected}
+        for ca in new_approaches:
+            linked = links.get(ca._designation)
+            if linked != None:
+                linked.append(ca)
+            #endif
+        #endfor
+        by_time = operator.attrgetter("_minutes")
+        for designation, linked in links.items():
+            linked.sort(key=by_time)
+            inx = dict_des_inx.get(designation, -1)
+            links[designation] = (new_neos[inx] if inx >= 0 else None, linked)
+        #endfor
+
+        columns = None
+        if self._columns != None or self._scanner != None:
+            columns = ApproachColumns(
+                array.array("q", (ca._minutes for ca in new_approaches)),
+                array.array("d", (ca.distance for ca in new_approaches)),
+                array.array("d", (ca.velocity for ca in new_approaches)),
+                neo_of_row,
+                array.array("d", (neo.diameter for neo in new_neos)),
+                bytearray(bool(neo.hazardous) for neo in new_neos),
+            )
+        #endif
+
+        # The query indexes read the new approaches once `apply` has linked them
+        keys = column_keys(columns) if self._columns != None else approach_keys(new_approaches)
+        changes._state = (new_neos, new_approaches, dict_des_inx, dict_name_inx, orphan_rows, links,
+                          QueryPlanner(keys, len(new_approaches)), columns)
+        return changes
+    #enddef
+
+    def apply(self, changes: "DataChanges"):
+        """Update this database to the data compared by `diff`.
+
+        Only the approaches of the affected NEOs are relinked, and the cached
+        query results are dropped. The database must not have changed since `diff`.
+
+        :param changes: The `DataChanges` returned by `diff`.
+        """
+        if changes._state == None:
+            self.add_neos(changes.added_neos)
+            self.add_approaches(changes.added_approaches)
+            return
+        #endif
+
+        neos, approaches, dict_des_inx, dict_name_inx, orphan_rows, links, planner, columns = changes._state
+        for removed in changes.removed_approaches:
+            removed.neo = None
+        #endfor
+        for neo, linked in links.values():
+            for ca in linked:
+                ca.neo = neo
+            #endfor
+            if neo != None:
+                neo.approaches = linked
+            #endif
+        #endfor
+
+        self._neos = neos
+        self._approaches = approaches
+        self._dict_des_inx = dict_des_inx
+        self._dict_name_inx = dict_name_inx
+        self._orphan_rows = orphan_rows
+        self._planner = planner
+        self._name_index = self._name_strings = None
+        if self._columns != None:
+            self._columns = columns
+        #endif
+        if self._scanner != None:
+            self._restart_scanner(columns)
+        #endif
+        if self._cache != None:
+            self._cache.clear()
+        #endif
+    #enddef
+
+    def close(self):
+        """Stop the worker processes of parallel scans, if any."""
+        if self._scanner != None:
+            self._scanner.close()
+            self._scanner = None
+        #endif
     #enddef
 
     # TASK - DONE
@@ -122,6 +546,63 @@ class NEODatabase:
         return None
     #enddef
 
+    def search_neos(self, text: str, limit: int = DEFAULT_LIMIT, max_distance: int = None) -> list[NearEarthObject]:
+        """Find the NEOs whose name or designation resembles `text`, best match first.
+
+        Matching ignores case and repeated whitespace. Exact matches come first,
+        then names and designations starting with `text`, then those within
+        `max_distance` edits of it; a `text` ending with `*` only matches by prefix.
+
+        The `NameIndex` behind this is built on the first search.
+
+        :param text: The name, designation, or part of one, to search for.
+        :param limit: The maximum number of NEOs to return.
+        :param max_distance: The number of edits allowed for approximate matches, or `None` for a default by length.
+        :return: A list of matching `NearEarthObject`s.
+        """
+        if self._name_index == None:
+            if self._name_strings != None:
+                designations, names = self._name_strings
+                # NEOs added since the index directory was opened follow the mapped ones
+                added = [self._neos[inx] for inx in range(len(designations), len(self._neos))]
+                if added:
+                    designations = itertools.chain(designations, (neo.designation for neo in added))
+                    names = itertools.chain(names, (neo.name for neo in added))
+                #endif
+            else:
+                designations, names = [neo.designation for neo in self._neos], [neo.name for neo in self._neos]
+            #endif
+            self._name_index = NameIndex(designations, names)
+        #endif
+        return [self._neos[match.neo] for match in self._name_index.search(text, limit, max_distance)]
+    #enddef
+
+    def get_approaches(self, neo: NearEarthObject, start_date=None, end_date=None, limit: int = None):
+        """Return the close approaches of an NEO within a window of dates, in time order.
+
+        The window is found by binary search on the time-sorted approaches of
+        the NEO, so the cost depends on the size of the window, not on the
+        number of approaches of the NEO.
+
+        :param neo: A `NearEarthObject` of this database.
+        :param start_date: A `date` on or after which the approaches occur, or `None`.
+        :param end_date: A `date` on or before which the approaches occur, or `None`.
+        :param limit: The maximum number of approaches to return, from the start of the window, or `None`.
+        :return: A list of `CloseApproach`es.
+        """
+        times = _ApproachTimes(neo.approaches)
+        start = 0 if start_date == None else bisect.bisect_left(times, date_to_minutes(start_date))
+        if end_date == None:
+            stop = len(times)
+        else:
+            stop = bisect.bisect_right(times, date_to_minutes(end_date) + MINUTES_PER_DAY - 1)
+        #endif
+        if limit:
+            stop = min(stop, start + limit)
+        #endif
+        return neo.approaches[start:stop]
+    #enddef
+
     # TASK - DONE
     def query(self, filters: Filter = None):
         """Query close approaches to generate those that match a collection of filters.
@@ -133,22 +614,306 @@ class NEODatabase:
 
         The `CloseApproach` objects are generated in internal order, which isn't
         guaranteed to be sorted meaningfully, although is often sorted by time.
+        A query planner picks the cheapest access path for the filters: either a
+        scan of every approach, or a slice of the sorted index on the most
+        selective attribute, whose rows are put back in internal order. With
+        worker processes, a full scan is split between them and its results are
+        generated in internal order as well.
+
+        With a `ResultCache` (see `set_cache`), the row indexes of the matches
+        are cached under the normalized criteria, so running the same query
+        again, with any limit or output, reads them back instead.
+
+        With a `QueryStats` (see `set_stats`), the rows scanned and matched, the
+        evaluations of each criterion, the access path and the time of the query
+        are recorded when it finishes or is stopped.
 
         :param filters: A collection of filters capturing user-specified criteria.
         :return: A stream of matching `CloseApproach` objects.
         """
 
-        if filters != None:
-            for approach in self._approaches:
-                if filters.check(approach) == True:
-                    yield approach
+        record = None
+        if self._stats != None:
+            record = QueryRecord(tuple(ft.name.lower() for ft in sorted(filters.filter_types, key=lambda ft: ft.value))
+                                 if filters != None else ())
+        #endif
+        rows = self._query_rows(filters, record) if self._cache == None else self._cached_rows(filters, record)
+        if record != None:
+            rows = _recorded(rows, record)
+        #endif
+        try:
+            for inx in rows:
+                yield self._approaches[inx]
+            #endfor
+        finally:
+            # Stopping early still records the rows seen so far in the cache
+            rows.close()
+            if record != None:
+                self._stats.add(record)
+            #endif
+        #endtry
+    #enddef
+
+    def aggregate(self, filters: Filter = None, group_by: str = None):
+        """Summarize the close approaches matching `filters` by group, without building their objects.
+
+        The matching rows are found as `query` finds them (through the query
+        cache, if any), and their attributes are read from the columns of the
+        database, or from the existing approaches of a database without columns.
+        See the `aggregate` module.
+
+        :param filters: A collection of filters capturing user-specified criteria, or `None` for every approach.
+        :param group_by: One of `aggregate.GROUP_BY`, or `None` to summarize every matching approach together.
+        :return: A list of `aggregate.Group`s, sorted by key.
+        """
+        rows = self._query_rows(filters) if self._cache == None else self._cached_rows(filters)
+        rows = list(rows)
+
+        if self._columns == None:
+            approaches = [self._approaches[inx] for inx in rows]
+            return summarize(group_by, [ca._minutes for ca in approaches], [ca.distance for ca in approaches],
+                             [ca.velocity for ca in approaches], [ca._designation for ca in approaches],
+                             [ca.neo.hazardous if ca.neo != None else None for ca in approaches])
+        #endif
+
+        columns = self._columns
+        time, distance, velocity, neo, flags = (columns.time, columns.distance, columns.velocity, columns.neo,
+                                                columns.hazardous)
+        neos = [neo[inx] for inx in rows]
+        hazardous = [bool(flags[n]) if n >= 0 else None for n in neos]
+        if group_by == "neo" and self._orphan_rows:
+            # Approaches without an NEO are grouped by their own designation
+            orphans = {row: designation for designation, orphan_rows in self._orphan_rows.items()
+                       for row in orphan_rows}
+            neos = [n if n >= 0 else orphans.get(inx) for n, inx in zip(neos, rows)]
+        #endif
+        return summarize(group_by, [time[inx] for inx in rows], [distance[inx] for inx in rows],
+                         [velocity[inx] for inx in rows], neos, hazardous, neo_label=self._designation)
+    #enddef
+
+    def _designation(self, key):
+        """Return the designation of the NEO of index `key`, or `key` itself if it isn't an index."""
+        if not isinstance(key, int):
+            return key
+        elif key < 0:
+            return None
+        elif self._name_strings != None and key < len(self._name_strings[0]):
+            return self._name_strings[0][key]
+        #endif
+        return self._neos[key].designation
+    #enddef
+
+    def _query_rows(self, filters, record=None, first_row: int = 0):
+        """Generate the row indexes of the close approaches matching `filters`, as `query` orders them.
+
+        Only the rows from `first_row` on are evaluated, since the rows come in row order.
+        The work done is counted in `record`, a `QueryRecord`, unless it is `None`.
+        """
+        if filters == None:
+            rows = range(first_row, len(self._approaches))
+            yield from (rows if record == None else _scanned(rows, record))
+            return
+        elif filters.contradictory:
+            return
+        #endif
+
+        # Reorder the predicate with real statistics, then pick an index (or a full scan)
+        filters.order(self._planner.estimate)
+        plan = self._planner.plan(filters)
+        rows = self._planner.rows(plan, filters)
+        if record != None and plan.index != None:
+            record.index = plan.index.name.lower()
+        #endif
+        if rows != None and first_row > 0:
+            rows = rows[bisect.bisect_left(rows, first_row):]
+        #endif
+
+        if self._scanner != None and rows == None:
+            if first_row < self._scanner.row_count:
+                if record != None:
+                    # The workers evaluate the criteria, so only the scanned rows are known
+                    record.index = "parallel scan"
+                    record.rows_scanned = self._scanner.row_count - first_row
+                #endif
+                # Rows are fetched partition by partition, so stopping early leaves the rest unscanned
+                yield from self._scanner.select(plan.residual, first_row)
+            #endif
+            if self._scanner.row_count == len(self._approaches):
+                return
+            #endif
+            # The rows appended since the workers started are scanned here
+            rows = range(max(self._scanner.row_count, first_row), len(self._approaches))
+        elif rows == None and first_row > 0:
+            rows = range(first_row, len(self._approaches))
+        #endif
+
+        if self._columns != None:
+            if record != None:
+                record.rows_scanned += len(self._approaches) if rows == None else len(rows)
+            #endif
+            if plan.residual != None:
+                rows = self._columns.select(plan.residual, rows, record.evaluations if record != None else None)
+            #endif
+            yield from (range(len(self._approaches)) if rows == None else rows)
+            return
+        #endif
+
+        predicate = plan.residual.predicate if plan.residual != None else None
+        if record != None:
+            # Counting takes a slower predicate and loop, so it is only done when recording
+            if plan.residual != None:
+                predicate = plan.residual.counting_predicate(record.evaluations)
+            #endif
+            rows = _scanned(range(len(self._approaches)) if rows == None else rows, record)
+        #endif
+        if rows == None:
+            for inx, approach in enumerate(self._approaches):
+                if predicate == None or predicate(approach):
+                    yield inx
                 #endif
             #endfor
         else:
-            for approach in self._approaches:
-                yield approach
+            for inx in rows:
+                if predicate == None or predicate(self._approaches[inx]):
+                    yield inx
+                #endif
             #endfor
         #endif
     #enddef
+
+    def _cached_rows(self, filters, record=None):
+        """Generate the rows of `_query_rows`, reusing and extending the cached rows of the same filters."""
+        key = filters.key if filters != None else ()
+        entry = self._cache.get(key)
+        if entry != None and entry.complete:
+            if record != None:
+                record.index = "cache"
+            #endif
+            yield from entry.rows
+            return
+        #endif
+
+        # Replay the rows computed so far, then compute the rest from the row after the last of them
+        rows = array.array("q") if entry == None else array.array("q", entry.rows)
+        first_row = rows[-1] + 1 if rows else 0
+        # Rows computed before the data changes would be stale, so they are only cached if it doesn't
+        generation = self._cache.generation
+        complete = False
+        try:
+            yield from (entry.rows if entry != None else ())
+            for inx in self._query_rows(filters, record, first_row):
+                rows.append(inx)
+                yield inx
+            #endfor
+            complete = True
+        finally:
+            if self._cache.generation == generation:
+                self._cache.put(key, rows, complete)
+            #endif
+        #endtry
+    #enddef
 #endclass
 
+# SUPPORT CLASS
+class DataChanges:
+    """The differences found by `NEODatabase.diff`, and the prepared state that `NEODatabase.apply` swaps in."""
+
+    def __init__(self):
+        self.added_neos = []
+        self.changed_neos = []
+        self.removed_neos = []
+        self.added_approaches = []
+        self.removed_approaches = []
+        self._state = None
+    #enddef
+
+    def __bool__(self):
+        return bool(self.added_neos or self.changed_neos or self.removed_neos
+                    or self.added_approaches or self.removed_approaches)
+    #enddef
+
+    def __str__(self):
+        return (f"NEOs: {len(self.added_neos)} added, {len(self.changed_neos)} changed, "
+                f"{len(self.removed_neos)} removed; close approaches: {len(self.added_approaches)} added, "
+                f"{len(self.removed_approaches)} removed")
+    #enddef
+#endclass
+
+# SUPPORT FUNCTION
+def _same_neo(old, new):
+    """Return whether two NEOs with the same designation have the same attributes."""
+    return (old.name == new.name and old.hazardous == new.hazardous
+            and (old.diameter == new.diameter or (math.isnan(old.diameter) and math.isnan(new.diameter))))
+#enddef
+
+# SUPPORT FUNCTION
+def _approach_key(ca):
+    return (ca._designation, ca._minutes, ca.distance, ca.velocity)
+#enddef
+
+# SUPPORT FUNCTION
+def _scanned(rows, record):
+    """Generate `rows`, counting them as scanned in `record`."""
+    for inx in rows:
+        record.rows_scanned += 1
+        yield inx
+    #endfor
+#enddef
+
+# SUPPORT FUNCTION
+def _recorded(rows, record):
+    """Generate `rows`, adding their count and the time spent producing them to `record`."""
+    clock = time.perf_counter
+    try:
+        while True:
+            start = clock()
+            try:
+                inx = next(rows)
+            except StopIteration:
+                return
+            finally:
+                record.seconds += clock() - start
+            #endtry
+            record.rows_matched += 1
+            yield inx
+        #endwhile
+    finally:
+        rows.close()
+    #endtry
+#enddef
+
+# SUPPORT CLASS
+class _LookupOverlay:
+    """A read-only lookup, such as a `store.SortedLookup`, with entries added over it in a dictionary."""
+
+    def __init__(self, base):
+        self._base = base
+        self._added = {}
+    #enddef
+
+    def get(self, key, default=None):
+        inx = self._added.get(key)
+        return inx if inx != None else self._base.get(key, default)
+    #enddef
+
+    def __setitem__(self, key, inx):
+        self._added[key] = inx
+    #enddef
+#endclass
+
+# SUPPORT CLASS
+class _ApproachTimes:
+    """The times, in minutes since the epoch, of a time-sorted list of approaches, as a sequence for `bisect`."""
+
+    def __init__(self, approaches):
+        self._approaches = approaches
+    #enddef
+
+    def __len__(self):
+        return len(self._approaches)
+    #enddef
+
+    def __getitem__(self, inx):
+        return self._approaches[inx]._minutes
+    #enddef
+#endclass
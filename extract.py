@@ -5,76 +5,481 @@ described in the project instructions, into a collection of `NearEarthObject`s.
 
 The `load_approaches` function extracts close approach data from a JSON file,
 formatted as described in the project instructions, into a collection of
-`CloseApproach` objects.
+`CloseApproach` objects. The `iter_approaches` function streams the same objects
+one row at a time, without holding the whole JSON document in memory.
 
 The main module calls these functions with the arguments provided at the command
-line, and uses the resulting collections to build an `NEODatabase`.
+line, and uses the resulting collections to build an `NEODatabase`. Both loaders
+can spread the parsing over a pool of worker processes.
 
 You'll edit this file in Task 2.
 """
+import array
+import concurrent.futures
 import csv
+import io
+import itertools
 import json
+import mmap
+import os
+import re
 
+from helpers import cd_to_minutes_column
 from models import NearEarthObject, CloseApproach
 
 # INFO
 """ For those who reading/grading this, I come from C and this syntax of tabs is really bothering me so I'mma just add the tailing end for everything =)))) """
 """ You can quickly skim through what I changed by the keyword 'TASK - DONE' ;) """
 
+# The CAD API's field layout, used when a file doesn't say which column is which.
+CAD_FIELDS = ["des", "orbit_id", "jd", "cd", "dist", "dist_min", "dist_max", "v_rel", "v_inf", "t_sigma_f", "h"]
+
+# Characters read from the CAD file at once while streaming it.
+CHUNK_SIZE = 1 << 16
+
+# Bytes at the end of the CAD file searched for a `fields` list that follows the `data` array.
+FIELDS_LOOKAHEAD = 1 << 12
+
+# The bytes between two rows of the CAD `data` array, where it can be split for parallel parsing.
+ROW_BOUNDARY = re.compile(rb"\]\s*,\s*\[")
+
 # TASK - DONE
-def load_neos(neo_csv_path):
+def load_neos(neo_csv_path, extra_columns: list[str] = None, workers: int = 1):
     """Read near-Earth object information from a CSV file.
 
+    Only the columns that are needed are picked out of each row: their positions
+    are looked up once from the header, and plain rows are split on commas
+    without building a dictionary for all ~75 columns. Rows containing quotes
+    are handed to the `csv` module instead.
+
+    With more than one worker, the rows are split into line-aligned byte ranges
+    parsed in a process pool, and the NEOs are returned in file order. If a
+    quoted field turns out to span a range boundary, the file is read serially.
+
     :param neo_csv_path: A path to a CSV file containing data about near-Earth objects.
+    :param extra_columns: Names of additional columns to keep, as raw strings, in each NEO's `extra` dictionary.
+    :param workers: The number of worker processes to parse the file with.
     :return: A collection (a list) of `NearEarthObject`s.
     """
-    list_of_neos = []
-    neos_file = open(neo_csv_path)
-    read_csv = csv.DictReader(neos_file)
-    for row in read_csv:
-        designator = row["pdes"]
+    with open(neo_csv_path, newline="") as neos_file:
+        header = next(csv.reader(neos_file))
+        columns = [header.index(name) for name in ("pdes", "name", "diameter", "pha")]
+        extras = [(name, header.index(name)) for name in (extra_columns or [])]
+
+        if workers > 1:
+            list_of_neos = _load_neos_parallel(neo_csv_path, columns, extras, workers)
+            if list_of_neos != None:
+                return list_of_neos
+            #endif
+        #endif
+
+        return _parse_neo_rows(neos_file, columns, extras)
+    #endwith
+#enddef
+
+# TASK - DONE
+def load_approaches(cad_json_path, workers: int = 1):
+    """Read close approach data from a JSON file.
+
+    The rows are decoded as columns, and their calendar dates converted in one
+    batch with `helpers.cd_to_minutes_column` before the objects are built.
+
+    With more than one worker, the rows of the `data` array are split into
+    ranges decoded in a process pool, and the approaches are returned in file
+    order. If the file can't be split that way, it is streamed serially.
+
+    :param cad_json_path: A path to a JSON file containing data about close approaches.
+    :param workers: The number of worker processes to parse the file with.
+    :return: A collection (a list) of `CloseApproach`es.
+    """
+    if workers > 1:
+        list_of_cas = _load_approaches_parallel(cad_json_path, workers)
+        if list_of_cas != None:
+            return list_of_cas
+        #endif
+    #endif
+
+    # Gather the columns first, so the times are converted as one batch
+    designations, calendar_dates = [], []
+    distances, velocities = array.array("d"), array.array("d")
+    for designation, calendar_date, distance, velocity in _iter_cad_rows(cad_json_path):
+        designations.append(designation)
+        calendar_dates.append(calendar_date)
+        distances.append(float(distance))
+        velocities.append(float(velocity))
+    #endfor
+    minutes = cd_to_minutes_column(calendar_dates)
+    return list(map(CloseApproach.from_minutes, designations, minutes, distances, velocities))
+#enddef
 
-        name = row["name"] or None
+def iter_approaches(cad_json_path, chunk_size=CHUNK_SIZE, progress=None):
+    """Stream close approach data from a JSON file, one row at a time.
 
-        if (row["diameter"] != "") and (row["diameter"] != None):
-            diameter = float(row["diameter"])
+    The file is read `chunk_size` characters at a time and only the rows of the
+    `data` array currently in the buffer are decoded, so memory use is bounded
+    by the chunk size rather than by the size of the file.
+
+    :param cad_json_path: A path to a JSON file containing data about close approaches.
+    :param chunk_size: The number of characters read from the file at once.
+    :param progress: A function called with the number of characters read so far after each chunk, or `None`.
+    :yield: The `CloseApproach`es, in file order.
+    """
+    for designation, calendar_date, distance, velocity in _iter_cad_rows(cad_json_path, chunk_size, progress):
+        yield CloseApproach(designation, calendar_date, float(distance), float(velocity))
+    #endfor
+#enddef
+
+# SUPPORT FUNCTION
+def _iter_cad_rows(cad_json_path, chunk_size=CHUNK_SIZE, progress=None):
+    """Stream the designation, calendar date, distance and velocity fields of each close approach row.
+
+    See `iter_approaches` for the parameters.
+    """
+    with open(cad_json_path) as cad_file:
+        stream = _JSONStream(cad_file, chunk_size, progress)
+        fields = None
+
+        stream.expect("{")
+        if stream.peek() == "}":
+            return
+        #endif
+
+        while True:
+            key = stream.decode()
+            stream.expect(":")
+
+            if key == "data":
+                # The API puts `fields` after `data`, so look ahead for it instead of buffering rows
+                if fields is None:
+                    fields = _peek_fields(cad_json_path) or CAD_FIELDS
+                #endif
+                inx_des, inx_cd, inx_dist, inx_v_rel = (fields.index(name) for name in ("des", "cd", "dist", "v_rel"))
+
+                stream.expect("[")
+                if stream.peek() == "]":
+                    stream.advance()
+                else:
+                    while True:
+                        row = stream.decode()
+                        yield row[inx_des], row[inx_cd], row[inx_dist], row[inx_v_rel]
+                        if stream.peek() != ",":
+                            stream.expect("]")
+                            break
+                        #endif
+                        stream.advance()
+                    #endwhile
+                #endif
+            elif key == "fields":
+                fields = stream.decode()
+            else:
+                stream.decode()
+            #endif
+
+            if stream.peek() != ",":
+                stream.expect("}")
+                break
+            #endif
+            stream.advance()
+        #endwhile
+    #endwith
+#enddef
+
+# SUPPORT FUNCTION
+def _parse_neo_rows(lines, columns, extras):
+    """Build a `NearEarthObject` from each CSV record of an iterator of lines."""
+    inx_pdes, inx_name, inx_diameter, inx_pha = columns
+    list_of_neos = []
+    for line in lines:
+        if '"' in line:
+            # Quoted fields may hold commas or even line breaks, so let `csv` read the whole record
+            row = next(csv.reader(itertools.chain([line], lines)))
         else:
-            diameter = float("nan")
+            row = line.rstrip("\r\n").split(",")
         #endif
+        if row == [] or row == [""]:
+            continue
+        #endif
+
+        designator = row[inx_pdes]
+
+        name = row[inx_name] or None
 
-        if row["pha"] == "Y":
-            hazardous = True
+        if row[inx_diameter] != "":
+            diameter = float(row[inx_diameter])
         else:
-            hazardous = False
+            diameter = float("nan")
         #endif
 
-        list_of_neos.append(NearEarthObject(designator, name, diameter, hazardous))
+        hazardous = (row[inx_pha] == "Y")
+
+        neo = NearEarthObject(designator, name, diameter, hazardous)
+        if extras:
+            neo.extra = {name: row[inx] for name, inx in extras}
+        #endif
+        list_of_neos.append(neo)
     #endfor
+    return list_of_neos
+#enddef
+
+# SUPPORT FUNCTION
+def _load_neos_parallel(neo_csv_path, columns, extras, workers):
+    """Parse the rows of a CSV file in line-aligned byte ranges, or return `None` if a range splits a quoted field."""
+    with open(neo_csv_path, "rb") as neos_file:
+        neos_file.readline()
+        ranges = _split_at_lines(neos_file, neos_file.tell(), workers)
+    #endwith
 
+    with concurrent.futures.ProcessPoolExecutor(len(ranges)) as pool:
+        results = list(pool.map(_parse_neo_range, itertools.repeat(neo_csv_path), *zip(*ranges),
+                                itertools.repeat(columns), itertools.repeat(extras)))
+    #endwith
+
+    # A boundary is only a record boundary if an even number of quotes precede it
+    quotes = 0
+    for inx, (quote_count, rows) in enumerate(results):
+        if rows == None or (inx > 0 and quotes % 2 != 0):
+            return None
+        #endif
+        quotes += quote_count
+    #endfor
+    list_of_neos = []
+    for _, rows in results:
+        for designator, name, diameter, hazardous, extra in rows:
+            neo = NearEarthObject(designator, name, diameter, hazardous)
+            neo.extra = extra
+            list_of_neos.append(neo)
+        #endfor
+    #endfor
     return list_of_neos
 #enddef
 
-# TASK - DONE
-def load_approaches(cad_json_path):
-    """Read close approach data from a JSON file.
+# SUPPORT FUNCTION
+def _parse_neo_range(neo_csv_path, start, stop, columns, extras):
+    """Worker: parse the CSV lines between two byte offsets, returning their quote count and NEO attributes.
 
-    :param cad_json_path: A path to a JSON file containing data about close approaches.
-    :return: A collection (a list) of `CloseApproach`es.
+    The attributes are `None` if the lines can't be parsed on their own.
     """
-    list_of_cas = []
-    cad_file = open(cad_json_path)
-    read_json = json.load(cad_file)
-    for row in read_json["data"]:
-        # ["des","orbit_id","jd","cd","dist","dist_min","dist_max","v_rel","v_inf","t_sigma_f","h"]
-        """
-            Index 0 - des
-            Index 3 - cd
-            Index 4 - dist
-            Index 7 - v_rel
-        """
-        # Should parse for a dictinary of {field_name, index_of_field_name}, this removes the hard-code indexes and is more flexible 
-        list_of_cas.append(CloseApproach(row[0], row[3], float(row[4]), float(row[7])))
+    with open(neo_csv_path, "rb") as neos_file:
+        neos_file.seek(start)
+        chunk = neos_file.read(stop - start)
+    #endwith
+    try:
+        list_of_neos = _parse_neo_rows(io.TextIOWrapper(io.BytesIO(chunk), encoding="utf-8", newline=""), columns, extras)
+    except (IndexError, ValueError, csv.Error):
+        # The range starts inside a quoted field; the parent falls back to a serial parse
+        return chunk.count(b'"'), None
+    #endtry
+
+    # Plain tuples pickle much faster than slotted objects on the way back
+    return chunk.count(b'"'), [(neo.designation, neo.name, neo.diameter, neo.hazardous, neo.extra) for neo in list_of_neos]
+#enddef
+
+# SUPPORT FUNCTION
+def _split_at_lines(file, start, parts):
+    """Split a binary file from `start` to its end into up to `parts` `(start, stop)` ranges of whole lines."""
+    size = os.fstat(file.fileno()).st_size
+    bounds = [start]
+    for part in range(1, parts):
+        file.seek(start + (size - start) * part // parts)
+        file.readline()
+        if bounds[-1] < file.tell() < size:
+            bounds.append(file.tell())
+        #endif
     #endfor
+    bounds.append(size)
+    return list(zip(bounds, bounds[1:]))
+#enddef
 
+# SUPPORT FUNCTION
+def _load_approaches_parallel(cad_json_path, workers):
+    """Decode the rows of the `data` array in ranges, or return `None` if the file can't be split."""
+    with open(cad_json_path, "rb") as cad_file:
+        with mmap.mmap(cad_file.fileno(), 0, access=mmap.ACCESS_READ) as cad_map:
+            data = re.search(rb'"data"\s*:\s*\[', cad_map)
+            if data == None:
+                return None
+            #endif
+            fields = _search_fields(cad_map) or CAD_FIELDS
+
+            # Split between rows: after a row's closing `]`, its `,`, at the next row's `[`
+            starts = [data.end()]
+            for part in range(1, workers):
+                target = data.end() + (len(cad_map) - data.end()) * part // workers
+                boundary = ROW_BOUNDARY.search(cad_map, max(target, starts[-1]))
+                if boundary != None and boundary.end() - 1 > starts[-1]:
+                    starts.append(boundary.end() - 1)
+                #endif
+            #endfor
+        #endwith
+    #endwith
+
+    columns = [fields.index(name) for name in ("des", "cd", "dist", "v_rel")]
+    stops = starts[1:] + [None]
+    try:
+        with concurrent.futures.ProcessPoolExecutor(len(starts)) as pool:
+            results = list(pool.map(_parse_cad_range, itertools.repeat(cad_json_path), starts, stops,
+                                    itertools.repeat(columns)))
+        #endwith
+    except (ValueError, IndexError):
+        return None
+    #endtry
+
+    list_of_cas = []
+    for designations, minutes, distances, velocities in results:
+        list_of_cas.extend(map(CloseApproach.from_minutes, designations, minutes, distances, velocities))
+    #endfor
     return list_of_cas
 #enddef
+
+# SUPPORT FUNCTION
+def _parse_cad_range(cad_json_path, start, stop, columns):
+    """Worker: decode the `data` rows from byte offset `start` up to `stop` (or the end of the array) into columns."""
+    with open(cad_json_path, "rb") as cad_file:
+        cad_file.seek(start)
+        text = cad_file.read(-1 if stop == None else stop - start).decode("utf-8")
+    #endwith
+
+    inx_des, inx_cd, inx_dist, inx_v_rel = columns
+    designations = []
+    calendar_dates = []
+    distances = array.array("d")
+    velocities = array.array("d")
+
+    decoder = json.JSONDecoder()
+    whitespace = re.compile(r"\s*")
+    pos = whitespace.match(text).end()
+    while pos < len(text) and text[pos] != "]":
+        row, pos = decoder.raw_decode(text, pos)
+        designations.append(row[inx_des])
+        calendar_dates.append(row[inx_cd])
+        distances.append(float(row[inx_dist]))
+        velocities.append(float(row[inx_v_rel]))
+
+        pos = whitespace.match(text, pos).end()
+        if pos < len(text) and text[pos] == ",":
+            pos = whitespace.match(text, pos + 1).end()
+        elif pos < len(text) and text[pos] != "]":
+            raise ValueError(f"Malformed close approach data at byte {start + pos}.")
+        #endif
+    #endwhile
+    return designations, cd_to_minutes_column(calendar_dates), distances, velocities
+#enddef
+
+# SUPPORT FUNCTION
+def _search_fields(cad_map):
+    """Find and decode the `fields` list anywhere in a memory-mapped CAD file, or return `None`."""
+    match = re.search(rb'"fields"\s*:\s*', cad_map)
+    if match == None:
+        return None
+    #endif
+    fields_end = cad_map.find(b"]", match.end())
+    try:
+        fields = json.loads(cad_map[match.end():fields_end + 1])
+    except json.JSONDecodeError:
+        return None
+    #endtry
+    return fields if isinstance(fields, list) else None
+#enddef
+
+# SUPPORT FUNCTION
+def _peek_fields(cad_json_path):
+    """Find the `fields` list near the end of a CAD file, or `None` if it isn't there."""
+    with open(cad_json_path, "rb") as cad_file:
+        cad_file.seek(0, 2)
+        cad_file.seek(max(0, cad_file.tell() - FIELDS_LOOKAHEAD))
+        tail = cad_file.read().decode("utf-8", errors="replace")
+    #endwith
+
+    match = re.search(r'"fields"\s*:\s*', tail)
+    if match == None:
+        return None
+    #endif
+
+    try:
+        fields, _ = json.JSONDecoder().raw_decode(tail, match.end())
+    except json.JSONDecodeError:
+        return None
+    #endtry
+    return fields if isinstance(fields, list) else None
+#enddef
+
+# SUPPORT CLASS
+class _JSONStream:
+    """A buffered cursor that decodes one JSON value at a time from a text file."""
+
+    _decoder = json.JSONDecoder()
+    _whitespace = re.compile(r"\s*")
+
+    def __init__(self, file, chunk_size, progress=None):
+        self._file = file
+        self._chunk_size = chunk_size
+        self._progress = progress
+        self._read = 0
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+    #enddef
+
+    def _fill(self) -> bool:
+        """Drop the consumed prefix and append the next chunk, returning `False` at end of file."""
+        chunk = self._file.read(self._chunk_size)
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
+        self._eof = (chunk == "")
+        if self._progress != None:
+            self._read += len(chunk)
+            self._progress(self._read)
+        #endif
+        return not self._eof
+    #enddef
+
+    def peek(self) -> str:
+        """Skip whitespace and return the next character, or `""` at end of file."""
+        while True:
+            self._pos = self._whitespace.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf) or self._fill() == False:
+                return self._buf[self._pos:self._pos + 1]
+            #endif
+        #endwhile
+    #enddef
+
+    def advance(self):
+        """Consume the character returned by the last `peek`."""
+        self._pos += 1
+    #enddef
+
+    def expect(self, char: str):
+        """Consume `char`, or raise a `ValueError` if the next character is anything else."""
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Malformed close approach data: expected {char!r} but found {found or 'end of file'!r}.")
+        #endif
+        self.advance()
+    #enddef
+
+    def decode(self):
+        """Decode the next JSON value, reading more of the file until it is complete."""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if self._fill() == False:
+                    raise
+                #endif
+                continue
+            #endtry
+
+            if end < len(self._buf):
+                self._pos = end
+                return value
+            #endif
+
+            # A number at the very end of the buffer may continue in the next chunk
+            if self._fill() == False:
+                self._pos = len(self._buf)
+                return value
+            #endif
+        #endwhile
+    #enddef
+#endclass
@@ -11,14 +11,22 @@ from a comparator (from the `operator` module), a reference value, and a class
 method `get` that subclasses can override to fetch an attribute of interest from
 the supplied `CloseApproach`.
 
+The criteria are held by a `Filter`, which merges them into one range per
+attribute and compiles those ranges into a single short-circuiting predicate.
+
 The `limit` function simply limits the maximum number of values produced by an
-iterator.
+iterator, and the `order_by` function orders them by an attribute, keeping only
+the top `n` when a limit is given.
 
 You'll edit this file in Tasks 3a and 3c.
 """
+import heapq
+import itertools
+import math
 import operator
 
 from models import CloseApproach
+from helpers import date_to_minutes
 from enum import Enum
 
 # INFO
@@ -82,6 +90,8 @@ class AttributeFilter:
     #enddef
 #endclass
 
+MINUTES_PER_DAY = 24 * 60
+
 # SUPPORT CLASS 
 class FilterType(Enum): 
     DATE = 0
@@ -91,32 +101,241 @@ class FilterType(Enum):
     HAZARDOUS = 4
 #endclass
 
+# SUPPORT FUNCTION
+def _neo_diameter(ca):
+    """Return the diameter of the NEO of an approach, NaN (which no range contains) if it has none."""
+    neo = ca.neo
+    return neo.diameter if neo != None else math.nan
+#enddef
+
+# SUPPORT FUNCTION
+def _neo_hazardous(ca):
+    """Return the hazard flag of the NEO of an approach, or `None` (which equals no flag) if it has none."""
+    neo = ca.neo
+    return neo.hazardous if neo != None else None
+#enddef
+
+# The function reading each filtered attribute of a `CloseApproach` inside a compiled predicate.
+# Approaches without a linked NEO never match an NEO criterion.
+ATTRIBUTE_GETTER = {
+    FilterType.DATE: operator.attrgetter("_minutes"),
+    FilterType.DISTANCE: operator.attrgetter("distance"),
+    FilterType.VELOCITY: operator.attrgetter("velocity"),
+    FilterType.DIAMETER: _neo_diameter,
+    FilterType.HAZARDOUS: _neo_hazardous,
+}
+
+# Relative cost of reading each attribute: NEO attributes take one more lookup
+ATTRIBUTE_COST = {
+    FilterType.DATE: 1.0,
+    FilterType.DISTANCE: 1.0,
+    FilterType.VELOCITY: 1.0,
+    FilterType.DIAMETER: 2.0,
+    FilterType.HAZARDOUS: 2.0,
+}
+
+# Rough fraction of approaches passing a one-sided criterion, used without better statistics.
+# Most NEOs have no known diameter, so any diameter bound rejects most approaches.
+DEFAULT_SELECTIVITY = {
+    FilterType.DATE: 0.05,
+    FilterType.DISTANCE: 0.5,
+    FilterType.VELOCITY: 0.5,
+    FilterType.DIAMETER: 0.1,
+    FilterType.HAZARDOUS: 0.2,
+}
+
+# SUPPORT FUNCTION
+def default_selectivity(filter_type, low, high) -> float:
+    """Guess the fraction of approaches within inclusive `[low, high]` bounds of an attribute, without statistics."""
+    selectivity = DEFAULT_SELECTIVITY[filter_type]
+    if filter_type == FilterType.DATE and low != None and high != None:
+        # Assume about 50 years of data; a single day is very selective
+        return min(1.0, (high - low + 1) / (50 * 365 * MINUTES_PER_DAY))
+    elif filter_type != FilterType.HAZARDOUS and low != None and high != None:
+        return selectivity * selectivity
+    #endif
+    return selectivity
+#enddef
+
 # SUPPORT CLASS  
 class Filter:
+    """A conjunction of `(op, value, FilterType)` criteria, compiled into one predicate.
+
+    On construction, every criterion on the same attribute is merged into one
+    inclusive `[low, high]` range (date criteria become minutes since the epoch,
+    compared with `CloseApproach._minutes` instead of building datetimes). If any
+    range is empty, the filter is `contradictory` and matches nothing.
+
+    The ranges are then compiled into a `predicate` function, a chain of one
+    small closure per range, each reading its attribute once and calling the
+    next only if its test passes. Tests run in order of
+    `(selectivity - 1) / cost`, so cheap and selective tests come first; the
+    selectivity of each range comes from an `estimate` function, by default
+    `default_selectivity`.
+    """
+
+    def __init__(self, requirement: list[tuple[3]] = None, estimate=default_selectivity):
+        """Create and compile a new `Filter`.
+
+        :param requirement: The `(op, value, FilterType)` criteria, with `op` one of `operator.eq`, `ge` and `le`.
+        :param estimate: A function of `(filter_type, low, high)` returning the expected fraction of matches.
+        """
+        self._list_op_val_type = requirement or []
+        self._bounds = {}
+
+        for op, value, filter_type in self._list_op_val_type:
+            if op is operator.eq:
+                low, high = value, value
+            elif op is operator.ge:
+                low, high = value, None
+            elif op is operator.le:
+                low, high = None, value
+            else:
+                raise UnsupportedCriterionError(f"Unsupported comparison {op!r} for {filter_type}.")
+            #endif
+
+            if filter_type == FilterType.DATE:
+                low = date_to_minutes(low) if low != None else None
+                high = date_to_minutes(high) + MINUTES_PER_DAY - 1 if high != None else None
+            elif filter_type == FilterType.HAZARDOUS:
+                low, high = bool(value), bool(value)
+            #endif
 
-    def __init__(self, requirement: list[tuple[3]] = None):
-        self._list_op_val_type = requirement
+            bound = self._bounds.setdefault(filter_type, [None, None])
+            if low != None and (bound[0] == None or low > bound[0]):
+                bound[0] = low
+            #endif
+            if high != None and (bound[1] == None or high < bound[1]):
+                bound[1] = high
+            #endif
+        #endfor
+
+        self.contradictory = any(low != None and high != None and low > high for low, high in self._bounds.values())
+        self._estimate = None
+        self.order(estimate)
     #enddef
 
-    def check(self, ca: CloseApproach = None) -> bool:
-        ret: bool = True
-        # Do each of the req in the list
-        for check in self._list_op_val_type:
-            if check[2] == FilterType.DATE:
-                ret &= check[0](ca.time.date(), check[1])
-            elif check[2] == FilterType.DISTANCE:
-                ret &= check[0](ca.distance, check[1])
-            elif check[2] == FilterType.VELOCITY:
-                ret &= check[0](ca.velocity, check[1])
-            elif check[2] == FilterType.DIAMETER:
-                ret &= check[0](ca.neo.diameter, check[1])
-            elif check[2] == FilterType.HAZARDOUS:
-                ret &= check[0](ca.neo.hazardous, check[1])
+    @property
+    def criteria(self) -> list[tuple[3]]:
+        """Return the `(op, value, FilterType)` requirements of this filter."""
+        return self._list_op_val_type
+    #enddef
+
+    @property
+    def filter_types(self) -> list[FilterType]:
+        """Return the filtered attributes, in the order the predicate tests them."""
+        return list(self._order)
+    #enddef
+
+    @property
+    def key(self) -> tuple:
+        """Return the merged ranges as a hashable tuple, equal for filters with the same ranges however they were given."""
+        return tuple(sorted((filter_type.value, low, high) for filter_type, (low, high) in self._bounds.items()))
+    #enddef
+
+    def bounds(self, filter_type: FilterType) -> tuple[2]:
+        """Return the inclusive `(low, high)` range allowed for an attribute.
+
+        Either bound is `None` if that side is open. Dates are given in minutes
+        since the epoch, and the hazardous flag as `(wanted, wanted)`.
+        """
+        low, high = self._bounds.get(filter_type, (None, None))
+        return low, high
+    #enddef
+
+    def without(self, *filter_types):
+        """Return a `Filter` of the remaining criteria, or `None` if no criterion remains.
+
+        :param filter_types: The `FilterType`s whose criteria are dropped.
+        """
+        remaining = [check for check in self._list_op_val_type if check[2] not in filter_types]
+        return Filter(remaining, self._estimate) if (remaining != []) else None
+    #enddef
+
+    def order(self, estimate):
+        """Recompile the predicate, ordering its tests with a new selectivity `estimate`."""
+        if estimate is self._estimate:
+            return
+        #endif
+        self._estimate = estimate
+
+        def rank(filter_type):
+            return (estimate(filter_type, *self._bounds[filter_type]) - 1) / ATTRIBUTE_COST[filter_type]
+        #enddef
+
+        self._order = sorted(self._bounds, key=rank)
+        self.predicate = self._compile()
+    #enddef
+
+    def _compile(self, counts=None):
+        """Compose the predicate function testing every range in `self._order`, counting tests in `counts`."""
+        if self.contradictory:
+            return lambda ca: False
+        elif not self._order:
+            return lambda ca: True
+        #endif
+
+        # Built from the last test to the first, each test calling the next one only if it passes
+        predicate = None
+        for filter_type in reversed(self._order):
+            get = ATTRIBUTE_GETTER[filter_type]
+            if counts != None:
+                get = _counted(get, counts, filter_type.name.lower())
             #endif
+            predicate = _range_test(get, *self._bounds[filter_type], predicate)
         #endfor
-        return ret
+        return predicate
+    #enddef
+
+    def counting_predicate(self, counts):
+        """Compile a variant of `predicate` that also counts the evaluations of each criterion.
+
+        :param counts: A mapping, such as a `collections.Counter`, whose entry for the lowercase name of each
+                       filtered attribute is incremented whenever its test runs.
+        :return: The counting predicate function.
+        """
+        return self._compile(counts)
+    #enddef
+
+    def check(self, ca: CloseApproach = None) -> bool:
+        """Return whether a `CloseApproach` satisfies every criterion of this filter."""
+        return self.predicate(ca)
     #enddef
-#endclassDISTANCE
+#endclass
+
+# SUPPORT FUNCTION
+def _range_test(get, low, high, then=None):
+    """Return a predicate testing whether `get(ca)` lies within inclusive `[low, high]` bounds, and `then(ca)` if any."""
+    if then == None:
+        if low == high:
+            return lambda ca: get(ca) == low
+        elif low == None:
+            return lambda ca: get(ca) <= high
+        elif high == None:
+            return lambda ca: get(ca) >= low
+        #endif
+        return lambda ca: low <= get(ca) <= high
+    #endif
+
+    if low == high:
+        return lambda ca: get(ca) == low and then(ca)
+    elif low == None:
+        return lambda ca: get(ca) <= high and then(ca)
+    elif high == None:
+        return lambda ca: get(ca) >= low and then(ca)
+    #endif
+    return lambda ca: low <= get(ca) <= high and then(ca)
+#enddef
+
+# SUPPORT FUNCTION
+def _counted(get, counts, name):
+    """Wrap an attribute getter to count its calls in `counts[name]`."""
+    def counted_get(ca):
+        counts[name] += 1
+        return get(ca)
+    #enddef
+    return counted_get
+#enddef
 
 # TASK - DONE
 def create_filters(
@@ -215,20 +434,44 @@ def limit(iterator, n = None):
         return iterator
     #endif
 
-    # SUS
+    # Stop pulling from the iterator as soon as `n` values have been produced
+    return itertools.islice(iterator, n)
+#enddef
 
-    # This PASSED all 37 tests
-    return [x for i, x in enumerate(iterator) if i < n]
+# The `--sort-by` choices, each with the attribute of a `CloseApproach` to order by
+SORT_KEYS = ("time", "distance", "velocity", "diameter")
 
-    # This FAILED 2 test (tuple cant be use with next() func)
-    # ret_list = []
-    # for _ in range(0, n):
-    #     try:
-    #         ca = next(iterator)
-    #     except StopIteration:
-    #         return ret_list
-    #     #endtry
-    #     ret_list.append(ca)
-    # #endfor
-    # return ret_list
+def order_by(iterator, sort_by: str, n = None, descending: bool = False):
+    """Order a stream of close approaches by one of their attributes.
+
+    If `n` is given, only the first `n` approaches in that order are kept, with
+    a bounded heap of `n` entries instead of sorting the whole stream. Ties keep
+    the order of the stream, and approaches of NEOs with an unknown diameter come
+    last when ordering by diameter, whichever the direction.
+
+    :param iterator: An iterator of `CloseApproach`es.
+    :param sort_by: One of `SORT_KEYS`.
+    :param n: The maximum number of approaches to produce, or 0 or None for all of them.
+    :param descending: Whether to produce the largest values first.
+    :return: A list of the ordered approaches.
+    """
+    if sort_by == "time":
+        key = lambda ca: ca._minutes
+    elif sort_by == "distance":
+        key = operator.attrgetter("distance")
+    elif sort_by == "velocity":
+        key = operator.attrgetter("velocity")
+    elif sort_by == "diameter":
+        missing = -math.inf if descending else math.inf
+        key = lambda ca: missing if (ca.neo == None or math.isnan(ca.neo.diameter)) else ca.neo.diameter
+    else:
+        raise UnsupportedCriterionError(f"Cannot sort close approaches by {sort_by!r}.")
+    #endif
+
+    if (n == 0) or (n == None):
+        return sorted(iterator, key=key, reverse=descending)
+    elif descending:
+        return heapq.nlargest(n, iterator, key=key)
+    #endif
+    return heapq.nsmallest(n, iterator, key=key)
 #enddef
@@ -3,16 +3,37 @@
 NASA's dataset provides timestamps as naive datetimes (corresponding to UTC).
 
 The `cd_to_datetime` function converts a string, formatted as the `cd` field of
-NASA's close approach data, into a Python `datetime`
+NASA's close approach data, into a Python `datetime`.
 
 The `datetime_to_str` function converts a Python `datetime` into a string.
 Although `datetime`s already have human-readable string representations, those
 representations display seconds, but NASA's data (and our datetimes!) don't
 provide that level of resolution, so the output format also will not.
+
+The `datetime_to_minutes`, `date_to_minutes`, `cd_to_minutes` and
+`minutes_to_datetime` functions convert between datetimes (or calendar dates)
+and a compact integer count of minutes since the Unix epoch, which is all the
+resolution NASA's data has. The `cd_to_minutes_column` function converts a
+whole column of `cd` strings at once, as the data loaders do.
 """
+import array
 import datetime
+import functools
+
+
+# The English month abbreviations used by NASA's `cd` field.
+MONTHS = {name: number for number, name in enumerate(
+    ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"), start=1)}
+
+# The number of recently parsed calendar dates remembered by `cd_to_datetime`.
+CD_CACHE_SIZE = 4096
 
+# The reference point for integer timestamps, and their unit.
+EPOCH = datetime.datetime(1970, 1, 1)
+MINUTE = datetime.timedelta(minutes=1)
 
+
+@functools.lru_cache(maxsize=CD_CACHE_SIZE)
 def cd_to_datetime(calendar_date):
     """Convert a NASA-formatted calendar date/time description into a datetime.
 
@@ -23,10 +44,68 @@ def cd_to_datetime(calendar_date):
 
     This will become the Python object `datetime.datetime(2020, 12, 31, 12, 0)`.
 
+    Strings in exactly that fixed-width layout are sliced apart directly, and
+    the most recent `CD_CACHE_SIZE` results are remembered. Anything else is
+    handed to `strptime`, so the results (and errors) are the same as parsing
+    with the "%Y-%b-%d %H:%M" format.
+
     :param calendar_date: A calendar date in YYYY-bb-DD hh:mm format.
     :return: A naive `datetime` corresponding to the given calendar date and time.
     """
-    return datetime.datetime.strptime(calendar_date, "%Y-%b-%d %H:%M")
+    try:
+        return _parse_cd(calendar_date)
+    except (TypeError, ValueError, KeyError):
+        return datetime.datetime.strptime(calendar_date, "%Y-%b-%d %H:%M")
+
+
+def cd_to_minutes(calendar_date):
+    """Convert a NASA-formatted calendar date/time description into minutes since the epoch.
+
+    :param calendar_date: A calendar date in YYYY-bb-DD hh:mm format.
+    :return: The number of minutes between `EPOCH` and the given calendar date and time.
+    """
+    return (cd_to_datetime(calendar_date) - EPOCH) // MINUTE
+
+
+def cd_to_minutes_column(calendar_dates):
+    """Convert a column of NASA-formatted calendar dates into minutes since the epoch.
+
+    Rows in the fixed YYYY-bb-DD hh:mm layout parse their date only once per
+    distinct day: later rows of the same day just add their hour and minute to
+    it. Anything else goes through `cd_to_minutes`, so the results (and errors)
+    are the same as converting each row with it.
+
+    :param calendar_dates: An iterable of calendar dates in YYYY-bb-DD hh:mm format.
+    :return: An `array('q')` of the corresponding minutes since `EPOCH`, in the same order.
+    """
+    days = {}
+    minutes = array.array("q")
+    for cd in calendar_dates:
+        day = days.get(cd[:12])
+        clock = cd[12:14] + cd[15:17]
+        if (day is not None and len(cd) == 17 and cd[14] == ":" and clock.isascii() and clock.isdigit()
+                and clock[:2] < "24" and clock[2:] < "60"):
+            minutes.append(day + int(clock[:2]) * 60 + int(clock[2:]))
+            continue
+        try:
+            dt = _parse_cd(cd)
+        except (TypeError, ValueError, KeyError):
+            minutes.append(cd_to_minutes(cd))
+            continue
+        row_minutes = (dt - EPOCH) // MINUTE
+        days[cd[:12]] = row_minutes - dt.hour * 60 - dt.minute
+        minutes.append(row_minutes)
+    return minutes
+
+
+def _parse_cd(calendar_date):
+    """Slice a calendar date in the exact YYYY-bb-DD hh:mm layout, raising `ValueError` on any other layout."""
+    cd = calendar_date
+    digits = cd[0:4] + cd[9:11] + cd[12:14] + cd[15:17]
+    if (len(cd) != 17 or cd[4] != "-" or cd[8] != "-" or cd[11] != " " or cd[14] != ":"
+            or not (digits.isascii() and digits.isdigit())):
+        raise ValueError(f"{calendar_date!r} is not in the YYYY-bb-DD hh:mm layout.")
+    return datetime.datetime(int(cd[0:4]), MONTHS[cd[5:8]], int(cd[9:11]), int(cd[12:14]), int(cd[15:17]))
 
 
 def datetime_to_str(dt):
@@ -42,3 +121,30 @@ def datetime_to_str(dt):
     :return: That datetime, as a human-readable string without seconds.
     """
     return datetime.datetime.strftime(dt, "%Y-%m-%d %H:%M")
+
+
+def datetime_to_minutes(dt):
+    """Convert a naive Python datetime into whole minutes since the epoch.
+
+    :param dt: A naive Python datetime.
+    :return: The number of minutes between `EPOCH` and `dt`, as an int.
+    """
+    return (dt - EPOCH) // MINUTE
+
+
+def date_to_minutes(d):
+    """Convert a Python date into the minutes since the epoch of its midnight.
+
+    :param d: A Python date.
+    :return: The number of minutes between `EPOCH` and the start of `d`, as an int.
+    """
+    return datetime_to_minutes(datetime.datetime(d.year, d.month, d.day))
+
+
+def minutes_to_datetime(minutes):
+    """Convert whole minutes since the epoch back into a naive Python datetime.
+
+    :param minutes: A number of minutes since `EPOCH`.
+    :return: The corresponding naive `datetime`.
+    """
+    return EPOCH + datetime.timedelta(minutes=minutes)
@@ -0,0 +1,210 @@
+"""Load the data files into an `NEODatabase` in a background thread, so it can be used while it loads.
+
+A `BackgroundLoader` starts with an empty database. Its thread parses the NEOs
+first and adds them at once with `NEODatabase.add_neos`, so that NEOs can be
+looked up by designation or name as soon as the NEO file is parsed. It then
+streams the close approaches and appends them in batches with
+`NEODatabase.add_approaches`, so that queries can run over the approaches
+loaded so far. Progress is measured in characters of the close approach file
+read.
+
+The thread changes the database while holding `lock`. Hold it as well while
+using the database, so that each use sees it between two batches. Once loading
+ends, the query indexes and statistics are rebuilt from every row (see
+`NEODatabase.reindex`), so the finished database plans queries exactly like one
+loaded in a single step.
+
+With a `cache_dir`, a matching snapshot (see `snapshot`) is read instead of the
+data files, and one is saved once the data files have been loaded.
+"""
+import os
+import threading
+import time
+
+from database import NEODatabase
+from extract import load_neos, load_approaches, iter_approaches
+from snapshot import SNAPSHOT_ERRORS, snapshot_path, save_snapshot, load_snapshot
+
+# The number of close approaches added to the database at once.
+BATCH_ROWS = 20000
+
+class BackgroundLoader:
+    """Fills an `NEODatabase` from the data files in a background thread."""
+
+    def __init__(self, neo_csv_path, cad_json_path, columnar: bool = False, query_workers: int = 1,
+                 load_workers: int = 1, cache_dir=None, batch_rows: int = BATCH_ROWS):
+        """Create the empty database; `start` loads it.
+
+        :param neo_csv_path: A path to the CSV file of near-Earth objects.
+        :param cad_json_path: A path to the JSON file of close approaches.
+        :param columnar: Whether the database keeps `ApproachColumns` as a row-index cache (see `NEODatabase`).
+        :param query_workers: The number of worker processes sharing full scans of the database.
+        :param load_workers: The number of worker processes parsing the data files, which then can't be streamed.
+        :param cache_dir: The directory of snapshots of the data files, or `None` to always parse them.
+        :param batch_rows: The number of close approaches added to the database at once.
+        """
+        self.neo_csv_path = neo_csv_path
+        self.cad_json_path = cad_json_path
+        self.load_workers = load_workers
+        self.cache_dir = cache_dir
+        self.batch_rows = batch_rows
+
+        self.database = NEODatabase([], [], columnar=columnar, workers=query_workers)
+        self.lock = threading.RLock()
+        self.neos_loaded = threading.Event()
+        self.error = None
+        self.seconds = None
+        self.neo_count = self.approach_count = 0
+
+        # Progress through the close approaches, in characters of the file or in rows of a snapshot
+        self._done = 0
+        self._total = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._load, daemon=True, name="neo-load")
+    #enddef
+
+    def start(self):
+        """Start loading the data files in the background."""
+        self._thread.start()
+    #enddef
+
+    def stop(self):
+        """Stop loading after the current batch, leaving what has been loaded in the database."""
+        self._stop.set()
+        if self._thread.ident != None:
+            self._thread.join()
+        #endif
+    #enddef
+
+    @property
+    def loading(self) -> bool:
+        """Return whether the data files are still being loaded."""
+        return self._thread.is_alive()
+    #enddef
+
+    @property
+    def progress(self) -> float:
+        """Return the loaded fraction of the close approaches, or an estimate of it."""
+        if not self.loading and self._thread.ident != None:
+            return 1.0
+        elif not self._total:
+            return 0.0
+        #endif
+        return min(self._done / self._total, 1.0)
+    #enddef
+
+    def wait(self, report=None, interval: float = 0.1):
+        """Wait until the data files are loaded.
+
+        :param report: A function called with this loader every `interval` seconds while waiting, or `None`.
+        :param interval: The time between two calls of `report`, in seconds.
+        """
+        while self.loading:
+            self._thread.join(interval)
+            if report != None:
+                report(self)
+            #endif
+        #endwhile
+    #enddef
+
+    def _load(self):
+        """Background thread: fill the database with the NEOs, then with batches of close approaches."""
+        start = time.perf_counter()
+        try:
+            path = snapshot_path(self.cache_dir, self.neo_csv_path, self.cad_json_path) if self.cache_dir else None
+            snapshot = None
+            if path != None and path.exists():
+                try:
+                    snapshot = load_snapshot(path)
+                except SNAPSHOT_ERRORS:
+                    pass
+                #endtry
+            #endif
+
+            if snapshot != None:
+                neos, approaches = snapshot
+                self._add_neos(neos)
+                self._add_loaded(approaches)
+                return
+            #endif
+
+            neos = load_neos(self.neo_csv_path, workers=self.load_workers)
+            self._add_neos(neos)
+            if self.load_workers > 1:
+                approaches = load_approaches(self.cad_json_path, workers=self.load_workers)
+                self._add_loaded(approaches)
+            else:
+                self._total = os.path.getsize(self.cad_json_path)
+                approaches = self._add_streamed(iter_approaches(self.cad_json_path, progress=self._read))
+            #endif
+
+            if path != None and not self._stop.is_set():
+                try:
+                    save_snapshot(path, neos, approaches)
+                except OSError:
+                    pass
+                #endtry
+            #endif
+        except Exception as error:
+            self.error = error
+        finally:
+            self.neos_loaded.set()
+            # The batches only appended to the query indexes and statistics, so build them from every row
+            with self.lock:
+                self.database.reindex()
+            #endwith
+            self.seconds = time.perf_counter() - start
+        #endtry
+    #enddef
+
+    def _add_neos(self, neos):
+        with self.lock:
+            self.database.add_neos(neos)
+        #endwith
+        self.neo_count = len(neos)
+        self.neos_loaded.set()
+    #enddef
+
+    def _add_loaded(self, approaches):
+        """Add already parsed close approaches in batches, counting progress in rows."""
+        self._total = len(approaches)
+        for start in range(0, len(approaches), self.batch_rows):
+            if self._stop.is_set():
+                return
+            #endif
+            self._add_batch(approaches[start:start + self.batch_rows])
+            self._done = self.approach_count
+        #endfor
+    #enddef
+
+    def _add_streamed(self, approaches):
+        """Add close approaches in batches as they are parsed, and return them all."""
+        added = []
+        batch = []
+        for ca in approaches:
+            batch.append(ca)
+            if len(batch) >= self.batch_rows:
+                if self._stop.is_set():
+                    return added
+                #endif
+                self._add_batch(batch)
+                added += batch
+                batch = []
+            #endif
+        #endfor
+        self._add_batch(batch)
+        added += batch
+        return added
+    #enddef
+
+    def _add_batch(self, batch):
+        with self.lock:
+            self.database.add_approaches(batch)
+        #endwith
+        self.approach_count += len(batch)
+    #enddef
+
+    def _read(self, characters):
+        self._done = characters
+    #enddef
+#endclass
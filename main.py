@@ -5,14 +5,16 @@ See `README.md` for a detailed discussion of this project.
 
 This script can be invoked from the command line::
 
-    $ python3 main.py {inspect,query,interactive} [args]
+    $ python3 main.py {inspect,query,aggregate,interactive,build-index} [args]
 
 The `inspect` subcommand looks up an NEO by name or by primary designation, and
 optionally lists all of that NEO's known close approaches:
 
     $ python3 main.py inspect --pdes 1P
     $ python3 main.py inspect --name Halley
+    $ python3 main.py inspect --search halley
     $ python3 main.py inspect --verbose --name Halley
+    $ python3 main.py inspect --name Eros --start-date 2000-01-01 --end-date 2050-12-31 --limit 10
 
 The `query` subcommand searches for close approaches that match given criteria:
 
@@ -29,30 +31,94 @@ or JSON format:
     $ python3 main.py query --limit 5 --outfile results.csv
     $ python3 main.py query --limit 15 --outfile results.json
 
+They can also be ordered by time, distance, velocity or diameter, in which case
+the limit keeps the top matches:
+
+    $ python3 main.py query --start-date 2000-01-01 --sort-by distance --limit 20
+    $ python3 main.py query --hazardous --sort-by velocity --desc --limit 50
+
+With `--stats`, the query also reports the work it did: the index it used, the
+rows it scanned and matched, the evaluations of each criterion and its time:
+
+    $ python3 main.py query --hazardous --max-distance 0.05 --stats
+
+The `aggregate` subcommand takes the same filters as `query`, and summarizes
+the matching close approaches - their count, the approaches of hazardous NEOs,
+and the minimum, maximum and mean distance and velocity - all together or per
+`--group-by` group, without building an object per approach:
+
+    $ python3 main.py aggregate --group-by year
+    $ python3 main.py aggregate --group-by month --start-date 2020-01-01 --max-distance 0.05
+    $ python3 main.py aggregate --group-by decade --hazardous --outfile decades.csv
+
 The `interactive` subcommand loads the NEO database and spawns an interactive
 command shell that can repeatedly execute `inspect` and `query` commands without
-having to wait to reload the database each time. However, it doesn't hot-reload.
+having to wait to reload the database each time. The prompt appears at once,
+showing how much of the data has been loaded so far, while the data files are
+loaded in the background (unless `--wait` is given): `inspect` answers as soon
+as the NEOs are loaded, and `query` waits for the close approaches with a
+progress bar, or with `--partial` queries those loaded so far. When a data file
+changes, the shell parses it again in the background, and applies only the
+differences to the loaded database before a later command (but it doesn't
+reload changed code).
+It caches the matches of recent queries (see `--cache-entries` and
+`--cache-memory`), so repeating a query with another limit or output file
+doesn't search the database again. With `--stats` (or the `stats on` command),
+it keeps totals of the work done by every query, shown by the `stats` command.
 
 If needed, the script can load data from data files other than the default with
-`--neofile` or `--cadfile`.
+`--neofile` or `--cadfile`. The parsed data is saved as a binary snapshot in
+`--cache-dir` (`.cache/` by default) and reused until either data file changes;
+`--no-cache` always parses the data files, and `--load-workers N` parses them
+in N worker processes. With `--columnar`, the filterable attributes of the close
+approaches are also copied into typed columns, a row-index cache on which queries
+find their matching rows without reading each object (the objects are still
+loaded), and `--query-workers N` splits full scans between N worker processes
+sharing those columns.
+
+The `build-index` subcommand converts the data files once into a directory of
+memory-mapped binary columns, which opens almost instantly when given in place
+of either data file:
+
+    $ python3 main.py build-index data/index
+    $ python3 main.py --neofile data/index query --date 2020-03-14
+
+To find out where the time of a run goes, `--profile` prints how long each
+phase (loading, linking, filtering, sorting and writing) took, in wall-clock
+and CPU time, with the number of rows it handled - after each command, in the
+interactive shell. `--profile-out FILE` also saves a `cProfile` profile of the
+run to FILE:
+
+    $ python3 main.py --profile --profile-out query.prof query --hazardous --outfile results.csv
 """
 import argparse
 import cmd
+import contextlib
 import datetime
 import pathlib
 import shlex
 import sys
 import time
 
+import profiling
+from profiling import Profiler
 from extract import load_neos, load_approaches
+from snapshot import load_with_snapshot
+from store import build_index, is_index
+from resultcache import ResultCache, DEFAULT_MAX_ENTRIES, DEFAULT_MAX_BYTES
+from querystats import QueryStats
+from reload import Reloader
+from loader import BackgroundLoader
 from database import NEODatabase
-from filters import create_filters, limit
+from filters import create_filters, limit, order_by, SORT_KEYS
+from aggregate import GROUP_BY, write_groups_to_csv, write_groups_to_json
 from write import write_to_csv, write_to_json
 
 
 # Paths to the root of the project and the `data` subfolder.
 PROJECT_ROOT = pathlib.Path(__file__).parent.resolve()
 DATA_ROOT = PROJECT_ROOT / 'data'
+CACHE_ROOT = PROJECT_ROOT / '.cache'
 
 # The current time, for use with the kill-on-change feature of the interactive shell.
 _START = time.time()
@@ -73,42 +139,11 @@ def date_fromisoformat(date_string):
         raise argparse.ArgumentTypeError(f"'{date_string}' is not a valid date. Use YYYY-MM-DD.")
 
 
-def make_parser():
-    """Create an ArgumentParser for this script.
-
-    :return: A tuple of the top-level, inspect, and query parsers.
-    """
-    parser = argparse.ArgumentParser(
-        description="Explore past and future close approaches of near-Earth objects."
-    )
-
-    # Add arguments for custom data files.
-    parser.add_argument('--neofile', default=(DATA_ROOT / 'neos.csv'),
-                        type=pathlib.Path,
-                        help="Path to CSV file of near-Earth objects.")
-    parser.add_argument('--cadfile', default=(DATA_ROOT / 'cad.json'),
-                        type=pathlib.Path,
-                        help="Path to JSON file of close approach data.")
-    subparsers = parser.add_subparsers(dest='cmd')
-
-    # Add the `inspect` subcommand parser.
-    inspect = subparsers.add_parser('inspect',
-                                    description="Inspect an NEO by primary designation or by name.")
-    inspect.add_argument('-v', '--verbose', action='store_true',
-                         help="Additionally, print all known close approaches of this NEO.")
-    inspect_id = inspect.add_mutually_exclusive_group(required=True)
-    inspect_id.add_argument('-p', '--pdes',
-                            help="The primary designation of the NEO to inspect (e.g. '433').")
-    inspect_id.add_argument('-n', '--name',
-                            help="The IAU name of the NEO to inspect (e.g. 'Halley').")
-
-    # Add the `query` subcommand parser.
-    query = subparsers.add_parser('query',
-                                  description="Query for close approaches that "
-                                              "match a collection of filters.")
-    filters = query.add_argument_group('Filters',
-                                       description="Filter close approaches by their attributes "
-                                                   "or the attributes of their NEOs.")
+def add_filter_arguments(parser):
+    """Add the arguments of `create_filters` to the parser of a subcommand."""
+    filters = parser.add_argument_group('Filters',
+                                        description="Filter close approaches by their attributes "
+                                                    "or the attributes of their NEOs.")
     filters.add_argument('-d', '--date', type=date_fromisoformat,
                          help="Only return close approaches on the given date, "
                               "in YYYY-MM-DD format (e.g. 2020-12-31).")
@@ -144,22 +179,152 @@ def make_parser():
     filters.add_argument('--not-hazardous', dest='hazardous', default=None, action='store_false',
                          help="If specified, only return close approaches of NEOs that "
                               "are not potentially hazardous.")
+
+
+def make_parser():
+    """Create an ArgumentParser for this script.
+
+    :return: A tuple of the top-level, inspect, query, and aggregate parsers.
+    """
+    parser = argparse.ArgumentParser(
+        description="Explore past and future close approaches of near-Earth objects."
+    )
+
+    # Add arguments for custom data files.
+    parser.add_argument('--neofile', default=(DATA_ROOT / 'neos.csv'),
+                        type=pathlib.Path,
+                        help="Path to CSV file of near-Earth objects, or to a directory made by build-index.")
+    parser.add_argument('--cadfile', default=(DATA_ROOT / 'cad.json'),
+                        type=pathlib.Path,
+                        help="Path to JSON file of close approach data, or to a directory made by build-index.")
+    parser.add_argument('--cache-dir', default=CACHE_ROOT, type=pathlib.Path,
+                        help="Directory of binary snapshots of the loaded data files.")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Always parse the data files, without reading or writing a snapshot.")
+    parser.add_argument('--load-workers', type=int, default=1,
+                        help="Number of worker processes used to parse the data files.")
+    parser.add_argument('--query-workers', type=int, default=1,
+                        help="Number of worker processes sharing full scans of the close approaches.")
+    parser.add_argument('--columnar', action='store_true',
+                        help="Also copy the close approach attributes into typed columns, a row-index cache "
+                             "on which queries find their matching rows.")
+    parser.add_argument('--profile', action='store_true',
+                        help="Print the wall-clock and CPU time and the row count of each phase of the run "
+                             "(of each command, in the interactive shell).")
+    parser.add_argument('--profile-out', type=pathlib.Path, metavar='FILE',
+                        help="Save a cProfile profile of the run to FILE.")
+    subparsers = parser.add_subparsers(dest='cmd')
+
+    # Add the `inspect` subcommand parser.
+    inspect = subparsers.add_parser('inspect',
+                                    description="Inspect an NEO by primary designation or by name.")
+    inspect.add_argument('-v', '--verbose', action='store_true',
+                         help="Additionally, print all known close approaches of this NEO.")
+    window = inspect.add_argument_group('Approach window',
+                                        description="Print only some close approaches of this NEO, "
+                                                    "in time order (implies --verbose).")
+    window.add_argument('-s', '--start-date', type=date_fromisoformat,
+                        help="Only print close approaches on or after the given date, "
+                             "in YYYY-MM-DD format (e.g. 2020-12-31).")
+    window.add_argument('-e', '--end-date', type=date_fromisoformat,
+                        help="Only print close approaches on or before the given date, "
+                             "in YYYY-MM-DD format (e.g. 2020-12-31).")
+    window.add_argument('-l', '--limit', type=int,
+                        help="The maximum number of close approaches to print.")
+    inspect_id = inspect.add_mutually_exclusive_group(required=True)
+    inspect_id.add_argument('-p', '--pdes',
+                            help="The primary designation of the NEO to inspect (e.g. '433').")
+    inspect_id.add_argument('-n', '--name',
+                            help="The IAU name of the NEO to inspect (e.g. 'Halley').")
+    inspect_id.add_argument('-S', '--search', metavar='TEXT',
+                            help="List the NEOs whose name or designation best matches the text, "
+                                 "ignoring case and small typos (e.g. 'halley', 'Eros*', '2020 DB').")
+
+    # Add the `query` subcommand parser.
+    query = subparsers.add_parser('query',
+                                  description="Query for close approaches that "
+                                              "match a collection of filters.")
+    add_filter_arguments(query)
+    query.add_argument('--sort-by', choices=SORT_KEYS,
+                       help="Order the matches by this attribute, keeping the top --limit of them.")
+    query.add_argument('--desc', action='store_true',
+                       help="With --sort-by, order from the largest value to the smallest.")
     query.add_argument('-l', '--limit', type=int,
                        help="The maximum number of matches to return. "
                             "Defaults to 10 if no --outfile is given.")
     query.add_argument('-o', '--outfile', type=pathlib.Path,
                        help="File in which to save structured results. "
                             "If omitted, results are printed to standard output.")
+    query.add_argument('--stats', action='store_true',
+                       help="Report the index used, the rows scanned and matched, the evaluations "
+                            "of each criterion and the time of the query.")
+    query.add_argument('--partial', action='store_true',
+                       help="In the interactive shell, query the close approaches loaded so far "
+                            "instead of waiting for the data files to finish loading.")
+
+    # Add the `aggregate` subcommand parser.
+    aggregate = subparsers.add_parser('aggregate',
+                                      description="Summarize the close approaches that match a collection "
+                                                  "of filters: their count, the approaches of hazardous NEOs, "
+                                                  "and their minimum, maximum and mean distance and velocity, "
+                                                  "by group.")
+    add_filter_arguments(aggregate)
+    aggregate.add_argument('-g', '--group-by', choices=GROUP_BY,
+                           help="Summarize the matches per period of time, per NEO or per hazard flag, "
+                                "instead of all together.")
+    aggregate.add_argument('-l', '--limit', type=int,
+                           help="The maximum number of groups to print or save.")
+    aggregate.add_argument('-o', '--outfile', type=pathlib.Path,
+                           help="File in which to save the groups, as CSV or JSON. "
+                                "If omitted, they are printed to standard output.")
+    aggregate.add_argument('--partial', action='store_true',
+                           help="In the interactive shell, summarize the close approaches loaded so far "
+                                "instead of waiting for the data files to finish loading.")
+
+    build = subparsers.add_parser('build-index',
+                                  description="Convert the data files into a directory of memory-mapped "
+                                              "columns, to pass as --neofile or --cadfile later.")
+    build.add_argument('directory', type=pathlib.Path,
+                       help="The index directory to write (replacing an older index there).")
 
     repl = subparsers.add_parser('interactive',
                                  description="Start an interactive command session "
                                              "to repeatedly run `interact` and `query` commands.")
     repl.add_argument('-a', '--aggressive', action='store_true',
                       help="If specified, kill the session whenever a project file is modified.")
-    return parser, inspect, query
+    repl.add_argument('--cache-entries', type=int, default=DEFAULT_MAX_ENTRIES,
+                      help="The number of recent queries whose matches are kept (0 to turn caching off).")
+    repl.add_argument('--cache-memory', type=float, default=DEFAULT_MAX_BYTES / 2**20,
+                      help="The memory cap, in MiB, of the kept query matches.")
+    repl.add_argument('--stats', action='store_true',
+                      help="Keep totals of the work done by every query, shown by the `stats` command.")
+    repl.add_argument('--wait', action='store_true',
+                      help="Load the data files before starting the session, instead of in the background.")
+    return parser, inspect, query, aggregate
+
 
+def search(database, text, limit=None):
+    """Perform the `inspect --search` subcommand.
 
-def inspect(database, pdes=None, name=None, verbose=False):
+    This function prints the NEOs whose name or designation best matches the
+    text, best first, or a message if none does.
+
+    :param database: The `NEODatabase` containing data on NEOs and their close approaches.
+    :param text: The name, designation, or part of one, to search for.
+    :param limit: The maximum number of NEOs to print. Defaults to 10.
+    :return: A list of the matching `NearEarthObject`s.
+    """
+    with profiling.phase('search') as timing:
+        neos = database.search_neos(text, limit or 10)
+        timing.rows = len(neos)
+    if not neos:
+        print("No matching NEOs exist in the database.", file=sys.stderr)
+    for neo in neos:
+        print(neo)
+    return neos
+
+
+def inspect(database, pdes=None, name=None, verbose=False, start_date=None, end_date=None, limit=None):
     """Perform the `inspect` subcommand.
 
     This function fetches an NEO by designation or by name. If a matching NEO is
@@ -167,6 +332,9 @@ def inspect(database, pdes=None, name=None, verbose=False):
     all of the NEO's known close approaches is printed if `verbose=True`).
     Otherwise, a message is printed noting that there are no matching NEOs.
 
+    The close approaches are printed in time order. Giving `start_date`,
+    `end_date` or `limit` prints only that window of them, even without `verbose`.
+
     At least one of `pdes` and `name` must be given. If both are given, prefer
     to look up the NEO by the primary designation.
 
@@ -174,13 +342,17 @@ def inspect(database, pdes=None, name=None, verbose=False):
     :param pdes: The primary designation of an NEO for which to search.
     :param name: The name of an NEO for which to search.
     :param verbose: Whether to additionally print all of a matching NEO's close approaches.
+    :param start_date: A `date` on or after which the printed close approaches occur.
+    :param end_date: A `date` on or before which the printed close approaches occur.
+    :param limit: The maximum number of close approaches to print.
     :return: The matching `NearEarthObject`, or None if not found.
     """
     # Fetch the NEO of interest.
-    if pdes:
-        neo = database.get_neo_by_designation(pdes)
-    else:
-        neo = database.get_neo_by_name(name)
+    with profiling.phase('lookup'):
+        if pdes:
+            neo = database.get_neo_by_designation(pdes)
+        else:
+            neo = database.get_neo_by_name(name)
 
     # Ensure that we have received an NEO.
     if not neo:
@@ -189,9 +361,12 @@ def inspect(database, pdes=None, name=None, verbose=False):
 
     # Display information about this NEO, and optionally its close approaches if verbose.
     print(neo)
-    if verbose:
-        for approach in neo.approaches:
-            print(f"- {approach}")
+    if verbose or start_date or end_date or limit:
+        with profiling.phase('print') as timing:
+            approaches = database.get_approaches(neo, start_date, end_date, limit)
+            for approach in approaches:
+                print(f"- {approach}")
+            timing.rows = len(approaches)
     return neo
 
 
@@ -206,34 +381,131 @@ def query(database, args):
     file's extension to infer whether the file should hold CSV or JSON data, and
     then write the results to the output file in that format.
 
+    With `--stats`, the work done by the query is then printed to stderr.
+
     :param database: The `NEODatabase` containing data on NEOs and their close approaches.
     :param args: All arguments from the command line, as parsed by the top-level parser.
     """
     # Construct a collection of filters from arguments supplied at the command line.
-    filters = create_filters(
+    filters = filters_from_args(args)
+    # Record the work done by the query, in the session's stats if it keeps them.
+    stats = database.stats
+    temporary = args.stats and stats is None
+    if temporary:
+        stats = QueryStats(history=1)
+        database.set_stats(stats)
+    recorded = stats.queries if stats else 0
+
+    # Query the database with the collection of filters.
+    matches = database.query(filters)
+    try:
+        _output(matches, args)
+    finally:
+        # Closing the stream of matches records its stats, even if the output stopped early.
+        matches.close()
+        if temporary:
+            database.set_stats(None)
+    if args.stats and stats.queries > recorded:
+        print(stats.last, file=sys.stderr)
+
+
+def filters_from_args(args):
+    """Create a collection of filters from the filter arguments of a subcommand."""
+    return create_filters(
         date=args.date, start_date=args.start_date, end_date=args.end_date,
         distance_min=args.distance_min, distance_max=args.distance_max,
         velocity_min=args.velocity_min, velocity_max=args.velocity_max,
         diameter_min=args.diameter_min, diameter_max=args.diameter_max,
         hazardous=args.hazardous
     )
-    # Query the database with the collection of filters.
-    results = database.query(filters)
+
+
+def aggregate(database, args):
+    """Perform the `aggregate` subcommand.
+
+    Summarize the close approaches matching the filters of the arguments, all
+    together or by `--group-by` group, and print the groups as a table or save
+    them to the output file, as CSV or JSON by its extension.
+
+    :param database: The `NEODatabase` containing data on NEOs and their close approaches.
+    :param args: All arguments from the command line, as parsed by the top-level parser.
+    :return: The list of `Group`s, or None if the output file has another extension.
+    """
+    if args.outfile and args.outfile.suffix not in ('.csv', '.json'):
+        print("Please use an output file that ends with `.csv` or `.json`.", file=sys.stderr)
+        return None
+    with profiling.phase('aggregate') as timing:
+        groups = database.aggregate(filters_from_args(args), args.group_by)
+        timing.rows = len(groups)
+    groups = groups[:args.limit] if args.limit else groups
+
+    if args.outfile and args.outfile.suffix == '.csv':
+        with profiling.phase('write_groups_to_csv'):
+            write_groups_to_csv(groups, args.outfile)
+    elif args.outfile:
+        with profiling.phase('write_groups_to_json'):
+            write_groups_to_json(groups, args.outfile)
+    else:
+        with profiling.phase('print'):
+            print_groups(groups, args.group_by)
+    return groups
+
+
+def print_groups(groups, group_by=None):
+    """Print `Group`s as a table, one line per group."""
+    if not groups:
+        print("No close approaches match the filters.", file=sys.stderr)
+        return
+    heading = group_by or 'all'
+    print(f"{heading:<14} {'count':>9} {'hazardous':>9} {'min au':>9} {'max au':>9} {'mean au':>9} "
+          f"{'min km/s':>9} {'max km/s':>9} {'mean km/s':>9}")
+    for group in groups:
+        if group.key is None:
+            key = 'all' if group_by is None else 'unknown'
+        elif group_by == 'hazardous':
+            key = 'hazardous' if group.key else 'not hazardous'
+        else:
+            key = group.key
+        print(f"{key:<14} {group.count:>9,} {group.hazardous:>9,} {group.distance_min:>9.4f} "
+              f"{group.distance_max:>9.4f} {group.distance_mean:>9.4f} {group.velocity_min:>9.2f} "
+              f"{group.velocity_max:>9.2f} {group.velocity_mean:>9.2f}")
+
+
+def _output(matches, args):
+    """Order, limit and print or write the matches of a query, as its arguments ask."""
+    results = profiling.iterate('filter', matches)
+
+    # Keep only the top matches by the chosen attribute, if asked to.
+    if args.sort_by:
+        with profiling.phase('sort') as timing:
+            results = order_by(results, args.sort_by, args.limit or (None if args.outfile else 10),
+                               descending=args.desc)
+            timing.rows = len(results)
 
     if not args.outfile:
         # Write the results to stdout, limiting to 10 entries if not specified.
-        for result in limit(results, args.limit or 10):
-            print(result)
+        with profiling.phase('print'):
+            for result in limit(results, args.limit or 10):
+                print(result)
     else:
         # Write the results to a file.
         if args.outfile.suffix == '.csv':
-            write_to_csv(limit(results, args.limit), args.outfile)
+            with profiling.phase('write_to_csv'):
+                write_to_csv(limit(results, args.limit), args.outfile)
         elif args.outfile.suffix == '.json':
-            write_to_json(limit(results, args.limit), args.outfile)
+            with profiling.phase('write_to_json'):
+                write_to_json(limit(results, args.limit), args.outfile)
         else:
             print("Please use an output file that ends with `.csv` or `.json`.", file=sys.stderr)
 
 
+def show_progress(loader, width=40):
+    """Draw, over the current line of stderr, a progress bar of the close approaches loaded by a loader."""
+    done = int(loader.progress * width)
+    print(f"\rLoading close approaches [{'#' * done}{'.' * (width - done)}] {loader.progress:4.0%} "
+          f"({loader.approach_count:,} loaded)", end='', file=sys.stderr, flush=True)
+
+
 class NEOShell(cmd.Cmd):
     """Perform the `interactive` subcommand.
 
@@ -250,7 +522,8 @@ class NEOShell(cmd.Cmd):
              "Type `help` or `?` to list commands and `exit` to exit.\n")
     prompt = '(neo) '
 
-    def __init__(self, database, inspect_parser, query_parser, aggressive=False, **kwargs):
+    def __init__(self, database, inspect_parser, query_parser, aggressive=False, cache=None, profiler=None,
+                 stats=None, reloader=None, loader=None, aggregate_parser=None, **kwargs):
         """Create a new `NEOShell`.
 
         Creating this object doesn't start the session - for that, use `.cmdloop()`.
@@ -259,13 +532,26 @@ class NEOShell(cmd.Cmd):
         :param inspect_parser: The subparser for the `inspect` subcommand.
         :param query_parser: The subparser for the `query` subcommand.
         :param aggressive: Whether to kill the session whenever a project file is changed.
+        :param cache: A `ResultCache` for the query results of the session, or None to not cache them.
+        :param profiler: An active `Profiler` whose phases to report after each command, or None.
+        :param stats: A `QueryStats` recording the work of the session's queries, or None to not record it.
+        :param reloader: A `Reloader` of the data files of the database, or None to not watch them.
+        :param loader: A `BackgroundLoader` of the database, started with the session, or None if it is loaded.
+        :param aggregate_parser: The subparser for the `aggregate` subcommand.
         :param kwargs: A dictionary of excess keyword arguments passed to the superclass.
         """
         super().__init__(**kwargs)
         self.db = database
         self.inspect = inspect_parser
         self.query = query_parser
+        self.aggregate = aggregate_parser
         self.aggressive = aggressive
+        self.db.set_cache(cache)
+        self.profiler = profiler
+        self.db.set_stats(stats)
+        self.reloader = reloader
+        self.loader = loader
+        self.load_reported = False
 
     @classmethod
     def parse_arg_with(cls, arg, parser):
@@ -306,18 +592,39 @@ class NEOShell(cmd.Cmd):
             (neo) inspect --pdes 1P
             (neo) inspect --name Halley
 
+        Or list the NEOs best matching a partial or misspelled name or designation:
+
+            (neo) inspect --search "2020 DB"
+
         Additionally, list all known close approaches:
 
             (neo) inspect --verbose --name Eros
+
+        Or only those within a window of dates:
+
+            (neo) inspect --name Eros --start-date 2020-01-01 --end-date 2030-12-31 --limit 5
         """
         args = self.parse_arg_with(arg, self.inspect)
         if not args:
             return
 
+        # NEOs are loaded before their close approaches, so only wait for them.
+        if self.loader and not self.loader.neos_loaded.is_set():
+            print("Waiting for the NEOs to load...", file=sys.stderr)
+            self.loader.neos_loaded.wait()
+
         # Run the `inspect` subcommand.
-        inspect(self.db,
-                pdes=args.pdes, name=args.name,
-                verbose=args.verbose)
+        with self.using_database():
+            if args.search:
+                search(self.db, args.search, limit=args.limit)
+                return
+            neo = inspect(self.db,
+                          pdes=args.pdes, name=args.name,
+                          verbose=args.verbose, start_date=args.start_date,
+                          end_date=args.end_date, limit=args.limit)
+        if neo and self.loader and self.loader.loading and (args.verbose or args.start_date or args.end_date
+                                                            or args.limit):
+            print("The close approaches are still loading, so some may be missing.", file=sys.stderr)
 
     def do_q(self, arg):
         """Shorthand for `query`."""
@@ -339,18 +646,204 @@ class NEOShell(cmd.Cmd):
 
             (neo) query --limit 2
 
+        The results can be ordered with `--sort-by` (and `--desc`), keeping the top `--limit`:
+
+            (neo) query --hazardous --sort-by distance --limit 5
+
         The results can be saved to a file (instead of displayed to stdout) with
         `--outfile`:
 
             (neo) query --limit 5 --outfile results.csv
             (neo) query --limit 5 --outfile results.json
+
+        While the data files are loading, a query waits for them with a progress
+        bar (Ctrl-C stops waiting), unless `--partial` asks it to only search the
+        close approaches loaded so far:
+
+            (neo) query --partial --hazardous --limit 5
         """
         args = self.parse_arg_with(arg, self.query)
-        if not args:
+        if not args or not self.wait_for_approaches(args.partial):
             return
 
-        # Run the `inspect` subcommand.
-        query(self.db, args)
+        # Run the `query` subcommand.
+        with self.using_database():
+            self.report_partial(args.partial)
+            query(self.db, args)
+
+    def do_a(self, arg):
+        """Shorthand for `aggregate`."""
+        self.do_aggregate(arg)
+
+    def do_aggregate(self, arg):
+        """Perform the `aggregate` subcommand within the REPL session.
+
+        Summarize the close approaches matching the same filters as `query`,
+        all together or by group, for instance the approaches per year, or the
+        closest approach of each month of 2020:
+
+            (neo) aggregate --group-by year
+            (neo) aggregate --group-by month --start-date 2020-01-01 --end-date 2020-12-31
+
+        The groups can be saved to a file with `--outfile`, and `--partial`
+        summarizes the close approaches loaded so far, as with `query`.
+        """
+        args = self.parse_arg_with(arg, self.aggregate)
+        if not args or not self.wait_for_approaches(args.partial):
+            return
+
+        with self.using_database():
+            self.report_partial(args.partial)
+            aggregate(self.db, args)
+
+    def do_cache(self, arg):
+        """Report on or empty the cache of query results.
+
+        Repeating a query, even with another `--limit`, `--sort-by` or `--outfile`,
+        reuses the matches found the first time. To show the hits, misses and
+        memory use of the cache, or to empty it:
+
+            (neo) cache stats
+            (neo) cache clear
+        """
+        cache = self.db.cache
+        if cache is None:
+            print("Query results are not cached in this session.", file=sys.stderr)
+        elif arg.strip() == 'clear':
+            with self.using_database():
+                cache.clear()
+            print("Cleared the query cache.")
+        elif arg.strip() in ('', 'stats'):
+            stats = cache.stats()
+            lookups = stats['hits'] + stats['partial_hits'] + stats['misses']
+            print(f"Entries: {stats['entries']} of {stats['max_entries']}")
+            print(f"Memory: {stats['bytes'] / 2**20:.2f} MiB of {stats['max_bytes'] / 2**20:.2f} MiB")
+            print(f"Hits: {stats['hits']}, partial hits: {stats['partial_hits']}, misses: {stats['misses']}"
+                  + (f" ({(stats['hits'] + stats['partial_hits']) / lookups:.0%} reused)" if lookups else ""))
+            print(f"Evictions: {stats['evictions']}")
+        else:
+            print("Usage: cache [stats|clear]", file=sys.stderr)
+
+    def do_stats(self, arg):
+        """Report on the work done by the queries of this session.
+
+        Once turned on (or from the start, with `interactive --stats`), every query
+        records the index it used, the rows it scanned and matched, the evaluations
+        of each criterion and its time. To show the totals, the latest query, or
+        to turn recording on or off or reset the totals:
+
+            (neo) stats
+            (neo) stats last
+            (neo) stats on
+            (neo) stats off
+            (neo) stats clear
+        """
+        command = arg.strip() or 'show'
+        stats = self.db.stats
+        if command == 'on':
+            if stats is None:
+                self.db.set_stats(QueryStats())
+            print("Recording the work of every query.")
+        elif command == 'off':
+            self.db.set_stats(None)
+            print("Stopped recording the work of queries.")
+        elif command not in ('show', 'last', 'clear'):
+            print("Usage: stats [show|last|clear|on|off]", file=sys.stderr)
+        elif stats is None:
+            print("Queries are not recorded in this session; use `stats on` to start.", file=sys.stderr)
+        elif command == 'clear':
+            stats.clear()
+            print("Cleared the query stats.")
+        elif command == 'last':
+            print(stats.last or "No query has been recorded yet.")
+        else:
+            summary = stats.summary()
+            if not summary['queries']:
+                print("No query has been recorded yet.")
+                return
+            print(f"Queries: {summary['queries']}, in {summary['seconds']:.3f} s "
+                  f"(mean {summary['mean_seconds'] * 1000:.2f} ms; "
+                  f"last {summary['recent_queries']}: {summary['recent_mean_seconds'] * 1000:.2f} ms)")
+            print(f"Rows scanned: {summary['rows_scanned']:,}, matched: {summary['rows_matched']:,}")
+            print("Access paths: " + ", ".join(f"{index} {count}" for index, count in summary['indexes'].items()))
+            print("Evaluations: " + (", ".join(f"{name} {count:,}" for name, count in summary['evaluations'].items())
+                                     or "none"))
+            print("Time by criteria:")
+            for criteria, shape in summary['criteria'].items():
+                print(f"  {', '.join(criteria) or 'none'}: {shape['queries']} queries, {shape['seconds']:.3f} s")
+
+    def do_reload(self, _arg):
+        """Reload the data files now if they have changed, waiting for it.
+
+        Changed data files are otherwise reloaded in the background, and the
+        changes are applied before the next command after they are ready.
+        """
+        if not self.reloader:
+            print("The data files are not watched in this session.", file=sys.stderr)
+            return
+        if self.loader and self.loader.loading:
+            print("The data files are still loading.", file=sys.stderr)
+            return
+        self.poll_reloader()
+        if self.reloader.busy:
+            self.reloader.wait()
+            self.poll_reloader()
+        else:
+            print("The data files haven't changed.")
+
+    def poll_reloader(self):
+        """Apply the reloaded data files if they are ready, and report on reloading them."""
+        loading = self.reloader.busy
+        outcome = self.reloader.poll()
+        if isinstance(outcome, Exception):
+            print(f"Could not reload the data files: {outcome}", file=sys.stderr)
+        elif outcome is not None:
+            print(f"Reloaded the data files. {outcome}.", file=sys.stderr)
+        if self.reloader.busy and not loading:
+            print("The data files have changed; reloading them in the background.", file=sys.stderr)
+
+    def wait_for_approaches(self, partial=False):
+        """Wait for the close approaches to load, with a progress bar, unless `partial` asks not to.
+
+        :return: False if waiting was interrupted, True otherwise.
+        """
+        if partial or not (self.loader and self.loader.loading):
+            return True
+        try:
+            self.loader.wait(report=show_progress)
+        except KeyboardInterrupt:
+            print("\nStopped waiting; `--partial` uses the close approaches loaded so far.", file=sys.stderr)
+            return False
+        print(file=sys.stderr)
+        return True
+
+    def report_partial(self, partial):
+        """Tell how much of the close approaches a `--partial` command sees, if they are still loading."""
+        if partial and self.loader and self.loader.loading:
+            print(f"Using the {self.loader.approach_count:,} close approaches loaded so far "
+                  f"(about {self.loader.progress:.0%}).", file=sys.stderr)
+
+    def using_database(self):
+        """Return a context in which the background loader, if any, leaves the database alone."""
+        return self.loader.lock if self.loader else contextlib.nullcontext()
+
+    def report_loader(self):
+        """Report once that the background loading has finished, or failed."""
+        if not self.loader or self.loader.loading or self.load_reported:
+            return
+        self.load_reported = True
+        if self.loader.error:
+            print(f"Could not load the data files: {self.loader.error}", file=sys.stderr)
+        else:
+            print(f"Loaded {self.loader.neo_count:,} NEOs and {self.loader.approach_count:,} close approaches "
+                  f"in {self.loader.seconds:.1f} s.", file=sys.stderr)
+
+    def update_prompt(self):
+        """Show the progress of the background loading, if any, in the prompt."""
+        if self.loader and self.loader.loading:
+            self.prompt = f"(neo {self.loader.progress:.0%} loaded) "
+        else:
+            self.prompt = type(self).prompt
 
     def do_EOF(self, _arg):
         """Exit the interactive session."""
@@ -360,8 +853,18 @@ class NEOShell(cmd.Cmd):
     do_exit = do_EOF
     do_quit = do_EOF
 
+    def preloop(self):
+        """Start loading the data files in the background, if they aren't loaded yet."""
+        if self.loader:
+            self.loader.start()
+            self.update_prompt()
+
     def precmd(self, line):
-        """Watch for changes to the files in this project."""
+        """Watch for changes to the files in this project, and to the data files once they are loaded."""
+        self.report_loader()
+        # Changes found while loading are picked up once loaded, since the versions are those at the start.
+        if self.reloader and not (self.loader and self.loader.loading):
+            self.poll_reloader()
         changed = [f for f in PROJECT_ROOT.glob('*.py') if f.stat().st_mtime > _START]
         if changed:
             print("The following file(s) have been modified since this interactive session began: "
@@ -375,22 +878,101 @@ class NEOShell(cmd.Cmd):
                 return 'exit'
         return line
 
+    def postcmd(self, stop, line):
+        """Report the phases of the command, when profiling, and the progress of the loading."""
+        if self.profiler:
+            self.profiler.report()
+        self.report_loader()
+        self.update_prompt()
+        return stop
+
+
+def run(args, inspect_parser, query_parser, profiler=None, aggregate_parser=None):
+    """Load the database and run the chosen subcommand.
+
+    :param args: All arguments from the command line, as parsed by the top-level parser.
+    :param inspect_parser: The subparser for the `inspect` subcommand.
+    :param query_parser: The subparser for the `query` subcommand.
+    :param profiler: The active `Profiler` of the run, to report on in the interactive shell, or None.
+    :param aggregate_parser: The subparser for the `aggregate` subcommand, for the interactive shell.
+    """
+    if args.cmd == 'build-index':
+        with profiling.phase('build_index'):
+            build_index(args.neofile, args.cadfile, args.directory, workers=args.load_workers)
+        print(f"Wrote an index of {args.neofile} and {args.cadfile} to {args.directory}.", file=sys.stderr)
+        return
+
+    # Extract data from the data files (or their snapshot) into structured Python objects,
+    # or map a prebuilt index directory.
+    index_dir = next((path for path in (args.neofile, args.cadfile) if is_index(path)), None)
+    loader = None
+    if index_dir:
+        with profiling.phase('open_index'):
+            database = NEODatabase.from_index(index_dir, workers=args.query_workers)
+    elif args.cmd == 'interactive' and not args.wait:
+        # The shell starts the loader, and starts at once.
+        loader = BackgroundLoader(args.neofile, args.cadfile, columnar=args.columnar,
+                                  query_workers=args.query_workers, load_workers=args.load_workers,
+                                  cache_dir=None if args.no_cache else args.cache_dir)
+        database = loader.database
+    else:
+        if args.no_cache:
+            with profiling.phase('load_neos') as timing:
+                neos = load_neos(args.neofile, workers=args.load_workers)
+                timing.rows = len(neos)
+            with profiling.phase('load_approaches') as timing:
+                approaches = load_approaches(args.cadfile, workers=args.load_workers)
+                timing.rows = len(approaches)
+        else:
+            neos, approaches = load_with_snapshot(args.neofile, args.cadfile, args.cache_dir,
+                                                  workers=args.load_workers)
+        with profiling.phase('link', len(approaches)):
+            database = NEODatabase(neos, approaches, columnar=args.columnar, workers=args.query_workers)
+
+    # Run the chosen subcommand.
+    try:
+        if args.cmd == 'inspect' and args.search:
+            search(database, args.search, limit=args.limit)
+        elif args.cmd == 'inspect':
+            inspect(database, pdes=args.pdes, name=args.name, verbose=args.verbose,
+                    start_date=args.start_date, end_date=args.end_date, limit=args.limit)
+        elif args.cmd == 'query':
+            query(database, args)
+        elif args.cmd == 'aggregate':
+            aggregate(database, args)
+        elif args.cmd == 'interactive':
+            cache = ResultCache(args.cache_entries, int(args.cache_memory * 2**20)) if args.cache_entries > 0 else None
+            if profiler:
+                # Report the loading now, and each command's phases as it finishes.
+                profiler.report()
+            stats = QueryStats() if args.stats else None
+            # An index directory is a copy of the data files, so it isn't reloaded.
+            reloader = Reloader(database, args.neofile, args.cadfile, args.load_workers) if not index_dir else None
+            NEOShell(database, inspect_parser, query_parser, aggressive=args.aggressive, cache=cache,
+                     profiler=profiler, stats=stats, reloader=reloader, loader=loader,
+                     aggregate_parser=aggregate_parser).cmdloop()
+    finally:
+        if loader:
+            loader.stop()
+        database.close()
+
 
 def main():
     """Run the main script."""
-    parser, inspect_parser, query_parser = make_parser()
+    parser, inspect_parser, query_parser, aggregate_parser = make_parser()
     args = parser.parse_args()
 
-    # Extract data from the data files into structured Python objects.
-    database = NEODatabase(load_neos(args.neofile), load_approaches(args.cadfile))
-
-    # Run the chosen subcommand.
-    if args.cmd == 'inspect':
-        inspect(database, pdes=args.pdes, name=args.name, verbose=args.verbose)
-    elif args.cmd == 'query':
-        query(database, args)
-    elif args.cmd == 'interactive':
-        NEOShell(database, inspect_parser, query_parser, aggressive=args.aggressive).cmdloop()
+    # Without profiling, the phase hooks do nothing.
+    if not (args.profile or args.profile_out):
+        run(args, inspect_parser, query_parser, aggregate_parser=aggregate_parser)
+        return
+
+    with Profiler(args.profile_out) as profiler:
+        run(args, inspect_parser, query_parser, profiler if args.profile else None, aggregate_parser)
+    if args.profile:
+        profiler.report()
+    if args.profile_out:
+        print(f"Saved a cProfile profile of the run to {args.profile_out}.", file=sys.stderr)
 
 
 if __name__ == '__main__':
@@ -17,7 +17,7 @@ quirks of the data set, such as missing names and unknown diameters.
 
 You'll edit this file in Task 1.
 """
-from helpers import cd_to_datetime, datetime_to_str
+from helpers import cd_to_minutes, datetime_to_str, datetime_to_minutes, minutes_to_datetime
 
 import math
 
@@ -42,7 +42,11 @@ class NearEarthObject:
     A `NearEarthObject` also maintains a collection of its close approaches -
     initialized to an empty collection, but eventually populated in the
     `NEODatabase` constructor.
+
+    Instances are slotted, without a per-instance `__dict__`, since a data set
+    holds tens of thousands of them.
     """
+    __slots__ = ("designation", "name", "diameter", "hazardous", "approaches", "extra")
 
     # TASK - DONE
     def __init__(self, designation: str, name: str = None, diameter: float = float("nan"), hazardous: bool = False, approaches: list[CloseApproach] = None):
@@ -65,6 +69,9 @@ class NearEarthObject:
         else:
             self.approaches = approaches
         #endif
+
+        # Additional raw CSV columns, only set when a loader is asked for them.
+        self.extra = None
     #enddef
 
     # TASK - DONE
@@ -135,7 +142,11 @@ class CloseApproach:
     initially, this information (the NEO's primary designation) is saved in a
     private attribute, but the referenced NEO is eventually replaced in the
     `NEODatabase` constructor.
+
+    Instances are slotted, and the approach time is stored as whole minutes
+    since the epoch; the `time` datetime is only built when it is read.
     """
+    __slots__ = ("_designation", "_minutes", "distance", "velocity", "neo")
 
     # TASK - DONE
     def __init__(self, designation: str, time: str = None, distance: float = 0.0, velocity: float = 0.0):
@@ -147,7 +158,7 @@ class CloseApproach:
         :param velocity:  The velocity (km/s) (float)
         """
         self._designation = designation
-        self.time = cd_to_datetime(time)
+        self._minutes = cd_to_minutes(time)
         self.distance = distance
         self.velocity = velocity
 
@@ -155,6 +166,37 @@ class CloseApproach:
         self.neo: NearEarthObject = None
     #enddef
 
+    @classmethod
+    def from_minutes(cls, designation: str, minutes: int, distance: float = 0.0, velocity: float = 0.0):
+        """Create a new `CloseApproach` whose time is given in minutes since the epoch.
+
+        This skips parsing a calendar date, for callers that already store times as integers.
+
+        :param designation: The primary designation (str)
+        :param minutes: The date and time (UTC), in whole minutes since the epoch (int)
+        :param distance: The nominal approach distance (au) (float)
+        :param velocity:  The velocity (km/s) (float)
+        """
+        approach = cls.__new__(cls)
+        approach._designation = designation
+        approach._minutes = minutes
+        approach.distance = distance
+        approach.velocity = velocity
+        approach.neo = None
+        return approach
+    #enddef
+
+    @property
+    def time(self):
+        """Return the date and time (UTC) of this `CloseApproach` as a naive `datetime`."""
+        return minutes_to_datetime(self._minutes)
+    #enddef
+
+    @time.setter
+    def time(self, value):
+        self._minutes = datetime_to_minutes(value)
+    #enddef
+
     # TASK - DONE
     @property
     def time_str(self):
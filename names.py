@@ -0,0 +1,190 @@
+"""Search NEOs by name or designation: case-insensitive, by prefix, or approximately.
+
+A `NameIndex` holds every name and primary designation of a data set as a
+normalized key (case-folded, with runs of whitespace collapsed) in one sorted
+list, so an exact key or every key with a given prefix is found by binary search.
+
+For approximate matches, the index also maps every trigram of every key to the
+keys containing it. A key within `k` edits of the query lacks at most `3k` of
+the query's distinct trigrams, so only the keys sharing enough trigrams with the
+query are candidates, and each of them is checked with an edit distance
+computation bounded by `k`.
+
+The `search` method ranks exact matches first, then prefix matches, then
+approximate matches by their distance, returning the index of each matching NEO.
+"""
+import bisect
+import collections
+
+# The number of results returned by a search unless told otherwise.
+DEFAULT_LIMIT = 10
+
+# Queries ending with this character only match by prefix.
+PREFIX_WILDCARD = "*"
+
+# The ranks of each kind of match.
+EXACT, PREFIX, FUZZY = 0, 1, 2
+
+# A ranked search result: the NEO index, the matched key, and how it matched.
+Match = collections.namedtuple("Match", ["neo", "key", "rank", "distance"])
+
+def normalize(text: str) -> str:
+    """Return the search key of a name, designation or query: case-folded, with single spaces."""
+    return " ".join(text.casefold().split())
+#enddef
+
+def default_distance(key: str) -> int:
+    """Return the number of edits allowed when approximately matching a normalized query."""
+    return 1 if len(key) <= 5 else 2
+#enddef
+
+def trigrams(key: str) -> set:
+    """Return the distinct trigrams of a key, padded so that its first and last characters count too."""
+    padded = f"\0{key}\0"
+    return {padded[inx:inx + 3] for inx in range(len(padded) - 2)}
+#enddef
+
+def edit_distance(a: str, b: str, bound: int) -> int:
+    """Return the Levenshtein distance between two strings, or `bound + 1` if it is larger than `bound`."""
+    if abs(len(a) - len(b)) > bound:
+        return bound + 1
+    #endif
+
+    previous = list(range(len(b) + 1))
+    for inx_a, char_a in enumerate(a, start=1):
+        current = [inx_a]
+        for inx_b, char_b in enumerate(b, start=1):
+            current.append(min(previous[inx_b] + 1, current[inx_b - 1] + 1, previous[inx_b - 1] + (char_a != char_b)))
+        #endfor
+        if min(current) > bound:
+            return bound + 1
+        #endif
+        previous = current
+    #endfor
+    return min(previous[-1], bound + 1)
+#enddef
+
+class NameIndex:
+    """A sorted list and a trigram index of the names and designations of NEOs."""
+
+    def __init__(self, designations, names):
+        """Index the designation and name of every NEO.
+
+        :param designations: The primary designation of each NEO, in database order.
+        :param names: The name of each NEO, or `None` (or an empty string) if it has none.
+        """
+        entries = sorted(
+            (normalize(text), neo_inx)
+            for neo_inx, pair in enumerate(zip(designations, names))
+            for text in pair if text
+        )
+        self._keys = [key for key, _ in entries]
+        self._neos = [neo_inx for _, neo_inx in entries]
+
+        self._postings = collections.defaultdict(list)
+        for position, key in enumerate(self._keys):
+            for gram in trigrams(key):
+                self._postings[gram].append(position)
+            #endfor
+        #endfor
+    #enddef
+
+    def __len__(self):
+        return len(self._keys)
+    #enddef
+
+    def search(self, text: str, limit: int = DEFAULT_LIMIT, max_distance: int = None) -> list[Match]:
+        """Find the NEOs whose name or designation matches `text`, best first.
+
+        A query ending with `*` only matches by prefix.
+
+        :param text: The query.
+        :param limit: The maximum number of NEOs to return.
+        :param max_distance: The number of edits allowed for approximate matches, by default from `default_distance`.
+        :return: A list of `Match`es, one per NEO.
+        """
+        prefix_only = text.rstrip().endswith(PREFIX_WILDCARD)
+        query = normalize(text.rstrip().rstrip(PREFIX_WILDCARD))
+        if query == "" or limit <= 0:
+            return []
+        #endif
+
+        results = {}
+        for match in self._prefixed(query, limit):
+            results.setdefault(match.neo, match)
+        #endfor
+        # Widen the approximate search one edit at a time: closer matches rank first anyway,
+        # and a tighter bound leaves far fewer candidates to check
+        bound = default_distance(query) if max_distance == None else max_distance
+        for distance in range(1, bound + 1):
+            if prefix_only or len(results) >= limit:
+                break
+            #endif
+            for match in self._approximate(query, distance):
+                if match.neo not in results:
+                    results[match.neo] = match
+                #endif
+            #endfor
+        #endfor
+
+        ranked = sorted(results.values(), key=lambda m: (m.rank, m.distance, len(m.key), m.key))
+        return ranked[:limit]
+    #enddef
+
+    def _prefixed(self, query, limit):
+        """Generate the exact and then the prefix matches of `query`, until they cover `limit` NEOs.
+
+        A NEO may match by both its name and its designation, so keys are read
+        until `limit` distinct NEOs are found, rather than `limit` keys.
+        """
+        start = bisect.bisect_left(self._keys, query)
+        stop = bisect.bisect_right(self._keys, query, lo=start)
+        neos = set()
+        for position in range(start, stop):
+            neos.add(self._neos[position])
+            yield Match(self._neos[position], query, EXACT, 0)
+        #endfor
+
+        for position in range(stop, len(self._keys)):
+            key = self._keys[position]
+            if len(neos) >= limit or not key.startswith(query):
+                break
+            #endif
+            neos.add(self._neos[position])
+            yield Match(self._neos[position], key, PREFIX, len(key) - len(query))
+        #endfor
+    #enddef
+
+    def _approximate(self, query, bound):
+        """Generate the keys within `bound` edits of `query`, other than `query` itself."""
+        if bound <= 0:
+            return
+        #endif
+
+        grams = trigrams(query)
+        # A match lacks at most 3 trigrams of the query per edit; counting how many each key
+        # shares is much cheaper than computing the edit distance of every key sharing one
+        required = len(grams) - 3 * bound
+        if required > 0:
+            shared = collections.Counter()
+            for gram in grams:
+                shared.update(self._postings.get(gram, ()))
+            #endfor
+            candidates = [position for position, count in shared.items() if count >= required]
+        else:
+            # A short query has no such guarantee, so any shared trigram will do
+            candidates = set()
+            for gram in grams:
+                candidates.update(self._postings.get(gram, ()))
+            #endfor
+        #endif
+
+        for position in candidates:
+            key = self._keys[position]
+            distance = edit_distance(query, key, bound)
+            if 0 < distance <= bound:
+                yield Match(self._neos[position], key, FUZZY, distance)
+            #endif
+        #endfor
+    #enddef
+#endclass
@@ -0,0 +1,144 @@
+"""Evaluate full scans of the close approaches in a pool of worker processes.
+
+A `ParallelScanner` copies the `ApproachColumns` of a database into blocks of
+`multiprocessing.shared_memory` once, and starts a process pool whose workers
+map those blocks as read-only columns of their own. A query is then split into
+partitions of consecutive rows: each worker narrows its partition with
+`ApproachColumns.select` and sends back only the matching row indexes, which
+the scanner yields in row order - the same order as a serial scan.
+
+Only a few partitions per worker are in flight at any time, and more are handed
+out as the results are consumed. So a caller that stops early, such as `limit`,
+leaves the rest of the rows unscanned, and closing the generator cancels the
+partitions that haven't started yet.
+"""
+import collections
+import concurrent.futures
+import weakref
+from multiprocessing import shared_memory
+
+from columns import ApproachColumns
+from filters import Filter
+
+# The number of consecutive rows scanned by one task.
+PARTITION_ROWS = 1 << 15
+
+# The number of partitions queued per worker ahead of the consumer.
+PREFETCH = 2
+
+# The attributes of an `ApproachColumns`, in constructor order, with their `array` typecodes.
+COLUMN_TYPES = (("time", "q"), ("distance", "d"), ("velocity", "d"), ("neo", "q"), ("diameter", "d"), ("hazardous", "B"))
+
+# The columns attached by a worker process, set by `_attach_worker`.
+_worker_blocks = None
+_worker_columns = None
+
+# The `Filter` of the last query scanned by a worker process, built from its criteria by `_select_partition`.
+_worker_filter = None
+
+class ParallelScanner:
+    """A process pool scanning `ApproachColumns` held in shared memory."""
+
+    def __init__(self, columns: ApproachColumns, workers: int, partition_rows: int = PARTITION_ROWS):
+        """Copy `columns` into shared memory and start the workers.
+
+        :param columns: The `ApproachColumns` of a database.
+        :param workers: The number of worker processes.
+        :param partition_rows: The number of consecutive rows scanned by one task.
+        """
+        self.row_count = len(columns)
+        self.partition_rows = partition_rows
+        self.workers = workers
+
+        self._blocks = []
+        specs = []
+        for attribute, typecode in COLUMN_TYPES:
+            data = memoryview(getattr(columns, attribute)).cast("B")
+            # A block can't be empty, so keep at least one byte
+            block = shared_memory.SharedMemory(create=True, size=max(len(data), 1))
+            block.buf[:len(data)] = data
+            self._blocks.append(block)
+            specs.append((block.name, typecode, len(data)))
+        #endfor
+
+        self._pool = concurrent.futures.ProcessPoolExecutor(workers, initializer=_attach_worker, initargs=(specs,))
+        self._finalizer = weakref.finalize(self, _release, self._pool, self._blocks)
+    #enddef
+
+    def select(self, filters: Filter, first_row: int = 0):
+        """Generate the indexes of the rows that satisfy every criterion of `filters`, in row order.
+
+        :param filters: A `Filter` that isn't contradictory.
+        :param first_row: The first row to scan; the rows before it are skipped.
+        :yield: The matching row indexes.
+        """
+        criteria = filters.criteria
+        starts = iter(range(first_row, self.row_count, self.partition_rows))
+        pending = collections.deque()
+        try:
+            for start in starts:
+                pending.append(self._submit(criteria, start))
+                if len(pending) >= self.workers * PREFETCH:
+                    break
+                #endif
+            #endfor
+
+            while pending:
+                rows = pending.popleft().result()
+                start = next(starts, None)
+                if start != None:
+                    pending.append(self._submit(criteria, start))
+                #endif
+                yield from rows
+            #endwhile
+        finally:
+            for future in pending:
+                future.cancel()
+            #endfor
+        #endtry
+    #enddef
+
+    def close(self):
+        """Stop the workers and free the shared memory."""
+        self._finalizer()
+    #enddef
+
+    def _submit(self, criteria, start):
+        return self._pool.submit(_select_partition, criteria, start, min(start + self.partition_rows, self.row_count))
+    #enddef
+#endclass
+
+# SUPPORT FUNCTION
+def _release(pool, blocks):
+    """Shut a scanner's pool down and unlink its shared memory blocks."""
+    pool.shutdown(cancel_futures=True)
+    for block in blocks:
+        block.close()
+        block.unlink()
+    #endfor
+#enddef
+
+# SUPPORT FUNCTION
+def _attach_worker(specs):
+    """Worker initializer: map the shared blocks described by `specs` as `ApproachColumns`."""
+    global _worker_blocks, _worker_columns
+
+    _worker_blocks = [shared_memory.SharedMemory(name=name) for name, _, _ in specs]
+    _worker_columns = ApproachColumns(*(
+        block.buf[:size].cast(typecode) for block, (_, typecode, size) in zip(_worker_blocks, specs)
+    ))
+#enddef
+
+# SUPPORT FUNCTION
+def _select_partition(criteria, start, stop):
+    """Worker: return the matching row indexes within `[start, stop)`.
+
+    A query is split into many partitions, so its `Filter` is only built for the first of them.
+    """
+    global _worker_filter
+
+    if _worker_filter == None or _worker_filter.criteria != criteria:
+        _worker_filter = Filter(criteria)
+    #endif
+    return list(_worker_columns.select(_worker_filter, range(start, stop)))
+#enddef
@@ -0,0 +1,560 @@
+"""Plan how `NEODatabase.query` reaches the close approaches matching a `Filter`.
+
+A `QueryPlanner` owns the secondary indexes of a database - one `SortedIndex`
+of the approaches by time, distance, velocity, NEO diameter and NEO hazard flag -
+and a `Statistics` summary of those attributes, as equi-width histograms and
+hazard counts. Neither is built at load time: the planner reads the keys of the
+approaches, through a function such as `approach_keys` or `column_keys`, to
+gather the statistics for the first query with criteria, and to sort each
+index the first time a plan uses it.
+
+For each query, the planner estimates from the statistics how many approaches
+pass each criterion and picks the cheapest access path: a binary-searched slice
+of the index on the most selective attribute, or a plain scan of every approach
+when no criterion is selective enough to pay for the random lookups. Either way
+the candidates are visited in row order, and the remaining criteria are checked
+on each of them as a residual `Filter`, so every plan returns the same rows in
+the same order.
+
+Approaches appended later (see `NEODatabase.add_approaches`) are added to the
+statistics, once gathered, as they come, and to each built index as a small
+sorted list of pending entries, which is merged into the index arrays once it
+grows past a fraction of them. Appending rows thus costs time in proportion to
+the rows appended, with the occasional merge spread over many appends. A
+histogram that appended values fall outside of is rebuilt from every row before
+the next estimate, so its bins always match those of a single-step build.
+"""
+import array
+import bisect
+import collections
+import heapq
+import math
+
+from filters import Filter, FilterType
+
+# Relative cost of testing one approach during a sequential scan, and of
+# fetching and testing one approach found through an index.
+SCAN_ROW_COST = 1.0
+INDEX_ROW_COST = 2.0
+
+# The number of equal-width bins of each histogram.
+HISTOGRAM_BINS = 64
+
+# A `SortedIndex` merges its pending entries into its arrays once they number
+# more than this fraction of them, or than the minimum below.
+MERGE_FRACTION = 1 / 8
+MERGE_MIN_ROWS = 4096
+
+# The `array` typecode of the keys of the index on each attribute.
+INDEX_TYPECODES = {
+    FilterType.DATE: "q",
+    FilterType.DISTANCE: "d",
+    FilterType.VELOCITY: "d",
+    FilterType.DIAMETER: "d",
+    FilterType.HAZARDOUS: "d",
+}
+
+# How a query reaches its rows: `index` is the `FilterType` of the index used, or
+# `None` for a full scan, and `residual` is the `Filter` left to check on each row.
+Plan = collections.namedtuple("Plan", ["index", "estimated_rows", "residual"])
+
+class Histogram:
+    """An equi-width histogram of a numeric column, counting NaN values apart."""
+
+    def __init__(self, values, bins: int = HISTOGRAM_BINS):
+        """Build a histogram of `values`.
+
+        :param values: An iterable of numbers, possibly NaN.
+        :param bins: The number of equal-width bins between the smallest and largest value.
+        """
+        values = list(values)
+        known = [v for v in values if not math.isnan(v)]
+
+        self.total = len(values)
+        self.low = min(known) if known else 0.0
+        self.high = max(known) if known else 0.0
+        self.width = (self.high - self.low) / bins
+        self.counts = [0] * bins
+
+        for v in known:
+            self.counts[self._bin(v)] += 1
+        #endfor
+    #enddef
+
+    @classmethod
+    def from_counts(cls, low, high, total: int, counts):
+        """Rebuild a histogram from its bounds and bin counts, such as those stored in an index directory.
+
+        :param low: The smallest value counted.
+        :param high: The largest value counted.
+        :param total: The number of values, NaN values included.
+        :param counts: The count of each bin.
+        :return: A new `Histogram`.
+        """
+        histogram = cls.__new__(cls)
+        histogram.total = total
+        histogram.low = low
+        histogram.high = high
+        histogram.width = (high - low) / len(counts)
+        histogram.counts = list(counts)
+        return histogram
+    #enddef
+
+    def add(self, values, new_rows: bool = True) -> bool:
+        """Count more values, if they all fall within the bins.
+
+        Values counted this way land in the same bins as in a histogram built
+        from every value at once. A value outside `[low, high]` would move the
+        bins, so then nothing is counted, and the histogram must be rebuilt.
+
+        :param values: A list of numbers, possibly NaN.
+        :param new_rows: Whether the values are those of new rows, rather than of rows counted as NaN before.
+        :return: Whether the values were counted.
+        """
+        known = [v for v in values if v == v]
+        if known and (min(known) < self.low or max(known) > self.high):
+            return False
+        #endif
+        if new_rows:
+            self.total += len(values)
+        #endif
+        counts = self.counts
+        for v in known:
+            counts[self._bin(v)] += 1
+        #endfor
+        return True
+    #enddef
+
+    def _bin(self, value) -> int:
+        bin_inx = int((value - self.low) / self.width) if self.width > 0 else 0
+        return min(max(bin_inx, 0), len(self.counts) - 1)
+    #enddef
+
+    def fraction(self, low=None, high=None) -> float:
+        """Estimate the fraction of all values within inclusive `[low, high]` bounds.
+
+        Values are assumed to be spread evenly within each bin. A range that
+        overlaps the data is never estimated below a single value.
+
+        :param low: The lower bound, or `None` if open.
+        :param high: The upper bound, or `None` if open.
+        """
+        low = self.low if low == None else max(low, self.low)
+        high = self.high if high == None else min(high, self.high)
+        if self.total == 0 or low > high:
+            return 0.0
+        elif self.width == 0:
+            return sum(self.counts) / self.total
+        #endif
+
+        count = 0.0
+        for inx, bin_count in enumerate(self.counts):
+            bin_low = self.low + inx * self.width
+            overlap = min(bin_low + self.width, high) - max(bin_low, low)
+            if overlap > 0:
+                count += bin_count * overlap / self.width
+            #endif
+        #endfor
+        return max(count, 1.0) / self.total
+    #enddef
+#endclass
+
+class Statistics:
+    """Histograms and counts describing the approaches of a database."""
+
+    def __init__(self, minutes, distances, velocities, diameters, hazards):
+        """Gather statistics from the keys of every approach.
+
+        NEO attributes are weighted by approach, since that is what a query returns.
+
+        :param minutes: Approach times in minutes since the epoch.
+        :param distances: Approach distances in au.
+        :param velocities: Approach velocities in km/s.
+        :param diameters: The diameter of each approach's NEO, NaN if unknown or without an NEO.
+        :param hazards: The hazard flag of each approach's NEO as 1.0 or 0.0, NaN without an NEO.
+        """
+        self.row_count = len(hazards)
+        self.linked_rows = sum(1 for h in hazards if h == h)
+        self.hazardous_rows = sum(1 for h in hazards if h == 1.0)
+
+        self.histograms = {
+            FilterType.DATE: Histogram(minutes),
+            FilterType.DISTANCE: Histogram(distances),
+            FilterType.VELOCITY: Histogram(velocities),
+            FilterType.DIAMETER: Histogram(diameters),
+        }
+    #enddef
+
+    @classmethod
+    def from_counts(cls, row_count: int, linked_rows: int, hazardous_rows: int, histograms):
+        """Rebuild statistics from their counts, such as those stored in an index directory.
+
+        :param row_count: The number of approaches.
+        :param linked_rows: The number of approaches with an NEO.
+        :param hazardous_rows: The number of approaches of a potentially hazardous NEO.
+        :param histograms: A dictionary of a `Histogram` per `FilterType` other than `HAZARDOUS`.
+        :return: A new `Statistics`.
+        """
+        stats = cls.__new__(cls)
+        stats.row_count = row_count
+        stats.linked_rows = linked_rows
+        stats.hazardous_rows = hazardous_rows
+        stats.histograms = dict(histograms)
+        return stats
+    #enddef
+
+    def selectivity(self, filter_type: FilterType, low, high) -> float:
+        """Estimate the fraction of approaches within inclusive `[low, high]` bounds of an attribute.
+
+        This has the signature of an `estimate` function for `Filter.order`.
+        """
+        if self.row_count == 0:
+            return 0.0
+        elif filter_type == FilterType.HAZARDOUS:
+            wanted = low if low != None else high
+            matching = self.hazardous_rows if wanted else self.linked_rows - self.hazardous_rows
+            return matching / self.row_count
+        #endif
+        return self.histograms[filter_type].fraction(low, high)
+    #enddef
+
+    def add(self, minutes, distances, velocities, neos) -> list[FilterType]:
+        """Count new approaches.
+
+        :param minutes: A list of approach times in minutes since the epoch.
+        :param distances: A list of approach distances in au.
+        :param velocities: A list of approach velocities in km/s.
+        :param neos: The `NearEarthObject` of each approach, or `None`.
+        :return: The attributes whose histograms couldn't count the new values (see `Histogram.add`).
+        """
+        self.row_count += len(minutes)
+        values = {
+            FilterType.DATE: minutes,
+            FilterType.DISTANCE: distances,
+            FilterType.VELOCITY: velocities,
+            FilterType.DIAMETER: [neo.diameter if neo != None else math.nan for neo in neos],
+        }
+        linked = [neo for neo in neos if neo != None]
+        self.linked_rows += len(linked)
+        self.hazardous_rows += sum(1 for neo in linked if neo.hazardous)
+        return [filter_type for filter_type, histogram in self.histograms.items()
+                if not histogram.add(values[filter_type])]
+    #enddef
+
+    def link(self, neo, count: int) -> list[FilterType]:
+        """Count `count` approaches counted so far without an NEO as approaches of `neo`.
+
+        :return: The attributes whose histograms couldn't count the new values (see `Histogram.add`).
+        """
+        self.linked_rows += count
+        self.hazardous_rows += count if neo.hazardous else 0
+        if self.histograms[FilterType.DIAMETER].add([neo.diameter] * count, new_rows=False):
+            return []
+        #endif
+        return [FilterType.DIAMETER]
+    #enddef
+#endclass
+
+class SortedIndex:
+    """The approaches sorted by one attribute, for binary-searched range lookups."""
+
+    def __init__(self, keys, typecode: str = "d"):
+        """Sort the row indexes of `keys` by their key, leaving out rows whose key is NaN.
+
+        :param keys: A sequence with one key per approach.
+        :param typecode: The `array` typecode of the keys.
+        """
+        rows = [inx for inx, key in enumerate(keys) if key == key]
+        rows.sort(key=keys.__getitem__)
+        self.order = array.array("q", rows)
+        self.keys = array.array(typecode, (keys[inx] for inx in rows))
+        # Sorted (key, row) pairs inserted since, not merged into the arrays yet
+        self._pending = []
+    #enddef
+
+    @classmethod
+    def from_arrays(cls, order, keys):
+        """Wrap an already sorted index, such as one mapped from an index directory.
+
+        :param order: The row indexes, sorted by key.
+        :param keys: The key of each row in `order`.
+        :return: A new `SortedIndex`.
+        """
+        index = cls.__new__(cls)
+        index.order = order
+        index.keys = keys
+        index._pending = []
+        return index
+    #enddef
+
+    def rows(self, low=None, high=None):
+        """Return the row indexes whose key lies within inclusive `[low, high]` bounds, in key order."""
+        start = 0 if low == None else bisect.bisect_left(self.keys, low)
+        stop = len(self.keys) if high == None else bisect.bisect_right(self.keys, high)
+        if not self._pending:
+            return self.order[start:stop]
+        #endif
+
+        first = 0 if low == None else bisect.bisect_left(self._pending, (low,))
+        last = len(self._pending) if high == None else bisect.bisect_right(self._pending, (high, math.inf))
+        if first == last:
+            return self.order[start:stop]
+        #endif
+        merged = heapq.merge(zip(self.keys[start:stop], self.order[start:stop]), self._pending[first:last])
+        return array.array("q", (row for _, row in merged))
+    #enddef
+
+    def insert(self, rows, keys):
+        """Add rows to the index, leaving out those whose key is NaN.
+
+        :param rows: The row indexes to add.
+        :param keys: The key of each row.
+        """
+        added = [(key, row) for row, key in zip(rows, keys) if key == key]
+        if not added:
+            return
+        #endif
+        # Two sorted runs, which the sort merges in linear time
+        added.sort()
+        self._pending += added
+        self._pending.sort()
+        if len(self._pending) > max(len(self.keys) * MERGE_FRACTION, MERGE_MIN_ROWS):
+            self._merge()
+        #endif
+    #enddef
+
+    def _merge(self):
+        """Merge the pending entries into the index arrays, copying the runs of keys between them."""
+        old_keys = self.keys
+        keys = array.array(getattr(old_keys, "typecode", None) or old_keys.format)
+        order = array.array("q")
+        # Byte views, since the arrays may be mapped `memoryview`s
+        key_bytes, order_bytes = memoryview(old_keys).cast("B"), memoryview(self.order).cast("B")
+        key_size, order_size = keys.itemsize, order.itemsize
+        copied = 0
+        for key, row in self._pending:
+            stop = bisect.bisect_right(old_keys, key, copied)
+            keys.frombytes(key_bytes[copied * key_size:stop * key_size])
+            order.frombytes(order_bytes[copied * order_size:stop * order_size])
+            keys.append(key)
+            order.append(row)
+            copied = stop
+        #endfor
+        keys.frombytes(key_bytes[copied * key_size:])
+        order.frombytes(order_bytes[copied * order_size:])
+        self.keys, self.order = keys, order
+        self._pending = []
+    #enddef
+#endclass
+
+class QueryPlanner:
+    """Choose an access path for each query from the indexes and statistics of a database.
+
+    Nothing is built up front: the statistics are gathered for the first query
+    with criteria, and the index on an attribute is only sorted once a plan
+    uses it, so loading a database that is only inspected or queried by date
+    costs no more than linking it.
+    """
+
+    def __init__(self, keys, row_count: int):
+        """Create a planner over `row_count` approaches, reading their keys from `keys` when needed.
+
+        :param keys: A function returning the key of every approach on a `FilterType`, NaN where it has
+                     none, such as `approach_keys(approaches)` or `column_keys(columns)`.
+        :param row_count: The number of approaches.
+        """
+        self.row_count = row_count
+        self._keys = keys
+        self._indexes = {}
+        self._stats = None
+        # The attributes whose histograms appended values fell outside of, rebuilt when next read
+        self._stale = set()
+
+        # Bound once, so that `Filter.order` can tell it has already been applied
+        self.estimate = self._estimate
+    #enddef
+
+    @classmethod
+    def from_parts(cls, indexes, stats: Statistics, row_count: int, keys=None):
+        """Create a planner from indexes and statistics built earlier.
+
+        :param indexes: A dictionary of a `SortedIndex` per `FilterType`.
+        :param stats: The `Statistics` of the approaches.
+        :param row_count: The number of approaches.
+        :param keys: The key function of `QueryPlanner`, or `None` if every part is given.
+        :return: A new `QueryPlanner`.
+        """
+        planner = cls(keys, row_count)
+        planner._indexes = dict(indexes)
+        planner._stats = stats
+        return planner
+    #enddef
+
+    @property
+    def stats(self) -> Statistics:
+        """Return the `Statistics` of the approaches, gathering them on first use.
+
+        Histograms that appended values fell outside of are rebuilt from every
+        row here, so they always match statistics gathered in one step.
+        """
+        if self._stats == None:
+            self._stats = Statistics(*(self._keys(filter_type) for filter_type in FilterType))
+            self._stale.clear()
+        #endif
+        for filter_type in self._stale:
+            self._stats.histograms[filter_type] = Histogram(self._keys(filter_type))
+        #endfor
+        self._stale.clear()
+        return self._stats
+    #enddef
+
+    def index(self, filter_type: FilterType) -> SortedIndex:
+        """Return the `SortedIndex` on an attribute, sorting it on first use."""
+        index = self._indexes.get(filter_type)
+        if index == None:
+            index = self._indexes[filter_type] = SortedIndex(self._keys(filter_type), INDEX_TYPECODES[filter_type])
+        #endif
+        return index
+    #enddef
+
+    @property
+    def indexes(self) -> dict:
+        """Return the `SortedIndex` on every attribute, sorting those not built yet."""
+        return {filter_type: self.index(filter_type) for filter_type in FilterType}
+    #enddef
+
+    def _estimate(self, filter_type: FilterType, low, high) -> float:
+        return self.stats.selectivity(filter_type, low, high)
+    #enddef
+
+    def add_rows(self, start: int, approaches, neos):
+        """Index approaches appended to the database.
+
+        Only the statistics and indexes built so far are updated; the others
+        read every approach when they are built.
+
+        :param start: The row index of the first appended approach.
+        :param approaches: The appended `CloseApproach`es, in row order.
+        :param neos: The `NearEarthObject` of each appended approach, or `None` for those without one.
+        """
+        self.row_count += len(approaches)
+        if self._stats == None and not self._indexes:
+            return
+        #endif
+
+        rows = range(start, start + len(approaches))
+        keys = {
+            FilterType.DATE: [ca._minutes for ca in approaches],
+            FilterType.DISTANCE: [ca.distance for ca in approaches],
+            FilterType.VELOCITY: [ca.velocity for ca in approaches],
+            FilterType.DIAMETER: [neo.diameter if neo != None else math.nan for neo in neos],
+            FilterType.HAZARDOUS: [float(neo.hazardous) if neo != None else math.nan for neo in neos],
+        }
+        if self._stats != None:
+            self._stale.update(self._stats.add(keys[FilterType.DATE], keys[FilterType.DISTANCE],
+                                               keys[FilterType.VELOCITY], neos))
+        #endif
+        for filter_type, index in self._indexes.items():
+            index.insert(rows, keys[filter_type])
+        #endfor
+    #enddef
+
+    def link_rows(self, rows, neo):
+        """Index the NEO attributes of approaches indexed without an NEO, now linked to `neo`.
+
+        :param rows: The row indexes of the approaches.
+        :param neo: Their new `NearEarthObject`.
+        """
+        if self._stats != None:
+            self._stale.update(self._stats.link(neo, len(rows)))
+        #endif
+        if FilterType.DIAMETER in self._indexes:
+            self._indexes[FilterType.DIAMETER].insert(rows, [neo.diameter] * len(rows))
+        #endif
+        if FilterType.HAZARDOUS in self._indexes:
+            self._indexes[FilterType.HAZARDOUS].insert(rows, [float(neo.hazardous)] * len(rows))
+        #endif
+    #enddef
+
+    def plan(self, filters: Filter) -> Plan:
+        """Pick the cheapest way to find the approaches matching `filters`.
+
+        :param filters: A `Filter` that isn't contradictory.
+        :return: The chosen `Plan`.
+        """
+        best = Plan(None, self.row_count, filters)
+        best_cost = self.row_count * SCAN_ROW_COST
+
+        for filter_type in filters.filter_types:
+            estimated_rows = self.estimate(filter_type, *filters.bounds(filter_type)) * self.row_count
+            if estimated_rows * INDEX_ROW_COST < best_cost:
+                best = Plan(filter_type, estimated_rows, filters.without(filter_type))
+                best_cost = estimated_rows * INDEX_ROW_COST
+            #endif
+        #endfor
+        return best
+    #enddef
+
+    def rows(self, plan: Plan, filters: Filter):
+        """Return the candidate row indexes of a plan, in row order, or `None` to scan every row.
+
+        The rows found through an index are sorted back into row order, so that
+        the access path never changes the order of the results, nor which of
+        them a limit keeps.
+        """
+        if plan.index == None:
+            return None
+        #endif
+
+        low, high = filters.bounds(plan.index)
+        if plan.index == FilterType.HAZARDOUS:
+            low = high = float(low)
+        #endif
+        # Nearly linear for the time index, whose rows are mostly in order already
+        return array.array("q", sorted(self.index(plan.index).rows(low, high)))
+    #enddef
+#endclass
+
+def approach_keys(approaches):
+    """Return a key function for a `QueryPlanner` reading the attributes of linked `CloseApproach`es.
+
+    :param approaches: The list of `CloseApproach`es of a database, read whenever keys are needed.
+    :return: A function of a `FilterType`, returning the key of every approach.
+    """
+    def keys(filter_type):
+        if filter_type == FilterType.DATE:
+            return array.array("q", (ca._minutes for ca in approaches))
+        elif filter_type == FilterType.DISTANCE:
+            return array.array("d", (ca.distance for ca in approaches))
+        elif filter_type == FilterType.VELOCITY:
+            return array.array("d", (ca.velocity for ca in approaches))
+        elif filter_type == FilterType.DIAMETER:
+            return array.array("d", (ca.neo.diameter if ca.neo != None else math.nan for ca in approaches))
+        #endif
+        return array.array("d", (float(ca.neo.hazardous) if ca.neo != None else math.nan for ca in approaches))
+    #enddef
+    return keys
+#enddef
+
+def column_keys(columns):
+    """Return a key function for a `QueryPlanner` reading `ApproachColumns`.
+
+    :param columns: The `ApproachColumns` of a database, read whenever keys are needed.
+    :return: A function of a `FilterType`, returning the key of every approach.
+    """
+    def keys(filter_type):
+        if filter_type == FilterType.DATE:
+            return columns.time
+        elif filter_type == FilterType.DISTANCE:
+            return columns.distance
+        elif filter_type == FilterType.VELOCITY:
+            return columns.velocity
+        elif filter_type == FilterType.DIAMETER:
+            diameter = columns.diameter
+            return array.array("d", (diameter[n] if n >= 0 else math.nan for n in columns.neo))
+        #endif
+        hazardous = columns.hazardous
+        return array.array("d", (float(bool(hazardous[n])) if n >= 0 else math.nan for n in columns.neo))
+    #enddef
+    return keys
+#enddef
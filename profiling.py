@@ -0,0 +1,193 @@
+"""Time the phases of a run of the main module, and optionally profile it with `cProfile`.
+
+A `Profiler` is entered around a run. While it is active, the `phase` function
+times a block of code as a named phase - loading, linking, writing - in wall
+clock and CPU time, with the number of rows it handled, and the `iterate`
+function times each step of a lazy stream (such as the matches of a query) as
+its own phase. A phase's time excludes the phases run inside it, so a write
+phase doesn't include the filtering of the stream it consumes. `report` prints
+the phases as a table and starts a new one.
+
+With a `profile_path`, the profiler also records a `cProfile` profile of
+everything run while it is active, and dumps it to that file on exit, for
+`pstats` or a viewer such as `snakeviz`.
+
+When no profiler is active, `phase` returns a shared no-op context and
+`iterate` returns the stream itself, so the hooks cost nothing per row.
+
+CPU time is that of this process: worker processes (see `--load-workers` and
+`--query-workers`) show up as wall time only.
+"""
+import cProfile
+import sys
+import time
+
+# The profiler of the current run, if any.
+_active = None
+
+# SUPPORT CLASS
+class Phase:
+    """The timings of one phase of a run."""
+    __slots__ = ("name", "wall", "cpu", "rows", "_child_wall", "_child_cpu", "_start_wall", "_start_cpu")
+
+    def __init__(self, name: str, rows: int = None):
+        self.name = name
+        self.rows = rows
+        self.wall = self.cpu = 0.0
+        self._child_wall = self._child_cpu = 0.0
+    #enddef
+
+    def __enter__(self):
+        self._start_wall, self._start_cpu = time.perf_counter(), time.process_time()
+        return self
+    #enddef
+
+    def __exit__(self, *exc_info):
+        wall, cpu = time.perf_counter() - self._start_wall, time.process_time() - self._start_cpu
+        _active._finish(self, wall, cpu)
+    #enddef
+#endclass
+
+# SUPPORT CLASS
+class _NoPhase:
+    """Stands in for a `Phase` when no profiler is active; setting its `rows` does nothing useful."""
+    rows = None
+
+    def __enter__(self):
+        return self
+    #enddef
+
+    def __exit__(self, *exc_info):
+        pass
+    #enddef
+#endclass
+
+_NO_PHASE = _NoPhase()
+
+class Profiler:
+    """Collects the phases of a run while it is active, and optionally a `cProfile` profile of it."""
+
+    def __init__(self, profile_path=None):
+        """Create an inactive `Profiler`; enter it with `with` to activate it.
+
+        :param profile_path: The file to which to dump a `cProfile` profile on exit, or `None` not to profile.
+        """
+        self.profile_path = profile_path
+        self.phases = []
+        self._stack = []
+        self._profile = cProfile.Profile() if profile_path != None else None
+    #enddef
+
+    def __enter__(self):
+        global _active
+        _active = self
+        if self._profile != None:
+            self._profile.enable()
+        #endif
+        return self
+    #enddef
+
+    def __exit__(self, *exc_info):
+        global _active
+        if self._profile != None:
+            self._profile.disable()
+            self._profile.dump_stats(self.profile_path)
+        #endif
+        _active = None
+    #enddef
+
+    def report(self, file=None):
+        """Print a table of the phases timed since the last report, then forget them.
+
+        :param file: The stream to print to, standard error by default.
+        """
+        file = file if file != None else sys.stderr
+        if not self.phases:
+            return
+        #endif
+        print(f"{'Phase':<24} {'Wall (s)':>10} {'CPU (s)':>10} {'Rows':>12}", file=file)
+        for phase in self.phases:
+            rows = f"{phase.rows:,}" if phase.rows != None else "-"
+            print(f"{phase.name:<24} {phase.wall:>10.4f} {phase.cpu:>10.4f} {rows:>12}", file=file)
+        #endfor
+        print(f"{'total':<24} {sum(p.wall for p in self.phases):>10.4f} {sum(p.cpu for p in self.phases):>10.4f}",
+              file=file)
+        self.phases = []
+    #enddef
+
+    def _start(self, phase):
+        self.phases.append(phase)
+        self._stack.append(phase)
+        return phase
+    #enddef
+
+    def _finish(self, phase, wall, cpu):
+        """Record the total times of a phase, less those of the phases inside it, and charge them to its parent."""
+        self._stack.remove(phase)
+        phase.wall += wall - phase._child_wall
+        phase.cpu += cpu - phase._child_cpu
+        self._charge_parent(wall, cpu)
+    #enddef
+
+    def _charge_parent(self, wall, cpu):
+        if self._stack:
+            self._stack[-1]._child_wall += wall
+            self._stack[-1]._child_cpu += cpu
+        #endif
+    #enddef
+#endclass
+
+def phase(name: str, rows: int = None):
+    """Time a block of code as a phase of the active profiler, if any.
+
+    Use it as a context manager; the value it gives has a `rows` attribute to set
+    once the number of rows the phase handled is known:
+
+        with profiling.phase("load_neos") as timing:
+            neos = load_neos(path)
+            timing.rows = len(neos)
+
+    :param name: The name of the phase in the report.
+    :param rows: The number of rows the phase handles, if known in advance.
+    :return: A context manager timing the phase, or doing nothing if no profiler is active.
+    """
+    if _active == None:
+        return _NO_PHASE
+    #endif
+    return _active._start(Phase(name, rows))
+#enddef
+
+def iterate(name: str, iterable):
+    """Time the steps of a stream as a phase of the active profiler, if any, counting its items as rows.
+
+    :param name: The name of the phase in the report.
+    :param iterable: The stream to time, such as the matches of a query.
+    :return: The stream, unchanged if no profiler is active.
+    """
+    if _active == None:
+        return iterable
+    #endif
+    timing = Phase(name, 0)
+    _active.phases.append(timing)
+    return _timed(_active, timing, iter(iterable))
+#enddef
+
+# SUPPORT FUNCTION
+def _timed(profiler, timing, iterator):
+    perf_counter, process_time = time.perf_counter, time.process_time
+    while True:
+        wall, cpu = perf_counter(), process_time()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            wall, cpu = perf_counter() - wall, process_time() - cpu
+            timing.wall += wall
+            timing.cpu += cpu
+            profiler._charge_parent(wall, cpu)
+        #endtry
+        timing.rows += 1
+        yield item
+    #endwhile
+#enddef
@@ -0,0 +1,114 @@
+"""Count the work done by each query, and keep running totals over a session.
+
+When a `QueryStats` is attached to an `NEODatabase` (see `set_stats`), every
+query records a `QueryRecord`:
+
+- its criteria, as the names of the filtered attributes;
+- the access path: the sorted index it sliced (such as "date"), a full "scan",
+  or the "cache" of a `ResultCache`;
+- the rows scanned, that is the candidate rows it looked at, and the rows matched;
+- the evaluations of each criterion, which short-circuiting keeps below the
+  rows scanned for every criterion but the first;
+- the time spent producing its matches, excluding whatever consumed them.
+
+The rows and evaluations only cover what was consumed: a query stopped after
+`--limit` matches only counts the rows it reached. Full scans split between
+worker processes count their rows but not their evaluations, which happen in
+the workers.
+
+`QueryStats` adds every record to running totals, and keeps the most recent
+`history` records for averages over recent queries.
+"""
+import collections
+
+# The number of recent queries kept for the rolling averages.
+DEFAULT_HISTORY = 100
+
+class QueryRecord:
+    """The work done by one query."""
+    __slots__ = ("criteria", "index", "rows_scanned", "rows_matched", "evaluations", "seconds")
+
+    def __init__(self, criteria: tuple[str] = ()):
+        """Create an empty record.
+
+        :param criteria: The names of the filtered attributes of the query.
+        """
+        self.criteria = criteria
+        self.index = "scan"
+        self.rows_scanned = 0
+        self.rows_matched = 0
+        self.evaluations = collections.Counter()
+        self.seconds = 0.0
+    #enddef
+
+    def __str__(self):
+        evaluations = ", ".join(f"{name} {count:,}" for name, count in self.evaluations.items()) or "none"
+        return (f"Criteria: {', '.join(self.criteria) or 'none'}; access: {self.index}; "
+                f"scanned {self.rows_scanned:,} rows, matched {self.rows_matched:,}; "
+                f"evaluations: {evaluations}; {self.seconds * 1000:.2f} ms")
+    #enddef
+#endclass
+
+class QueryStats:
+    """Running totals, and a window of recent records, of the queries of a database."""
+
+    def __init__(self, history: int = DEFAULT_HISTORY):
+        """Create an empty `QueryStats`.
+
+        :param history: The number of recent records kept.
+        """
+        self.recent = collections.deque(maxlen=history)
+        self.clear()
+    #enddef
+
+    def add(self, record: QueryRecord):
+        """Add the record of a finished query to the totals."""
+        self.recent.append(record)
+        self.queries += 1
+        self.rows_scanned += record.rows_scanned
+        self.rows_matched += record.rows_matched
+        self.seconds += record.seconds
+        self.evaluations.update(record.evaluations)
+        self.indexes[record.index] += 1
+
+        shape = self.shapes.setdefault(record.criteria, [0, 0.0])
+        shape[0] += 1
+        shape[1] += record.seconds
+    #enddef
+
+    @property
+    def last(self) -> QueryRecord:
+        """Return the record of the latest query, or `None`."""
+        return self.recent[-1] if self.recent else None
+    #enddef
+
+    def clear(self):
+        """Forget every record and reset the totals."""
+        self.recent.clear()
+        self.queries = self.rows_scanned = self.rows_matched = 0
+        self.seconds = 0.0
+        self.evaluations = collections.Counter()
+        self.indexes = collections.Counter()
+        # The number of queries and their total time, per combination of criteria
+        self.shapes = {}
+    #enddef
+
+    def summary(self) -> dict:
+        """Return the totals, and the averages over all and over recent queries."""
+        recent = len(self.recent)
+        return {
+            "queries": self.queries,
+            "rows_scanned": self.rows_scanned,
+            "rows_matched": self.rows_matched,
+            "seconds": self.seconds,
+            "mean_seconds": self.seconds / self.queries if self.queries else None,
+            "recent_queries": recent,
+            "recent_mean_seconds": sum(r.seconds for r in self.recent) / recent if recent else None,
+            "recent_mean_rows_scanned": sum(r.rows_scanned for r in self.recent) / recent if recent else None,
+            "evaluations": dict(self.evaluations.most_common()),
+            "indexes": dict(self.indexes.most_common()),
+            "criteria": {criteria: {"queries": count, "seconds": seconds}
+                         for criteria, (count, seconds) in sorted(self.shapes.items(), key=lambda s: -s[1][1])},
+        }
+    #enddef
+#endclass
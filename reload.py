@@ -0,0 +1,106 @@
+"""Reload changed data files into a live `NEODatabase`, in the background.
+
+A `Reloader` remembers the size and modification time of the NEO and close
+approach data files. When `poll` finds that either file has changed, it starts
+a background thread that parses only the changed file(s) and calls
+`NEODatabase.diff` to match the new data against the live database and prepare
+the updated lookup tables and columns. Meanwhile, the database is untouched and
+can still be queried. A later `poll`, once the thread is done, applies the
+changes with `NEODatabase.apply`, which only relinks the affected NEOs.
+
+A file that changes again while it is being parsed is parsed again on the next
+`poll`, and one that can't be parsed (for instance, while it is still being
+written) is retried when it changes again.
+"""
+import os
+import threading
+
+from extract import load_neos, load_approaches
+
+# SUPPORT FUNCTION
+def file_version(path):
+    """Return the size and modification time of a file, or `None` if it doesn't exist."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    #endtry
+    return (stat.st_size, stat.st_mtime_ns)
+#enddef
+
+class Reloader:
+    """Watches the data files of a database, and updates the database when they change."""
+
+    def __init__(self, database, neo_csv_path, cad_json_path, workers: int = 1):
+        """Watch the data files a database was loaded from, as they are now.
+
+        :param database: The `NEODatabase` to update.
+        :param neo_csv_path: The CSV file of NEOs the database was loaded from.
+        :param cad_json_path: The JSON file of close approaches the database was loaded from.
+        :param workers: The number of worker processes to parse the data files with.
+        """
+        self.database = database
+        self.neo_csv_path = neo_csv_path
+        self.cad_json_path = cad_json_path
+        self.workers = workers
+        self._versions = (file_version(neo_csv_path), file_version(cad_json_path))
+        self._thread = None
+        self._result = None
+    #enddef
+
+    @property
+    def busy(self) -> bool:
+        """Return whether changed files are being loaded."""
+        return self._thread != None
+    #enddef
+
+    def poll(self):
+        """Apply finished changes, and start loading the data files if they have changed.
+
+        :return: The applied `DataChanges`, or an exception raised while loading the files, or `None`.
+        """
+        applied = None
+        if self._thread != None:
+            if self._thread.is_alive():
+                return None
+            #endif
+            self._thread = None
+            versions, outcome = self._result
+            if isinstance(outcome, Exception):
+                applied = outcome
+            else:
+                self.database.apply(outcome)
+                applied = outcome
+            #endif
+            # A failed load is only retried once the files change again
+            self._versions = versions
+        #endif
+
+        versions = (file_version(self.neo_csv_path), file_version(self.cad_json_path))
+        if versions != self._versions and None not in versions:
+            changed = [new != old for new, old in zip(versions, self._versions)]
+            self._thread = threading.Thread(target=self._load, args=(versions, changed), daemon=True,
+                                            name="neo-reload")
+            self._thread.start()
+        #endif
+        return applied
+    #enddef
+
+    def wait(self):
+        """Wait for the background load, if any, to finish; the next `poll` applies it."""
+        if self._thread != None:
+            self._thread.join()
+        #endif
+    #enddef
+
+    def _load(self, versions, changed):
+        """Background thread: parse the changed files and prepare the changes to the database."""
+        try:
+            neos = load_neos(self.neo_csv_path, workers=self.workers) if changed[0] else None
+            approaches = load_approaches(self.cad_json_path, workers=self.workers) if changed[1] else None
+            self._result = (versions, self.database.diff(neos, approaches))
+        except Exception as error:
+            self._result = (versions, error)
+        #endtry
+    #enddef
+#endclass
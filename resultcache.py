@@ -0,0 +1,124 @@
+"""Remember the rows matching recent queries, for sessions that repeat them.
+
+A `ResultCache` maps the normalized criteria of a `Filter` (its `key`) to the
+row indexes of the close approaches it matched, as an `array('q')`, in the
+order `NEODatabase.query` generated them. An entry is `complete` if the query
+ran to its end, or holds just the first rows if its consumer stopped early (for
+instance, after `--limit` results); a later run of the same query reuses those
+rows and only evaluates the rows after the last of them.
+
+Clearing the cache bumps its `generation`, so that a query still running when
+the data changes can tell that its rows must not be cached.
+
+The cache holds at most `max_entries` entries and `max_bytes` bytes of row
+indexes, evicting the least recently used entries first. A result larger than
+the whole memory cap is never cached.
+"""
+import collections
+import sys
+
+# The default number of cached queries and the default memory cap of their rows.
+DEFAULT_MAX_ENTRIES = 32
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# The cached rows of one query, and whether they are all of its rows.
+CacheEntry = collections.namedtuple("CacheEntry", ["rows", "complete"])
+
+class ResultCache:
+    """A least-recently-used cache of the row indexes matching each query."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, max_bytes: int = DEFAULT_MAX_BYTES):
+        """Create an empty `ResultCache`.
+
+        :param max_entries: The maximum number of cached queries.
+        :param max_bytes: The maximum total size of the cached row indexes, in bytes.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = collections.OrderedDict()
+        self._bytes = 0
+        self.hits = self.partial_hits = self.misses = self.evictions = 0
+        # Bumped on every `clear`
+        self.generation = 0
+    #enddef
+
+    def __len__(self):
+        return len(self._entries)
+    #enddef
+
+    def get(self, key) -> CacheEntry:
+        """Return the entry of a query and mark it as recently used, or return `None`.
+
+        :param key: The `Filter.key` of the query.
+        """
+        entry = self._entries.get(key)
+        if entry == None:
+            self.misses += 1
+            return None
+        #endif
+
+        self._entries.move_to_end(key)
+        if entry.complete:
+            self.hits += 1
+        else:
+            self.partial_hits += 1
+        #endif
+        return entry
+    #enddef
+
+    def put(self, key, rows, complete: bool):
+        """Cache the rows of a query, unless they alone exceed the memory cap.
+
+        An existing entry is only replaced by a complete one or a longer one.
+
+        :param key: The `Filter.key` of the query.
+        :param rows: The matching row indexes, as an `array('q')`.
+        :param complete: Whether `rows` holds all of the matching rows.
+        """
+        size = sys.getsizeof(rows)
+        if size > self.max_bytes or self.max_entries <= 0:
+            return
+        #endif
+
+        old = self._entries.get(key)
+        if old != None:
+            if not complete and (old.complete or len(old.rows) >= len(rows)):
+                return
+            #endif
+            self._remove(key)
+        #endif
+
+        self._entries[key] = CacheEntry(rows, complete)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+        #endwhile
+    #enddef
+
+    def clear(self):
+        """Drop every entry, reset the counters and bump the generation."""
+        self._entries.clear()
+        self.generation += 1
+        self._bytes = 0
+        self.hits = self.partial_hits = self.misses = self.evictions = 0
+    #enddef
+
+    def stats(self) -> dict:
+        """Return the counters, the number of entries and their memory use."""
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "partial_hits": self.partial_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+    #enddef
+
+    def _remove(self, key):
+        self._bytes -= sys.getsizeof(self._entries.pop(key).rows)
+    #enddef
+#endclass
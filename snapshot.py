@@ -0,0 +1,165 @@
+"""Cache the extracted NEOs and close approaches in a compact binary snapshot.
+
+Parsing `neos.csv` and `cad.json` dominates the start-up time of every run of
+the main module. The `load_with_snapshot` function does that work once, then
+saves the result as a snapshot file: the NEO attributes as plain lists and typed
+arrays, and each close approach as its NEO index, its time in minutes since the
+epoch, its distance and its velocity. Later runs rebuild the objects straight
+from those columns without parsing any text.
+
+A snapshot is named after the resolved paths, sizes and modification times of
+both data files, so editing or replacing either file simply stops matching the
+old snapshot, which is then removed the next time a snapshot is saved.
+"""
+import array
+import hashlib
+import os
+import pathlib
+import pickle
+import tempfile
+
+import profiling
+from extract import load_neos, load_approaches
+from models import NearEarthObject, CloseApproach
+
+# Identifies the snapshot layout; bump it whenever the layout changes.
+MAGIC = b"NEOSNAP1\n"
+
+# The errors of reading a snapshot that is missing, truncated, or of another layout; the data files are the fallback.
+SNAPSHOT_ERRORS = (OSError, ValueError, EOFError, pickle.UnpicklingError, KeyError, TypeError, IndexError)
+
+def snapshot_path(cache_dir, neo_csv_path, cad_json_path) -> pathlib.Path:
+    """Return the snapshot file for the current versions of the two data files.
+
+    :param cache_dir: The directory holding snapshots.
+    :param neo_csv_path: A path to the CSV file of near-Earth objects.
+    :param cad_json_path: A path to the JSON file of close approaches.
+    :return: The path of the matching snapshot, whether or not it exists yet.
+    """
+    paths = [pathlib.Path(p).resolve() for p in (neo_csv_path, cad_json_path)]
+    stats = [p.stat() for p in paths]
+
+    source_key = hashlib.sha1("\0".join(str(p) for p in paths).encode()).hexdigest()[:16]
+    version_key = hashlib.sha1("\0".join(f"{s.st_size}:{s.st_mtime_ns}" for s in stats).encode()).hexdigest()[:16]
+    return pathlib.Path(cache_dir) / f"neo-{source_key}-{version_key}.snap"
+#enddef
+
+def save_snapshot(path, neos, approaches):
+    """Write unlinked NEOs and close approaches to a snapshot file.
+
+    Older snapshots of the same data files are removed. The file is written
+    under a temporary name of its own and moved into place, so neither a reader
+    nor another process saving the same snapshot ever sees half of it.
+
+    :param path: The snapshot file to write, as returned by `snapshot_path`.
+    :param neos: A list of `NearEarthObject`s.
+    :param approaches: A list of `CloseApproach`es.
+    """
+    path = pathlib.Path(path)
+    neo_inx = {neo.designation: inx for inx, neo in enumerate(neos)}
+
+    neo_of_approach = array.array("q", (neo_inx.get(ca._designation, -1) for ca in approaches))
+    content = {
+        "designation": [neo.designation for neo in neos],
+        "name": [neo.name for neo in neos],
+        "diameter": array.array("d", (neo.diameter for neo in neos)),
+        "hazardous": bytes(bool(neo.hazardous) for neo in neos),
+        "neo": neo_of_approach,
+        "time": array.array("q", (ca._minutes for ca in approaches)),
+        "distance": array.array("d", (ca.distance for ca in approaches)),
+        "velocity": array.array("d", (ca.velocity for ca in approaches)),
+        # Approaches of unknown NEOs keep their own designation
+        "orphans": {inx: approaches[inx]._designation for inx, n in enumerate(neo_of_approach) if n < 0},
+    }
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    snap_file = tempfile.NamedTemporaryFile(dir=path.parent, prefix=path.name + ".", suffix=".tmp", delete=False)
+    try:
+        with snap_file:
+            snap_file.write(MAGIC)
+            pickle.dump(content, snap_file, protocol=pickle.HIGHEST_PROTOCOL)
+        #endwith
+        os.replace(snap_file.name, path)
+    except BaseException:
+        os.unlink(snap_file.name)
+        raise
+    #endtry
+
+    source_prefix = path.name.rsplit("-", 1)[0] + "-"
+    for stale in path.parent.glob(source_prefix + "*.snap"):
+        if stale != path:
+            stale.unlink()
+        #endif
+    #endfor
+#enddef
+
+def load_snapshot(path):
+    """Read unlinked NEOs and close approaches back from a snapshot file.
+
+    :param path: The snapshot file to read.
+    :return: A tuple of a list of `NearEarthObject`s and a list of `CloseApproach`es.
+    :raise ValueError: If the file isn't a snapshot in the current layout.
+    """
+    with open(path, "rb") as snap_file:
+        if snap_file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a snapshot of this version.")
+        #endif
+        content = pickle.load(snap_file)
+    #endwith
+
+    neos = [NearEarthObject(*row) for row in zip(content["designation"], content["name"],
+                                                  content["diameter"], map(bool, content["hazardous"]))]
+
+    designations = content["designation"]
+    orphans = content["orphans"]
+    approaches = [
+        CloseApproach.from_minutes(designations[n] if n >= 0 else orphans[inx], minutes, distance, velocity)
+        for inx, (n, minutes, distance, velocity)
+        in enumerate(zip(content["neo"], content["time"], content["distance"], content["velocity"]))
+    ]
+    return neos, approaches
+#enddef
+
+def load_with_snapshot(neo_csv_path, cad_json_path, cache_dir, workers: int = 1):
+    """Load NEOs and close approaches from a matching snapshot, or parse the data files and save one.
+
+    A snapshot that can't be read is ignored, and a snapshot that can't be
+    written (for instance, in a read-only directory) is skipped: either way the
+    data files themselves are the fallback.
+
+    :param neo_csv_path: A path to the CSV file of near-Earth objects.
+    :param cad_json_path: A path to the JSON file of close approaches.
+    :param cache_dir: The directory holding snapshots.
+    :param workers: The number of worker processes to parse the data files with.
+    :return: A tuple of a list of `NearEarthObject`s and a list of `CloseApproach`es, not yet linked.
+    """
+    path = snapshot_path(cache_dir, neo_csv_path, cad_json_path)
+    if path.exists():
+        try:
+            with profiling.phase("load_snapshot") as timing:
+                neos, approaches = load_snapshot(path)
+                timing.rows = len(approaches)
+            #endwith
+            return neos, approaches
+        except SNAPSHOT_ERRORS:
+            pass
+        #endtry
+    #endif
+
+    with profiling.phase("load_neos") as timing:
+        neos = load_neos(neo_csv_path, workers=workers)
+        timing.rows = len(neos)
+    #endwith
+    with profiling.phase("load_approaches") as timing:
+        approaches = load_approaches(cad_json_path, workers=workers)
+        timing.rows = len(approaches)
+    #endwith
+    try:
+        with profiling.phase("save_snapshot", len(approaches)):
+            save_snapshot(path, neos, approaches)
+        #endwith
+    except OSError:
+        pass
+    #endtry
+    return neos, approaches
+#enddef
@@ -0,0 +1,376 @@
+"""Build and open an on-disk index of NEOs and close approaches as memory-mapped columns.
+
+The `build_index` function parses `neos.csv` and `cad.json` once and writes a
+directory of fixed-width binary files, one per column, in native byte order:
+
+- the NEO columns (diameter, hazard flag) and the approach columns (NEO index,
+  time in minutes since the epoch, distance, velocity);
+- string tables for the designations and names of the NEOs, each an array of
+  offsets into a block of UTF-8 text;
+- the approaches of each NEO in time order, as start offsets into an array of
+  row indexes;
+- the NEOs sorted by designation and by name, for binary-searched lookups;
+- the sorted `QueryPlanner` index on each filterable attribute, and the bin
+  counts of its histograms.
+
+A `manifest.json` file describes the layout, and holds the other column
+statistics as plain numbers. The `open_index` function maps
+every file with `mmap` without reading it, so opening an index only reads the
+manifest and the column statistics, whatever the size of the data set, and the
+operating system pages in only the parts of the columns that a query actually
+touches. NEOs and close approaches are materialized as objects on first access,
+and kept in dictionaries by position so that each is built at most once, with
+memory growing with the objects built rather than with the rows of the index.
+"""
+import array
+import bisect
+import collections.abc
+import json
+import mmap
+import os
+import pathlib
+import shutil
+import sys
+import tempfile
+
+from models import NearEarthObject, CloseApproach
+from columns import ApproachColumns
+from extract import load_neos, load_approaches
+from filters import FilterType
+from planner import QueryPlanner, SortedIndex, Statistics, Histogram, column_keys
+
+# Identifies the index layout; bump it whenever the layout changes.
+INDEX_FORMAT = 3
+
+MANIFEST_NAME = "manifest.json"
+
+def is_index(path) -> bool:
+    """Return whether `path` is a directory built by `build_index`."""
+    return (pathlib.Path(path) / MANIFEST_NAME).is_file()
+#enddef
+
+def build_index(neo_csv_path, cad_json_path, index_dir, workers: int = 1):
+    """Parse the data files and write them as an index directory.
+
+    The index is written to a temporary directory next to `index_dir` and moved
+    into place, replacing an older index at the same path.
+
+    :param neo_csv_path: A path to the CSV file of near-Earth objects.
+    :param cad_json_path: A path to the JSON file of close approaches.
+    :param index_dir: The directory to create.
+    :param workers: The number of worker processes to parse the data files with.
+    :raise FileExistsError: If `index_dir` exists and isn't an index.
+    """
+    index_dir = pathlib.Path(index_dir)
+    if index_dir.exists() and not is_index(index_dir):
+        raise FileExistsError(f"{index_dir} exists and is not an index directory.")
+    #endif
+
+    neos = load_neos(neo_csv_path, workers=workers)
+    approaches = load_approaches(cad_json_path, workers=workers)
+
+    neo_inx = {neo.designation: inx for inx, neo in enumerate(neos)}
+    neo_of_row = array.array("q", (neo_inx.get(ca._designation, -1) for ca in approaches))
+
+    # The rows of each NEO's approaches, in time order like `NEODatabase` links them
+    rows_of_neo = [[] for _ in neos]
+    for row, n in enumerate(neo_of_row):
+        if n >= 0:
+            rows_of_neo[n].append(row)
+        #endif
+    #endfor
+    approach_start = array.array("q", [0])
+    approach_rows = array.array("q")
+    for rows in rows_of_neo:
+        rows.sort(key=lambda row: approaches[row]._minutes)
+        approach_rows.extend(rows)
+        approach_start.append(len(approach_rows))
+    #endfor
+    orphan_rows = array.array("q", (inx for inx, n in enumerate(neo_of_row) if n < 0))
+
+    named = [inx for inx, neo in enumerate(neos) if neo.name]
+    columns = {
+        "neo_diameter": array.array("d", (neo.diameter for neo in neos)),
+        "neo_hazardous": array.array("B", (bool(neo.hazardous) for neo in neos)),
+        "neo_approach_start": approach_start,
+        "neo_approach_rows": approach_rows,
+        "designation_order": array.array("q", sorted(range(len(neos)), key=lambda inx: neos[inx].designation)),
+        "name_order": array.array("q", sorted(named, key=lambda inx: neos[inx].name)),
+        "ca_neo": neo_of_row,
+        "ca_time": array.array("q", (ca._minutes for ca in approaches)),
+        "ca_distance": array.array("d", (ca.distance for ca in approaches)),
+        "ca_velocity": array.array("d", (ca.velocity for ca in approaches)),
+        "orphan_rows": orphan_rows,
+    }
+    for prefix, strings in (("neo_designation", [neo.designation for neo in neos]),
+                            ("neo_name", [neo.name or "" for neo in neos]),
+                            ("orphan_designation", [approaches[inx]._designation for inx in orphan_rows])):
+        columns[prefix + "_offsets"], columns[prefix + "_text"] = _string_table(strings)
+    #endfor
+    planner = QueryPlanner(column_keys(ApproachColumns(columns["ca_time"], columns["ca_distance"],
+                                                       columns["ca_velocity"], neo_of_row, columns["neo_diameter"],
+                                                       columns["neo_hazardous"])), len(approaches))
+    for filter_type, index in planner.indexes.items():
+        columns[f"index_{filter_type.name.lower()}_order"] = index.order
+        columns[f"index_{filter_type.name.lower()}_keys"] = index.keys
+    #endfor
+    stats = planner.stats
+    histograms = {}
+    for filter_type, histogram in stats.histograms.items():
+        columns[f"histogram_{filter_type.name.lower()}_counts"] = array.array("q", histogram.counts)
+        histograms[filter_type.name.lower()] = {"low": histogram.low, "high": histogram.high,
+                                                "total": histogram.total}
+    #endfor
+
+    manifest = {
+        "format": INDEX_FORMAT,
+        "byteorder": sys.byteorder,
+        "neos": len(neos),
+        "approaches": len(approaches),
+        "sources": [str(pathlib.Path(p).resolve()) for p in (neo_csv_path, cad_json_path)],
+        "columns": {name: column.typecode for name, column in columns.items()},
+        "statistics": {
+            "row_count": stats.row_count,
+            "linked_rows": stats.linked_rows,
+            "hazardous_rows": stats.hazardous_rows,
+            "histograms": histograms,
+        },
+    }
+
+    index_dir.parent.mkdir(parents=True, exist_ok=True)
+    temp_dir = pathlib.Path(tempfile.mkdtemp(prefix=index_dir.name + ".", dir=index_dir.parent))
+    try:
+        for name, column in columns.items():
+            with open(temp_dir / (name + ".bin"), "wb") as column_file:
+                column.tofile(column_file)
+            #endwith
+        #endfor
+        # The manifest goes last: a directory without one is never mistaken for an index
+        with open(temp_dir / MANIFEST_NAME, "w") as manifest_file:
+            json.dump(manifest, manifest_file, indent=4)
+        #endwith
+
+        if index_dir.exists():
+            shutil.rmtree(index_dir)
+        #endif
+        os.replace(temp_dir, index_dir)
+    except BaseException:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
+    #endtry
+#enddef
+
+def open_index(index_dir):
+    """Map the columns of an index directory.
+
+    :param index_dir: A directory written by `build_index`.
+    :return: A `MappedDataset`.
+    :raise ValueError: If the directory holds an index of another format or byte order.
+    """
+    return MappedDataset(index_dir)
+#enddef
+
+# SUPPORT CLASS
+class StringTable(collections.abc.Sequence):
+    """A sequence of strings decoded on access from mapped offsets and UTF-8 text."""
+
+    def __init__(self, offsets, text):
+        self._offsets = offsets
+        self._text = text
+    #enddef
+
+    def __len__(self):
+        return len(self._offsets) - 1
+    #enddef
+
+    def __getitem__(self, inx):
+        if not 0 <= inx < len(self):
+            raise IndexError("string table index out of range")
+        #endif
+        return str(self._text[self._offsets[inx]:self._offsets[inx + 1]], "utf-8")
+    #enddef
+#endclass
+
+# SUPPORT CLASS
+class SortedLookup:
+    """Find the position of a string in a `StringTable` through a sorted permutation of it.
+
+    It has the `get` method of the dictionaries that `NEODatabase` uses for lookups.
+    """
+
+    def __init__(self, strings: StringTable, order):
+        self._strings = strings
+        self._order = order
+    #enddef
+
+    def __len__(self):
+        return len(self._order)
+    #enddef
+
+    def __getitem__(self, inx):
+        return self._strings[self._order[inx]]
+    #enddef
+
+    def get(self, key, default=None):
+        """Return the position in the table of `key`, or `default` if it isn't there."""
+        inx = bisect.bisect_left(self, key)
+        if inx < len(self) and self[inx] == key:
+            return self._order[inx]
+        #endif
+        return default
+    #enddef
+#endclass
+
+class MappedDataset:
+    """The memory-mapped columns of an index, materializing objects on access."""
+
+    def __init__(self, index_dir):
+        """Map every column of an index directory.
+
+        :param index_dir: A directory written by `build_index`.
+        :raise ValueError: If the directory holds an index of another format or byte order.
+        """
+        self.path = pathlib.Path(index_dir)
+        with open(self.path / MANIFEST_NAME) as manifest_file:
+            manifest = json.load(manifest_file)
+        #endwith
+        if manifest.get("format") != INDEX_FORMAT or manifest.get("byteorder") != sys.byteorder:
+            raise ValueError(f"{self.path} is not an index of this version. Rebuild it with `build-index`.")
+        #endif
+
+        col = {name: _map_column(self.path / (name + ".bin"), typecode)
+               for name, typecode in manifest["columns"].items()}
+        stats = manifest["statistics"]
+        histograms = {FilterType[name.upper()]: Histogram.from_counts(bounds["low"], bounds["high"], bounds["total"],
+                                                                      col[f"histogram_{name}_counts"])
+                      for name, bounds in stats["histograms"].items()}
+
+        self.designations = StringTable(col["neo_designation_offsets"], col["neo_designation_text"])
+        self.names = StringTable(col["neo_name_offsets"], col["neo_name_text"])
+        self.designation_lookup = SortedLookup(self.designations, col["designation_order"])
+        self.name_lookup = SortedLookup(self.names, col["name_order"])
+        self.columns = ApproachColumns(col["ca_time"], col["ca_distance"], col["ca_velocity"], col["ca_neo"],
+                                       col["neo_diameter"], col["neo_hazardous"])
+        self.planner = QueryPlanner.from_parts(
+            {filter_type: SortedIndex.from_arrays(col[f"index_{filter_type.name.lower()}_order"],
+                                                  col[f"index_{filter_type.name.lower()}_keys"])
+             for filter_type in FilterType},
+            Statistics.from_counts(stats["row_count"], stats["linked_rows"], stats["hazardous_rows"], histograms),
+            manifest["approaches"], column_keys(self.columns))
+
+        self._approach_start = col["neo_approach_start"]
+        self._approach_rows = col["neo_approach_rows"]
+        self._orphans = (col["orphan_rows"], StringTable(col["orphan_designation_offsets"],
+                                                         col["orphan_designation_text"]))
+
+        # The objects built so far, by position
+        self._neo_objects = {}
+        self._approach_objects = {}
+        self.neos = _LazySequence(self._neo_objects, manifest["neos"], self.neo)
+        self.approaches = _LazySequence(self._approach_objects, manifest["approaches"], self.approach)
+    #enddef
+
+    def neo(self, inx: int) -> NearEarthObject:
+        """Return the `NearEarthObject` at position `inx`, linked to its close approaches."""
+        neo = self._neo_objects.get(inx)
+        if neo == None:
+            neo = NearEarthObject(self.designations[inx], self.names[inx] or None,
+                                  self.columns.diameter[inx], bool(self.columns.hazardous[inx]))
+            for row in self._approach_rows[self._approach_start[inx]:self._approach_start[inx + 1]]:
+                approach = self._build_approach(row, neo.designation)
+                approach.neo = neo
+                neo.approaches.append(approach)
+            #endfor
+            self._neo_objects[inx] = neo
+        #endif
+        return neo
+    #enddef
+
+    def approach(self, inx: int) -> CloseApproach:
+        """Return the `CloseApproach` at row `inx`, linked to its NEO."""
+        approach = self._approach_objects.get(inx)
+        if approach == None:
+            neo_inx = self.columns.neo[inx]
+            if neo_inx >= 0:
+                # Building the NEO builds all of its approaches, this one included
+                self.neo(neo_inx)
+                return self._approach_objects[inx]
+            #endif
+            rows, designations = self._orphans
+            approach = self._build_approach(inx, designations[bisect.bisect_left(rows, inx)])
+        #endif
+        return approach
+    #enddef
+
+    def _build_approach(self, row, designation):
+        columns = self.columns
+        approach = CloseApproach.from_minutes(designation, columns.time[row], columns.distance[row], columns.velocity[row])
+        self._approach_objects[row] = approach
+        return approach
+    #enddef
+#endclass
+
+# SUPPORT CLASS
+class _LazySequence(collections.abc.Sequence):
+    """A sequence of objects built by `build(inx)` the first time they are read, to which built objects can be appended.
+
+    The objects are kept in a dictionary by position, which holds only those built or appended so far.
+    """
+
+    def __init__(self, objects: dict, length: int, build):
+        self._objects = objects
+        self._length = length
+        self._build = build
+    #enddef
+
+    def __len__(self):
+        return self._length
+    #enddef
+
+    def __getitem__(self, inx):
+        if inx < 0:
+            inx += self._length
+        #endif
+        if not 0 <= inx < self._length:
+            raise IndexError("lazy sequence index out of range")
+        #endif
+        obj = self._objects.get(inx)
+        return obj if obj != None else self._build(inx)
+    #enddef
+
+    def append(self, obj):
+        self._objects[self._length] = obj
+        self._length += 1
+    #enddef
+
+    def extend(self, objects):
+        for obj in objects:
+            self.append(obj)
+        #endfor
+    #enddef
+#endclass
+
+# SUPPORT FUNCTION
+def _map_column(path, typecode):
+    """Map a column file read-only, as a `memoryview` of items of `typecode`."""
+    with open(path, "rb") as column_file:
+        if os.fstat(column_file.fileno()).st_size == 0:
+            # An empty file can't be mapped
+            return memoryview(array.array(typecode))
+        #endif
+        mapped = mmap.mmap(column_file.fileno(), 0, access=mmap.ACCESS_READ)
+    #endwith
+    return memoryview(mapped).cast(typecode)
+#enddef
+
+# SUPPORT FUNCTION
+def _string_table(strings):
+    """Encode strings as an `array('q')` of offsets and an `array('B')` of UTF-8 text."""
+    offsets = array.array("q", [0])
+    text = array.array("B")
+    for string in strings:
+        text.frombytes(string.encode("utf-8"))
+        offsets.append(len(text))
+    #endfor
+    return offsets, text
+#enddef
@@ -0,0 +1,427 @@
+"""Generate synthetic NEO and close approach data files of any size, for scale testing.
+
+`generate` writes a `neos.csv` with every column of NASA's small-body database
+export and a `cad.json` with every field of NASA's close approach data API, so
+that the files load through `load_neos` and `load_approaches` like the real ones.
+The output is deterministic: the same size and seed always produce the same
+bytes.
+
+The values follow the distributions of the real data (as sampled by the test
+files), roughly:
+
+- about 10% of NEOs are numbered, and about 5% of those are named; a handful are
+  periodic comets; the rest only have a provisional designation such as "2020 GO2";
+- about 3.6% of NEOs have a diameter, and about 8.6% are potentially hazardous,
+  with a few of unknown magnitude and hazard;
+- approaches are spread over 1900-2200 and listed in time order, as the API
+  lists them, and the number of approaches of each NEO is heavy-tailed, so a few
+  NEOs have hundreds of approaches and many have none;
+- there are about 17 approaches per NEO, as in the full datasets.
+
+Files are written row by row, so even 10M approaches need memory only for the
+designations, orbit ids and magnitudes of the NEOs.
+
+    $ python3 synthetic.py data/synthetic --approaches 10000000
+"""
+import argparse
+import bisect
+import csv
+import datetime
+import json
+import pathlib
+import random
+
+from extract import CAD_FIELDS
+
+# The columns of NASA's small-body database export, in order.
+NEO_FIELDS = (
+    "id", "spkid", "full_name", "pdes", "name", "prefix", "neo", "pha", "H", "G", "M1", "M2", "K1", "K2", "PC",
+    "diameter", "extent", "albedo", "rot_per", "GM", "BV", "UB", "IR", "spec_B", "spec_T", "H_sigma",
+    "diameter_sigma", "orbit_id", "epoch", "epoch_mjd", "epoch_cal", "equinox", "e", "a", "q", "i", "om", "w", "ma",
+    "ad", "n", "tp", "tp_cal", "per", "per_y", "moid", "moid_ld", "moid_jup", "t_jup", "sigma_e", "sigma_a",
+    "sigma_q", "sigma_i", "sigma_om", "sigma_w", "sigma_ma", "sigma_ad", "sigma_n", "sigma_tp", "sigma_per", "class",
+    "producer", "data_arc", "first_obs", "last_obs", "n_obs_used", "n_del_obs_used", "n_dop_obs_used",
+    "condition_code", "rms", "two_body", "A1", "A2", "A3", "DT",
+)
+CAD_SIGNATURE = {"source": "NASA/JPL SBDB Close Approach Data API", "version": "1.1"}
+
+DEFAULT_SEED = 2020
+DEFAULT_APPROACHES = 100000
+APPROACHES_PER_NEO = 17
+
+NUMBERED_FRACTION = 0.10
+NAMED_FRACTION = 0.05
+COMET_FRACTION = 0.001
+DIAMETER_FRACTION = 0.036
+HAZARDOUS_FRACTION = 0.086
+UNKNOWN_FRACTION = 0.001
+
+# The shape of the Pareto distribution of each NEO's share of the approaches (smaller is more skewed), and
+# a cap on a share, which keeps the busiest NEOs at a few hundred approaches per million.
+APPROACH_SKEW = 1.5
+MAX_SHARE = 60.0
+
+# The span of the approaches, and the epoch of the orbits and observations.
+START = datetime.datetime(1900, 1, 1)
+END = datetime.datetime(2200, 1, 1)
+EPOCH = datetime.datetime(2020, 5, 31)
+LAST_OBSERVATION = datetime.date(2020, 9, 15)
+
+JD_UNIX_EPOCH = 2440587.5
+UNIX_EPOCH = datetime.datetime(1970, 1, 1)
+MINUTES_PER_DAY = 24 * 60
+
+MONTH_NAMES = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+# The letters of provisional designations, which skip "I" (and "Z", for the half-month).
+HALF_MONTHS = "ABCDEFGHJKLMNOPQRSTUVWXY"
+ORDER_LETTERS = "ABCDEFGHJKLMNOPQRSTUVWXYZ"
+MAX_CYCLE = 359
+SYLLABLES = ("ka", "to", "ro", "mi", "lan", "der", "va", "sel", "or", "in", "tha", "bel", "cor", "ia", "us", "ne",
+             "phi", "gan", "tes", "al", "mer", "do", "ri", "sa", "pol", "ly", "eu", "nor", "ze", "ba")
+
+def generate(directory, approaches: int = DEFAULT_APPROACHES, neos: int = None, seed: int = DEFAULT_SEED):
+    """Write a synthetic `neos.csv` and `cad.json` to a directory.
+
+    :param directory: The directory in which to write the files, created if need be.
+    :param approaches: The number of close approaches.
+    :param neos: The number of NEOs, or `None` for about `APPROACHES_PER_NEO` approaches per NEO.
+    :param seed: The seed of the random numbers; the same arguments always write the same files.
+    :return: The paths of the written NEO and close approach files.
+    """
+    if neos == None:
+        neos = max(approaches // APPROACHES_PER_NEO, 1)
+    #endif
+    directory = pathlib.Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    neo_path, cad_path = directory / "neos.csv", directory / "cad.json"
+
+    rng = random.Random(seed)
+    bodies = write_neos(neo_path, neos, rng)
+    write_approaches(cad_path, approaches, bodies, rng)
+    return neo_path, cad_path
+#enddef
+
+def write_neos(neo_csv_path, count: int, rng: random.Random) -> list[tuple]:
+    """Write `count` synthetic NEOs to a CSV file.
+
+    :param neo_csv_path: The path of the CSV file.
+    :param count: The number of NEOs.
+    :param rng: The source of random numbers.
+    :return: The `(designation, orbit_id, H)` of every NEO, for its close approaches.
+    """
+    designations = set()
+    names = set()
+    bodies = []
+    number, comets = 432, 0
+    with open(neo_csv_path, "w", newline="") as neo_file:
+        writer = csv.writer(neo_file)
+        writer.writerow(NEO_FIELDS)
+        for index in range(count):
+            roll = rng.random()
+            if roll < COMET_FRACTION:
+                comets += 1
+                row = _comet_row(rng, comets, _unique(names, lambda: _name(rng)))
+            elif roll < NUMBERED_FRACTION:
+                number += rng.randint(1, 19)
+                name = _unique(names, lambda: _name(rng)) if rng.random() < NAMED_FRACTION else ""
+                row = _asteroid_row(rng, index, _unique(designations, lambda: _provisional(rng, True)), number, name)
+            else:
+                row = _asteroid_row(rng, index, _unique(designations, lambda: _provisional(rng, False)), None, "")
+            #endif
+            writer.writerow([row.get(field, "") for field in NEO_FIELDS])
+            bodies.append((row["pdes"], row["orbit_id"][4:], row.get("H", "")))
+        #endfor
+    #endwith
+    return bodies
+#enddef
+
+def write_approaches(cad_json_path, count: int, bodies: list[tuple], rng: random.Random):
+    """Write `count` synthetic close approaches of the given NEOs to a JSON file, in time order.
+
+    :param cad_json_path: The path of the JSON file.
+    :param count: The number of close approaches.
+    :param bodies: The `(designation, orbit_id, H)` of every NEO, as returned by `write_neos`.
+    :param rng: The source of random numbers.
+    """
+    # Each NEO gets a heavy-tailed share of the approaches, drawn by bisecting the cumulative shares
+    cumulative = []
+    total = 0.0
+    for _ in bodies:
+        total += min(rng.paretovariate(APPROACH_SKEW) - 1, MAX_SHARE)
+        cumulative.append(total)
+    #endfor
+
+    start = (START - UNIX_EPOCH) // datetime.timedelta(minutes=1)
+    span = (END - START) // datetime.timedelta(minutes=1)
+    # Sums of exponential gaps are sorted uniform times, so approaches come in order without sorting them
+    rate = count / span
+    elapsed = 0.0
+    day, day_text = None, ""
+
+    with open(cad_json_path, "w") as cad_file:
+        cad_file.write(f'{{"count": "{count}", "data": [')
+        for index in range(count):
+            elapsed = min(elapsed + rng.expovariate(rate), span - 1)
+            minutes = start + int(elapsed)
+            if minutes // MINUTES_PER_DAY != day:
+                day = minutes // MINUTES_PER_DAY
+                date = UNIX_EPOCH + datetime.timedelta(days=day)
+                day_text = f"{date.year}-{MONTH_NAMES[date.month - 1]}-{date.day:02d}"
+            #endif
+            hour, minute = divmod(minutes % MINUTES_PER_DAY, 60)
+
+            designation, orbit_id, magnitude = bodies[min(bisect.bisect(cumulative, rng.random() * total),
+                                                          len(bodies) - 1)]
+            distance = 0.5 * rng.random() ** 1.5
+            uncertainty = distance * rng.expovariate(1e4)
+            velocity = rng.gammavariate(4.0, 3.0) + 0.5
+            row = (
+                designation,
+                orbit_id,
+                f"{JD_UNIX_EPOCH + (minutes + rng.random() - 0.5) / MINUTES_PER_DAY:.9f}",
+                f"{day_text} {hour:02d}:{minute:02d}",
+                repr(distance),
+                repr(max(distance - uncertainty, 0.0)),
+                repr(distance + uncertainty),
+                repr(velocity),
+                repr(velocity * rng.uniform(0.97, 1.0)),
+                _time_sigma(rng),
+                magnitude,
+            )
+            cad_file.write(('\n["' if index == 0 else ',\n["') + '","'.join(row) + '"]')
+        #endfor
+        cad_file.write(f'], "fields": {json.dumps(CAD_FIELDS)}, "signature": {json.dumps(CAD_SIGNATURE)}}}\n')
+    #endwith
+#enddef
+
+# SUPPORT FUNCTION
+def _asteroid_row(rng, index, provisional, number, name):
+    """Return the columns of a synthetic asteroid, as a dictionary; missing columns are empty."""
+    hazard = rng.random()
+    unknown = hazard < UNKNOWN_FRACTION
+    hazardous = not unknown and hazard < UNKNOWN_FRACTION + HAZARDOUS_FRACTION
+    # Potentially hazardous asteroids are bright (H <= 22) and pass close to Earth's orbit (MOID <= 0.05 au)
+    if hazardous:
+        magnitude = rng.uniform(14.0, 22.0)
+        moid = rng.uniform(0.0001, 0.05)
+    else:
+        magnitude = min(max(rng.gauss(23.5, 2.8), 9.0), 33.0)
+        moid = rng.uniform(0.0001, 0.05) if magnitude > 22.0 and rng.random() < 0.3 else rng.uniform(0.05, 0.5)
+    #endif
+
+    year = int(provisional[:4])
+    if number != None:
+        packed = f"a{number:07d}"
+        full_name = f"{number:>6} {name} ({provisional})" if name else f"{number:>6} ({provisional})"
+        spkid = 2000000 + number
+    else:
+        packed = _packed(provisional)
+        full_name = f"       ({provisional})"
+        spkid = 54000000 + index
+    #endif
+
+    row = {
+        "id": packed,
+        "spkid": str(spkid),
+        "full_name": full_name,
+        "pdes": str(number) if number != None else provisional,
+        "name": name,
+        "neo": "Y",
+        "pha": "" if unknown else "Y" if hazardous else "N",
+        "H": "" if unknown else f"{magnitude:.3g}" if number != None else f"{magnitude:.5g}",
+        "H_sigma": _decimal(rng.uniform(0.1, 0.8), 5) if number == None and rng.random() < 0.6 else "",
+    }
+    if not unknown and rng.random() < DIAMETER_FRACTION:
+        albedo = rng.uniform(0.03, 0.5)
+        diameter = 1329 / albedo ** 0.5 * 10 ** (-magnitude / 5)
+        row.update(diameter=_decimal(diameter, 3) or "0.001", albedo=_decimal(albedo, 3),
+                   diameter_sigma=_decimal(diameter * rng.uniform(0.02, 0.2), 3))
+    #endif
+    if rng.random() < 0.05:
+        row["rot_per"] = _decimal(rng.lognormvariate(1.5, 1.2), 4)
+    #endif
+    if rng.random() < 0.012:
+        row["spec_B"] = rng.choice(("S", "C", "X", "Q", "V", "Sq", "Xk"))
+    #endif
+
+    first = _discovery(rng, provisional)
+    arc = (LAST_OBSERVATION - first).days
+    last = first + datetime.timedelta(days=arc if number != None else min(int(rng.expovariate(1 / 60)), arc))
+    observations = int(rng.lognormvariate(4.5 if number != None else 3.5, 1.0)) + 3
+    row.update(_orbit(rng, moid, comet=False))
+    row.update(
+        orbit_id=f"JPL {rng.randint(1, 40 if number == None else 500)}",
+        data_arc=str((last - first).days) if last > first else "",
+        first_obs=first.isoformat(),
+        last_obs=last.isoformat(),
+        n_obs_used=str(observations),
+        condition_code=str(0 if number != None else min(int(rng.expovariate(0.3)) + 1, 9)),
+        rms=_decimal(rng.uniform(0.2, 0.7), 5),
+    )
+    if rng.random() < 0.05:
+        row.update(n_del_obs_used=str(rng.randint(1, 20)), n_dop_obs_used=str(rng.randint(1, 10)))
+    #endif
+    if number != None and year < 2000 and rng.random() < 0.1:
+        row["A2"] = f"{rng.uniform(-5e-13, 5e-13):.15E}"
+    #endif
+    return row
+#enddef
+
+# SUPPORT FUNCTION
+def _comet_row(rng, number, name):
+    """Return the columns of a synthetic periodic comet, as a dictionary; missing columns are empty."""
+    first = _discovery(rng, f"{rng.randint(1990, 2019)} A")
+    row = {
+        "id": f"c{number:05d}_0",
+        "spkid": str(1000000 + number),
+        "full_name": f"{number:>5}P/{name}",
+        "pdes": f"{number}P",
+        "name": name,
+        "prefix": "P",
+        "neo": "Y",
+        "M1": _decimal(rng.uniform(10.0, 20.0), 3),
+        "K1": _decimal(rng.uniform(4.0, 15.0), 3),
+        "orbit_id": f"JPL {rng.randint(1, 200)}",
+        "data_arc": str((LAST_OBSERVATION - first).days),
+        "first_obs": first.isoformat(),
+        "last_obs": LAST_OBSERVATION.isoformat(),
+        "n_obs_used": str(rng.randint(50, 5000)),
+        "condition_code": "0",
+        "rms": _decimal(rng.uniform(0.3, 0.9), 5),
+    }
+    row.update(_orbit(rng, rng.uniform(0.01, 0.3), comet=True))
+    return row
+#enddef
+
+# SUPPORT FUNCTION
+def _orbit(rng, moid, comet):
+    """Return the orbital elements of a synthetic near-Earth orbit, with perihelion inside 1.3 au."""
+    a = rng.uniform(2.5, 15.0) if comet else rng.uniform(0.6, 3.2)
+    e = rng.uniform(max(0.0, 1 - 1.3 / a), min(0.95, max(0.1, 1 - 0.1 / a)))
+    q, ad = a * (1 - e), a * (1 + e)
+    mean_motion = 0.9856076686 / a ** 1.5
+    period = 360 / mean_motion
+    anomaly = rng.uniform(0.0, 360.0)
+    perihelion = EPOCH + datetime.timedelta(days=(360 - anomaly) / mean_motion)
+    if comet:
+        kind = "HTC" if period > 20 * 365.25 else "JFc"
+    elif a < 1:
+        kind = "ATE" if ad > 0.983 else "IEO"
+    else:
+        kind = "APO" if q < 1.017 else "AMO"
+    #endif
+    scale = rng.lognormvariate(-14.0, 3.0)
+    return {
+        "epoch": "2459000.5",
+        "epoch_mjd": "59000",
+        "epoch_cal": "20200531.0000000",
+        "equinox": "J2000",
+        "e": _decimal(e, 16),
+        "a": _decimal(a, 15),
+        "q": _decimal(q, 16),
+        "i": _decimal(abs(rng.gauss(0.0, 12.0)) % 90, 15),
+        "om": _decimal(rng.uniform(0.0, 360.0), 13),
+        "w": _decimal(rng.uniform(0.0, 360.0), 13),
+        "ma": _decimal(anomaly, 13),
+        "ad": _decimal(ad, 15),
+        "n": _decimal(mean_motion, 16),
+        "tp": f"{2459000.5 + (360 - anomaly) / mean_motion:.12f}",
+        "tp_cal": f"{perihelion:%Y%m%d}" + f"{(perihelion.hour * 60 + perihelion.minute) / MINUTES_PER_DAY:.7f}"[1:],
+        "per": _decimal(period, 13),
+        "per_y": _decimal(period / 365.25, 14),
+        "moid": _decimal(moid, 7),
+        "moid_ld": _decimal(moid * 389.17, 9),
+        "moid_jup": _decimal(max(5.2 - ad, 0.01) if not comet else rng.uniform(0.01, 2.0), 6),
+        "t_jup": f"{(5.2 / a + 2 * ((1 - e * e) * a / 5.2) ** 0.5):.3f}",
+        **{f"sigma_{element}": _scientific(scale * rng.uniform(0.5, 2.0) * weight) for element, weight in (
+            ("e", 1), ("a", 1), ("q", 1), ("i", 100), ("om", 500), ("w", 500), ("ma", 200), ("ad", 1), ("n", 0.1),
+            ("tp", 50), ("per", 1000))},
+        "class": kind,
+        "producer": "Otto Matic",
+    }
+#enddef
+
+# SUPPORT FUNCTION
+def _provisional(rng, numbered):
+    """Return a random provisional designation such as "2020 GO2"; numbered NEOs were found earlier."""
+    age = int(rng.expovariate(1 / 20)) + 3 if numbered else int(rng.expovariate(1 / 8))
+    year = LAST_OBSERVATION.year - min(age, 90 if numbered else 70)
+    cycle = min(int(rng.expovariate(1 / 40)), MAX_CYCLE)
+    return f"{year} {rng.choice(HALF_MONTHS)}{rng.choice(ORDER_LETTERS)}{cycle or ''}"
+#enddef
+
+# SUPPORT FUNCTION
+def _packed(provisional):
+    """Return the packed form of a provisional designation, such as "K20G02O" for "2020 GO2", prefixed with "b"."""
+    year, code = provisional.split(" ")
+    cycle = int(code[2:] or 0)
+    cycle_text = f"{cycle:02d}" if cycle < 100 else f"{chr(ord('A') + cycle // 10 - 10)}{cycle % 10}"
+    return f"b{chr(ord('A') + int(year[:2]) - 10)}{year[2:]}{code[0]}{cycle_text}{code[1]}"
+#enddef
+
+# SUPPORT FUNCTION
+def _discovery(rng, provisional):
+    """Return a date in the half-month of a provisional designation, not after the last observation."""
+    year = int(provisional[:4])
+    half = HALF_MONTHS.index(provisional[5]) if len(provisional) > 5 else rng.randrange(len(HALF_MONTHS))
+    date = datetime.date(year, half // 2 + 1, rng.randint(1, 15) if half % 2 == 0 else rng.randint(16, 28))
+    return min(date, LAST_OBSERVATION)
+#enddef
+
+# SUPPORT FUNCTION
+def _name(rng):
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize()
+#enddef
+
+# SUPPORT FUNCTION
+def _unique(seen, draw):
+    """Draw values until one isn't in `seen`, then add it to `seen` and return it."""
+    value = draw()
+    while value in seen:
+        value = draw()
+    #endwhile
+    seen.add(value)
+    return value
+#enddef
+
+# SUPPORT FUNCTION
+def _time_sigma(rng):
+    """Return a random 3-sigma uncertainty of an approach time, in NASA's format ("< 00:01", "00:17", "2_03:05")."""
+    minutes = 0 if rng.random() < 0.5 else min(int(rng.lognormvariate(2.5, 2.5)), 99 * MINUTES_PER_DAY)
+    if minutes < 1:
+        return "< 00:01"
+    #endif
+    days, minutes = divmod(minutes, MINUTES_PER_DAY)
+    hours, minutes = divmod(minutes, 60)
+    return f"{days}_{hours:02d}:{minutes:02d}" if days else f"{hours:02d}:{minutes:02d}"
+#enddef
+
+# SUPPORT FUNCTION
+def _decimal(value, digits):
+    """Format a number as NASA's export does, without a leading zero: 0.4358 is ".4358"."""
+    text = f"{value:.{digits}f}".rstrip("0").rstrip(".")
+    return text[1:] if text.startswith("0.") else text
+#enddef
+
+# SUPPORT FUNCTION
+def _scientific(value):
+    mantissa, exponent = f"{value:.4E}".split("E")
+    return f"{mantissa.rstrip('0').rstrip('.')}E{int(exponent)}"
+#enddef
+
+def main(argv=None):
+    """Generate synthetic data files from the command line."""
+    parser = argparse.ArgumentParser(description="Write synthetic neos.csv and cad.json files of any size.")
+    parser.add_argument("directory", type=pathlib.Path, help="The directory in which to write the files.")
+    parser.add_argument("--approaches", type=int, default=DEFAULT_APPROACHES,
+                        help="The number of close approaches.")
+    parser.add_argument("--neos", type=int,
+                        help=f"The number of NEOs (default: one per {APPROACHES_PER_NEO} approaches).")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED,
+                        help="The seed of the random numbers; the same seed always writes the same files.")
+    args = parser.parse_args(argv)
+    return generate(args.directory, args.approaches, args.neos, args.seed)
+#enddef
+
+if __name__ == "__main__":
+    main()
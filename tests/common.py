@@ -0,0 +1,21 @@
+"""Helpers shared by the tests that compare a database built in steps with one built at once."""
+import datetime
+
+from filters import create_filters
+
+
+QUERIES = (None, dict(hazardous=True), dict(hazardous=False), dict(date=datetime.date(2020, 3, 2)),
+           dict(distance_max=0.05, diameter_min=0.1), dict(start_date=datetime.date(2020, 6, 1), velocity_min=20),
+           dict(diameter_max=0.5))
+
+# The designations of some NEOs with approaches in the test data
+DESIGNATIONS = ('2020 AY1', '99942', '2019 SC8', '2020 BW12', '2020 CG')
+
+
+def describe(database):
+    """Return the results of some queries and lookups, in an order independent of the row order."""
+    results = [sorted(str(ca) for ca in database.query(create_filters(**q) if q else None)) for q in QUERIES]
+    for designation in DESIGNATIONS:
+        neo = database.get_neo_by_designation(designation)
+        results.append(None if neo is None else [str(neo)] + [str(ca) for ca in neo.approaches])
+    return results
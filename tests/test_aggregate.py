@@ -0,0 +1,130 @@
+"""Check that grouped summaries of close approaches match those computed from the queried objects.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_aggregate
+"""
+import collections
+import csv
+import datetime
+import json
+import pathlib
+import tempfile
+import unittest
+
+from aggregate import GROUP_BY, summarize, write_groups_to_csv, write_groups_to_json
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters
+from store import build_index
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+KEYS = {
+    None: lambda ca: None,
+    'year': lambda ca: f"{ca.time.year:04d}",
+    'month': lambda ca: f"{ca.time.year:04d}-{ca.time.month:02d}",
+    'day': lambda ca: ca.time.date().isoformat(),
+    'decade': lambda ca: f"{ca.time.year // 10 * 10:04d}s",
+    'neo': lambda ca: ca._designation,
+    'hazardous': lambda ca: ca.neo.hazardous if ca.neo else None,
+}
+
+
+def expected_groups(database, filters, group_by):
+    """Summarize the queried approaches by group, the slow way."""
+    groups = collections.defaultdict(list)
+    for ca in database.query(filters):
+        groups[KEYS[group_by](ca)].append(ca)
+    return {key: (len(cas), sum(1 for ca in cas if ca.neo and ca.neo.hazardous),
+                  min(ca.distance for ca in cas), max(ca.distance for ca in cas),
+                  min(ca.velocity for ca in cas), max(ca.velocity for ca in cas))
+            for key, cas in groups.items()}
+
+
+class TestSummarize(unittest.TestCase):
+    def test_days_are_grouped_by_period(self):
+        minutes = [0, 60, 24 * 60 * 40, -1]
+        groups = summarize('month', minutes, [1.0, 3.0, 2.0, 4.0], [10.0, 20.0, 30.0, 40.0],
+                           [0, 0, 1, 1], [True, False, None, True])
+        self.assertEqual([group.key for group in groups], ['1969-12', '1970-01', '1970-02'])
+        january = groups[1]
+        self.assertEqual((january.count, january.hazardous), (2, 1))
+        self.assertEqual((january.distance_min, january.distance_max, january.distance_mean), (1.0, 3.0, 2.0))
+        self.assertEqual(january.velocity_mean, 15.0)
+
+    def test_no_rows_make_no_groups(self):
+        self.assertEqual(summarize(None, [], [], [], [], []), [])
+
+    def test_unknown_grouping_is_rejected(self):
+        with self.assertRaises(ValueError):
+            summarize('week', [0], [1.0], [1.0], [0], [False])
+
+
+class TestAggregate(unittest.TestCase):
+    FILTERS = (None, create_filters(hazardous=True), create_filters(start_date=datetime.date(2020, 6, 1),
+                                                                    distance_max=0.1))
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        index_dir = pathlib.Path(cls.tmp.name) / 'index'
+        build_index(TEST_NEO_FILE, TEST_CAD_FILE, index_dir)
+        cls.databases = {
+            'objects': NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE)),
+            'columns': NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE), columnar=True),
+            'index': NEODatabase.from_index(index_dir),
+        }
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def test_groups_match_the_queried_approaches(self):
+        reference = self.databases['objects']
+        for name, database in self.databases.items():
+            for filters in self.FILTERS:
+                for group_by in (None,) + GROUP_BY:
+                    with self.subTest(database=name, filters=filters, group_by=group_by):
+                        groups = database.aggregate(filters, group_by)
+                        expected = expected_groups(reference, filters, group_by)
+                        self.assertEqual({group.key: (group.count, group.hazardous, group.distance_min,
+                                                      group.distance_max, group.velocity_min, group.velocity_max)
+                                          for group in groups}, expected)
+                        for group in groups:
+                            self.assertLessEqual(group.distance_min, group.distance_mean)
+                            self.assertLessEqual(group.distance_mean, group.distance_max)
+
+    def test_aggregating_builds_no_approaches(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            index_dir = pathlib.Path(tmp) / 'index'
+            build_index(TEST_NEO_FILE, TEST_CAD_FILE, index_dir)
+            database = NEODatabase.from_index(index_dir)
+            database.aggregate(create_filters(hazardous=False), 'neo')
+            self.assertEqual(database._approaches._objects, {})
+
+    def test_groups_are_sorted_by_key(self):
+        keys = [group.key for group in self.databases['columns'].aggregate(None, 'day')]
+        self.assertEqual(keys, sorted(keys))
+
+    def test_groups_are_written_to_csv_and_json(self):
+        groups = self.databases['objects'].aggregate(None, 'hazardous')
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path, json_path = pathlib.Path(tmp) / 'groups.csv', pathlib.Path(tmp) / 'groups.json'
+            write_groups_to_csv(groups, csv_path)
+            write_groups_to_json(groups, json_path)
+            with open(csv_path) as infile:
+                rows = list(csv.DictReader(infile))
+            with open(json_path) as infile:
+                elements = json.load(infile)
+
+        self.assertEqual([row['key'] for row in rows], [str(group.key) for group in groups])
+        self.assertEqual([int(row['count']) for row in rows], [group.count for group in groups])
+        self.assertEqual(elements, [group._asdict() for group in groups])
+
+
+if __name__ == '__main__':
+    unittest.main()
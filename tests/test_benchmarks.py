@@ -0,0 +1,53 @@
+"""Check that the benchmark suite runs, and that its comparison flags regressions.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_benchmarks
+"""
+import unittest
+
+from benchmarks import compare, run
+
+
+class TestRun(unittest.TestCase):
+    def test_every_phase_is_measured(self):
+        results = run.run(scales=[2000], repeat=1, memory=False)["results"]
+        phases = [result["phase"] for result in results]
+
+        self.assertEqual(phases[:3], ["load_neos", "load_approaches", "link"])
+        self.assertEqual(phases[-2:], ["write_to_csv", "write_to_json"])
+        self.assertEqual(len(phases), 5 + len(run.QUERIES))
+        for result in results:
+            self.assertEqual(result["scale"], 2000)
+            self.assertGreater(result["rows_per_second"], 0)
+            self.assertIsNone(result["peak_bytes"])
+
+    def test_memory_is_measured(self):
+        result = run.measure(lambda: [0] * 100000, 1, 1, True)
+        self.assertGreater(result["peak_bytes"], 100000)
+
+
+class TestCompare(unittest.TestCase):
+    @staticmethod
+    def results(speed, memory):
+        return {"results": [{"scale": 1, "phase": "load_neos", "rows_per_second": speed, "peak_bytes": memory}]}
+
+    def test_slower_phase_is_a_regression(self):
+        rows = compare.compare(self.results(100, 10), self.results(80, 10), threshold=0.1)
+        self.assertTrue(rows[0]["regressed"])
+        self.assertAlmostEqual(rows[0]["speed_change"], -0.2)
+
+    def test_larger_phase_is_a_regression(self):
+        self.assertTrue(compare.compare(self.results(100, 10), self.results(100, 12), threshold=0.1)[0]["regressed"])
+
+    def test_change_within_threshold_is_not_a_regression(self):
+        self.assertFalse(compare.compare(self.results(100, 10), self.results(95, 10.5), threshold=0.1)[0]["regressed"])
+        self.assertFalse(compare.compare(self.results(100, None), self.results(150, 50), threshold=0.1)[0]["regressed"])
+
+    def test_phases_missing_from_a_run_are_skipped(self):
+        current = {"results": [{"scale": 2, "phase": "load_neos", "rows_per_second": 1, "peak_bytes": None}]}
+        self.assertEqual(compare.compare(self.results(100, 10), current), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
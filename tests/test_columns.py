@@ -0,0 +1,70 @@
+"""Check that the columnar backend of an `NEODatabase` answers queries correctly.
+
+The `ApproachColumns` store should hold the same attributes as the linked
+objects, and a database built with `columnar=True` should produce exactly the
+same results as the object-by-object query for every combination of filters.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_columns
+"""
+import datetime
+import math
+import pathlib
+import unittest
+
+from columns import ApproachColumns
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters
+from helpers import datetime_to_minutes
+from tests import test_query
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class TestApproachColumns(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.neos = load_neos(TEST_NEO_FILE)
+        cls.approaches = load_approaches(TEST_CAD_FILE)
+        NEODatabase(cls.neos, cls.approaches)
+        cls.columns = ApproachColumns.from_objects(cls.neos, cls.approaches)
+
+    def test_columns_have_one_row_per_approach(self):
+        self.assertEqual(len(self.columns), len(self.approaches))
+        self.assertEqual(len(self.columns.diameter), len(self.neos))
+        self.assertEqual(len(self.columns.hazardous), len(self.neos))
+
+    def test_columns_match_objects(self):
+        for inx, approach in enumerate(self.approaches):
+            self.assertEqual(self.columns.time[inx], datetime_to_minutes(approach.time))
+            self.assertEqual(self.columns.distance[inx], approach.distance)
+            self.assertEqual(self.columns.velocity[inx], approach.velocity)
+            self.assertIs(self.neos[self.columns.neo[inx]], approach.neo)
+
+    def test_select_within_candidate_rows(self):
+        filters = create_filters(date=datetime.date(2020, 3, 2))
+        rows = list(range(0, len(self.approaches), 2))
+        expected = [i for i in rows if self.approaches[i].time.date() == datetime.date(2020, 3, 2)]
+        self.assertEqual(self.columns.select(filters, rows), expected)
+
+    def test_select_rejects_unknown_diameters(self):
+        filters = create_filters(diameter_max=100)
+        for inx in self.columns.select(filters):
+            self.assertFalse(math.isnan(self.approaches[inx].neo.diameter))
+
+
+class TestColumnarQuery(test_query.TestQuery):
+    @classmethod
+    def setUpClass(cls):
+        cls.neos = load_neos(TEST_NEO_FILE)
+        cls.approaches = load_approaches(TEST_CAD_FILE)
+        cls.db = NEODatabase(cls.neos, cls.approaches, columnar=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -10,6 +10,7 @@ To run these tests from the project root, run:
 
 These tests should pass when Task 2 is complete.
 """
+import datetime
 import pathlib
 import math
 import unittest
@@ -17,6 +18,7 @@ import unittest
 
 from extract import load_neos, load_approaches
 from database import NEODatabase
+from filters import create_filters, FilterType
 
 
 # Paths to the test data files.
@@ -114,6 +116,47 @@ class TestDatabase(unittest.TestCase):
         nonexistent = self.db.get_neo_by_name('not-real-name')
         self.assertIsNone(nonexistent)
 
+    def test_time_index_is_sorted_permutation(self):
+        time_order = self.db._planner.indexes[FilterType.DATE].order
+        self.assertEqual(sorted(time_order), list(range(len(self.approaches))))
+        times = [self.approaches[inx].time for inx in time_order]
+        self.assertEqual(times, sorted(times))
+
+    def test_date_query_generates_approaches_in_time_order(self):
+        filters = create_filters(start_date=datetime.date(2020, 3, 1), end_date=datetime.date(2020, 3, 7))
+        received = list(self.db.query(filters))
+        self.assertGreater(len(received), 0)
+        self.assertEqual([a.time for a in received], sorted(a.time for a in received))
+
+    def test_approaches_of_each_neo_are_in_time_order(self):
+        for neo in self.neos:
+            times = [approach.time for approach in neo.approaches]
+            self.assertEqual(times, sorted(times))
+
+    def test_get_approaches_within_dates(self):
+        neo = max(self.neos, key=lambda neo: len(neo.approaches))
+        self.assertGreater(len(neo.approaches), 2)
+        start_date = neo.approaches[1].time.date()
+        end_date = neo.approaches[-1].time.date() - datetime.timedelta(days=1)
+
+        expected = [approach for approach in neo.approaches
+                    if start_date <= approach.time.date() <= end_date]
+        self.assertEqual(self.db.get_approaches(neo, start_date, end_date), expected)
+        self.assertEqual(self.db.get_approaches(neo, start_date=start_date),
+                         [approach for approach in neo.approaches if approach.time.date() >= start_date])
+        self.assertEqual(self.db.get_approaches(neo), neo.approaches)
+
+    def test_get_approaches_with_limit(self):
+        neo = max(self.neos, key=lambda neo: len(neo.approaches))
+        self.assertEqual(self.db.get_approaches(neo, limit=2), neo.approaches[:2])
+        start_date = neo.approaches[1].time.date()
+        self.assertEqual(self.db.get_approaches(neo, start_date=start_date, limit=1)[0].time.date(), start_date)
+
+    def test_get_approaches_outside_history_is_empty(self):
+        neo = self.neos[0]
+        self.assertEqual(self.db.get_approaches(neo, end_date=datetime.date(1900, 1, 1)), [])
+        self.assertEqual(self.db.get_approaches(neo, start_date=datetime.date(2200, 1, 1)), [])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -11,12 +11,15 @@ To run these tests from the project root, run:
 These tests should pass when Task 2 is complete.
 """
 import collections.abc
+import csv
 import datetime
+import json
 import pathlib
 import math
+import tempfile
 import unittest
 
-from extract import load_neos, load_approaches
+from extract import load_neos, load_approaches, iter_approaches
 from models import NearEarthObject, CloseApproach
 
 
@@ -118,5 +121,108 @@ class TestLoadApproaches(unittest.TestCase):
         self.assertIsInstance(approach.velocity, float)
 
 
+class TestLoadNEOColumns(unittest.TestCase):
+    def test_neos_match_every_row_of_the_file(self):
+        with open(TEST_NEO_FILE) as f:
+            rows = list(csv.DictReader(f))
+        neos = load_neos(TEST_NEO_FILE)
+
+        self.assertEqual(len(neos), len(rows))
+        for neo, row in zip(neos, rows):
+            self.assertEqual(neo.designation, row['pdes'])
+            self.assertEqual(neo.name, row['name'] or None)
+            self.assertEqual(neo.hazardous, row['pha'] == 'Y')
+            if row['diameter']:
+                self.assertEqual(neo.diameter, float(row['diameter']))
+            else:
+                self.assertTrue(math.isnan(neo.diameter))
+            self.assertIsNone(neo.extra)
+
+    def test_extra_columns_are_kept_by_name(self):
+        neos = load_neos(TEST_NEO_FILE, extra_columns=['full_name', 'H'])
+        self.assertEqual(neos[0].extra, {'full_name': '  1685 Toro (1948 OA)', 'H': '14.3'})
+
+    def test_quoted_fields_are_parsed_as_csv(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = pathlib.Path(tmp) / 'neos.csv'
+            path.write_text('pdes,name,full_name,diameter,pha\n'
+                            '433,Eros,"433 Eros, the first",16.84,N\n'
+                            '1P,Halley,"1P/Halley\nComet",11,Y\n'
+                            '2020 AB,,,,N\n')
+            neos = load_neos(path, extra_columns=['full_name'])
+
+        self.assertEqual([n.designation for n in neos], ['433', '1P', '2020 AB'])
+        self.assertEqual(neos[0].extra['full_name'], '433 Eros, the first')
+        self.assertEqual(neos[1].extra['full_name'], '1P/Halley\nComet')
+        self.assertEqual(neos[1].hazardous, True)
+        self.assertIsNone(neos[2].name)
+
+
+class TestParallelLoad(unittest.TestCase):
+    def test_parallel_neos_match_serial_load(self):
+        serial = load_neos(TEST_NEO_FILE, extra_columns=['H'])
+        parallel = load_neos(TEST_NEO_FILE, extra_columns=['H'], workers=3)
+        self.assertEqual([(n.designation, n.name, str(n.diameter), n.hazardous, n.extra) for n in parallel],
+                         [(n.designation, n.name, str(n.diameter), n.hazardous, n.extra) for n in serial])
+
+    def test_parallel_approaches_match_serial_load(self):
+        serial = load_approaches(TEST_CAD_FILE)
+        parallel = load_approaches(TEST_CAD_FILE, workers=3)
+        self.assertEqual([(a._designation, a.time, a.distance, a.velocity) for a in parallel],
+                         [(a._designation, a.time, a.distance, a.velocity) for a in serial])
+
+    def test_quoted_field_across_ranges_falls_back_to_serial_load(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = pathlib.Path(tmp) / 'neos.csv'
+            path.write_text('pdes,name,diameter,pha\n' + '1,"A\n' + '\n' * 200 + 'B",1,N\n' + '2,C,,Y\n')
+            neos = load_neos(path, workers=2)
+
+        self.assertEqual([n.designation for n in neos], ['1', '2'])
+        self.assertEqual(neos[0].name, 'A\n' + '\n' * 200 + 'B')
+
+
+class TestIterApproaches(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        with open(TEST_CAD_FILE) as f:
+            cls.document = json.load(f)
+
+    @staticmethod
+    def as_tuples(approaches):
+        return [(a._designation, a.time, a.distance, a.velocity) for a in approaches]
+
+    def test_stream_matches_whole_document(self):
+        expected = [(row[0], datetime.datetime.strptime(row[3], '%Y-%b-%d %H:%M'), float(row[4]), float(row[7]))
+                    for row in self.document['data']]
+        self.assertEqual(self.as_tuples(iter_approaches(TEST_CAD_FILE)), expected)
+
+    def test_stream_is_independent_of_chunk_size(self):
+        expected = self.as_tuples(iter_approaches(TEST_CAD_FILE))
+        self.assertEqual(self.as_tuples(iter_approaches(TEST_CAD_FILE, chunk_size=7)), expected)
+
+    def test_stream_reports_characters_read(self):
+        read = []
+        approaches = list(iter_approaches(TEST_CAD_FILE, chunk_size=4096, progress=read.append))
+        self.assertTrue(approaches)
+        self.assertEqual(read, sorted(read))
+        self.assertEqual(read[-1], len(TEST_CAD_FILE.read_text()))
+
+    def test_stream_uses_fields_given_before_data(self):
+        fields = ['v_rel', 'cd', 'des', 'dist']
+        document = {'fields': fields, 'count': 2, 'data': [
+            ['12.5', '2020-Jan-01 00:54', '2020 AY1', '0.02'],
+            ['7.25', '2020-Feb-29 23:59', '433', '0.5'],
+        ]}
+        with tempfile.TemporaryDirectory() as tmp:
+            path = pathlib.Path(tmp) / 'cad.json'
+            path.write_text(json.dumps(document))
+            approaches = self.as_tuples(iter_approaches(path, chunk_size=5))
+
+        self.assertEqual(approaches, [
+            ('2020 AY1', datetime.datetime(2020, 1, 1, 0, 54), 0.02, 12.5),
+            ('433', datetime.datetime(2020, 2, 29, 23, 59), 0.5, 7.25),
+        ])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,83 @@
+"""Check that `create_filters` compiles its criteria into a correct predicate.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_filters
+"""
+import datetime
+import math
+import operator
+import pathlib
+import unittest
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters, order_by, Filter, FilterType, UnsupportedCriterionError
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class TestFilter(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.neos = load_neos(TEST_NEO_FILE)
+        cls.approaches = load_approaches(TEST_CAD_FILE)
+        NEODatabase(cls.neos, cls.approaches)
+
+    def test_predicate_matches_each_criterion(self):
+        filters = create_filters(start_date=datetime.date(2020, 3, 1), end_date=datetime.date(2020, 6, 30),
+                                 distance_max=0.4, velocity_min=5, diameter_max=3, hazardous=False)
+        expected = [a for a in self.approaches
+                    if datetime.date(2020, 3, 1) <= a.time.date() <= datetime.date(2020, 6, 30)
+                    and a.distance <= 0.4 and a.velocity >= 5 and a.neo.diameter <= 3 and not a.neo.hazardous]
+        self.assertGreater(len(expected), 0)
+        self.assertEqual([a for a in self.approaches if filters.check(a)], expected)
+
+    def test_contradictory_bounds_are_detected_up_front(self):
+        self.assertTrue(create_filters(distance_min=0.5, distance_max=0.1).contradictory)
+        self.assertTrue(create_filters(start_date=datetime.date(2020, 10, 1),
+                                       end_date=datetime.date(2020, 4, 1)).contradictory)
+        self.assertTrue(Filter([(operator.eq, True, FilterType.HAZARDOUS),
+                                (operator.eq, False, FilterType.HAZARDOUS)]).contradictory)
+        self.assertFalse(create_filters(distance_min=0.1, distance_max=0.1).contradictory)
+
+    def test_bounds_merge_criteria(self):
+        filters = create_filters(date=datetime.date(2020, 3, 2), start_date=datetime.date(2020, 2, 1),
+                                 velocity_min=3, velocity_max=30)
+        low, high = filters.bounds(FilterType.DATE)
+        self.assertEqual(high - low, 24 * 60 - 1)
+        self.assertEqual(filters.bounds(FilterType.VELOCITY), (3.0, 30.0))
+        self.assertEqual(filters.bounds(FilterType.DISTANCE), (None, None))
+
+    def test_selective_criteria_are_tested_first(self):
+        filters = create_filters(velocity_min=5, date=datetime.date(2020, 3, 2), hazardous=True)
+        self.assertEqual(filters.filter_types[0], FilterType.DATE)
+        self.assertEqual(set(filters.filter_types), {FilterType.DATE, FilterType.VELOCITY, FilterType.HAZARDOUS})
+
+    def test_unsupported_comparison_is_rejected(self):
+        with self.assertRaises(UnsupportedCriterionError):
+            Filter([(operator.ne, 0.1, FilterType.DISTANCE)])
+
+    def test_order_by_keeps_top_n(self):
+        closest = order_by(iter(self.approaches), 'distance', 20)
+        self.assertEqual(closest, sorted(self.approaches, key=lambda a: a.distance)[:20])
+
+        fastest = order_by(iter(self.approaches), 'velocity', 5, descending=True)
+        self.assertEqual(fastest, sorted(self.approaches, key=lambda a: a.velocity, reverse=True)[:5])
+
+        self.assertEqual(order_by(iter(self.approaches), 'time'), sorted(self.approaches, key=lambda a: a.time))
+
+    def test_order_by_diameter_puts_unknown_diameters_last(self):
+        for descending in (False, True):
+            ordered = order_by(iter(self.approaches), 'diameter', descending=descending)
+            known = [a.neo.diameter for a in ordered if not math.isnan(a.neo.diameter)]
+            self.assertEqual(known, sorted(known, reverse=descending))
+            self.assertFalse(math.isnan(ordered[0].neo.diameter))
+            self.assertTrue(math.isnan(ordered[-1].neo.diameter))
+
+
+if __name__ == '__main__':
+    unittest.main()
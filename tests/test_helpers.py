@@ -0,0 +1,66 @@
+"""Check that calendar dates are converted exactly like `strptime` would.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_helpers
+"""
+import datetime
+import json
+import pathlib
+import unittest
+
+from helpers import cd_to_datetime, cd_to_minutes, cd_to_minutes_column, datetime_to_minutes, minutes_to_datetime
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+def strptime(calendar_date):
+    return datetime.datetime.strptime(calendar_date, '%Y-%b-%d %H:%M')
+
+
+class TestCalendarDates(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        with open(TEST_CAD_FILE) as f:
+            cls.calendar_dates = [row[3] for row in json.load(f)['data']]
+
+    def test_cd_to_datetime_matches_strptime(self):
+        for calendar_date in self.calendar_dates:
+            self.assertEqual(cd_to_datetime(calendar_date), strptime(calendar_date))
+
+    def test_cd_to_minutes_column_matches_strptime(self):
+        expected = [datetime_to_minutes(strptime(cd)) for cd in self.calendar_dates]
+        self.assertEqual(list(cd_to_minutes_column(self.calendar_dates)), expected)
+
+    def test_cd_to_minutes_column_checks_the_clock_of_each_row(self):
+        calendar_dates = ['2020-Jan-01 00:54', '2020-Jan-01 23:59', '2020-Jan-01 1:05', '2020-Jan-01 7:5']
+        self.assertEqual(list(cd_to_minutes_column(calendar_dates)), [cd_to_minutes(cd) for cd in calendar_dates])
+        for calendar_date in ('2020-Jan-01 24:00', '2020-Jan-01 00:60', '2020-Jan-01 0x:00'):
+            with self.assertRaises(ValueError):
+                cd_to_minutes_column(['2020-Jan-01 00:00', calendar_date])
+
+    def test_unusual_layouts_fall_back_to_strptime(self):
+        for calendar_date in ('2020-jan-01 00:54', '2020-Jan-1 00:54', '1900-Dec-31 23:59', '2200-Feb-29 0:05'):
+            try:
+                expected = strptime(calendar_date)
+            except ValueError:
+                with self.assertRaises(ValueError):
+                    cd_to_datetime(calendar_date)
+            else:
+                self.assertEqual(cd_to_datetime(calendar_date), expected)
+
+    def test_invalid_dates_raise_value_error(self):
+        for calendar_date in ('2021-Feb-29 00:00', '2020-Jan-01 24:00', '2020-Foo-01 00:00', '2020-Jan-0x 00:00', ''):
+            with self.assertRaises(ValueError):
+                cd_to_datetime(calendar_date)
+
+    def test_minutes_round_trip(self):
+        for calendar_date in self.calendar_dates[:100]:
+            dt = cd_to_datetime(calendar_date)
+            self.assertEqual(minutes_to_datetime(datetime_to_minutes(dt)), dt)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,171 @@
+"""Check that NEOs and close approaches appended to a database match a database built at once.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_ingest
+"""
+import json
+import math
+import pathlib
+import tempfile
+import unittest
+from unittest import mock
+
+import planner
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters, FilterType
+from planner import SortedIndex
+from resultcache import ResultCache
+from store import build_index
+from tests.common import QUERIES, describe
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+def split(items, fraction):
+    cut = int(len(items) * fraction)
+    return items[:cut], items[cut:]
+
+
+class TestSortedIndexInsert(unittest.TestCase):
+    def test_pending_rows_are_found_in_key_order(self):
+        index = SortedIndex([5.0, 1.0, math.nan, 3.0])
+        index.insert([4, 5, 6], [2.0, math.nan, 5.0])
+        self.assertEqual(list(index.rows()), [1, 4, 3, 0, 6])
+        self.assertEqual(list(index.rows(2.0, 4.0)), [4, 3])
+        self.assertEqual(list(index.rows(high=1.5)), [1])
+
+    def test_merged_rows_are_found_in_key_order(self):
+        index = SortedIndex([5, 1, 3], "q")
+        with mock.patch.object(planner, 'MERGE_MIN_ROWS', 0):
+            index.insert([3, 4], [4, 0])
+        self.assertEqual(index._pending, [])
+        self.assertEqual(list(index.keys), [0, 1, 3, 4, 5])
+        self.assertEqual(list(index.rows(1, 4)), [1, 2, 3])
+
+
+class TestAddToDatabase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.expected = describe(NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE)))
+
+    def incremental(self, columnar=False, workers=1, batches=3, fraction=0.5):
+        """Return a database built from part of the data, with the rest added in batches.
+
+        Its statistics and indexes are built first, so that adding updates them.
+        """
+        neos, new_neos = split(load_neos(TEST_NEO_FILE), fraction)
+        approaches, new_approaches = split(load_approaches(TEST_CAD_FILE), fraction)
+        db = NEODatabase(neos, approaches, columnar=columnar, workers=workers)
+        self.addCleanup(db.close)
+        db._planner.indexes
+        db._planner.stats
+        for inx in range(batches):
+            db.add_approaches(new_approaches[inx::batches])
+            db.add_neos(new_neos[inx::batches])
+        return db
+
+    def test_objects_after_adding_match_a_fresh_database(self):
+        self.assertEqual(describe(self.incremental()), self.expected)
+
+    def test_columns_after_adding_match_a_fresh_database(self):
+        self.assertEqual(describe(self.incremental(columnar=True)), self.expected)
+
+    def test_merged_indexes_match_a_fresh_database(self):
+        with mock.patch.object(planner, 'MERGE_MIN_ROWS', 0):
+            db = self.incremental(columnar=True, batches=10)
+        self.assertEqual(describe(db), self.expected)
+        self.assertEqual(db._planner.row_count, len(db._approaches))
+
+    def test_parallel_scan_covers_added_rows(self):
+        self.assertEqual(describe(self.incremental(workers=2)), self.expected)
+
+    def test_statistics_count_added_rows(self):
+        fresh = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))._planner.stats
+        stats = self.incremental()._planner.stats
+        self.assertEqual((stats.row_count, stats.linked_rows, stats.hazardous_rows),
+                         (fresh.row_count, fresh.linked_rows, fresh.hazardous_rows))
+
+    def test_estimates_and_plans_match_a_fresh_database(self):
+        fresh = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))._planner
+        for fraction in (0.5, 0):
+            planner = self.incremental(fraction=fraction)._planner
+            with self.subTest(fraction=fraction):
+                for filter_type, histogram in fresh.stats.histograms.items():
+                    self.assertEqual(vars(planner.stats.histograms[filter_type]), vars(histogram))
+                for query in QUERIES[1:] + (dict(velocity_min=1), dict(diameter_min=0.5), dict(distance_max=0.01)):
+                    filters = create_filters(**query)
+                    self.assertEqual(planner.plan(filters).index, fresh.plan(filters).index)
+                    for filter_type in filters.filter_types:
+                        bounds = filters.bounds(filter_type)
+                        self.assertEqual(planner.estimate(filter_type, *bounds), fresh.estimate(filter_type, *bounds))
+                self.assertGreater(planner.estimate(FilterType.VELOCITY, 1, None), 0.99)
+
+    def test_added_neos_are_found_by_name(self):
+        db = self.incremental()
+        self.assertEqual(db.get_neo_by_name('Apophis').designation, '99942')
+        self.assertEqual(db.get_neo_by_name('Blanpain').designation, '289P')
+        self.assertEqual([neo.designation for neo in db.search_neos('Blanpain')][:1], ['289P'])
+
+    def test_adding_drops_cached_results(self):
+        neos, new_neos = split(load_neos(TEST_NEO_FILE), 0.6)
+        db = NEODatabase(neos, load_approaches(TEST_CAD_FILE))
+        db.set_cache(ResultCache())
+        before = list(db.query(create_filters(hazardous=True)))
+        db.add_neos(new_neos)
+        self.assertGreater(len(list(db.query(create_filters(hazardous=True)))), len(before))
+
+    def test_duplicate_designation_is_rejected(self):
+        neos = load_neos(TEST_NEO_FILE)
+        db = NEODatabase(neos[:10], [])
+        with self.assertRaises(ValueError):
+            db.add_neos(load_neos(TEST_NEO_FILE)[5:6])
+        with self.assertRaises(ValueError):
+            db.add_neos([neos[20], load_neos(TEST_NEO_FILE)[20]])
+        self.assertEqual(len(db._neos), 10)
+
+
+class TestAddToIndexDirectory(unittest.TestCase):
+    def test_mapped_database_after_adding_matches_a_fresh_database(self):
+        neos, new_neos = split(load_neos(TEST_NEO_FILE), 0.6)
+        approaches, new_approaches = split(load_approaches(TEST_CAD_FILE), 0.5)
+        with tempfile.TemporaryDirectory() as tmp:
+            neo_path, cad_path = pathlib.Path(tmp) / 'neos.csv', pathlib.Path(tmp) / 'cad.json'
+            write_subset(TEST_NEO_FILE, neo_path, len(neos))
+            write_cad_subset(TEST_CAD_FILE, cad_path, len(approaches))
+            build_index(neo_path, cad_path, pathlib.Path(tmp) / 'index')
+
+            db = NEODatabase.from_index(pathlib.Path(tmp) / 'index')
+            db.add_approaches(new_approaches)
+            db.add_neos(new_neos)
+            expected = describe(NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE)))
+            self.assertEqual(describe(db), expected)
+            self.assertEqual(db.get_neo_by_name('Blanpain').designation, '289P')
+            self.assertEqual([neo.designation for neo in db.search_neos('Blanpain')][:1], ['289P'])
+
+
+def write_subset(source, target, count):
+    """Copy the header and first `count` rows of a CSV file."""
+    with open(source) as infile, open(target, 'w') as outfile:
+        for inx, line in enumerate(infile):
+            if inx > count:
+                break
+            outfile.write(line)
+
+
+def write_cad_subset(source, target, count):
+    """Copy the first `count` rows of a close approach JSON file."""
+    with open(source) as infile:
+        contents = json.load(infile)
+    contents['data'] = contents['data'][:count]
+    contents['count'] = str(count)
+    with open(target, 'w') as outfile:
+        json.dump(contents, outfile)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -49,6 +49,17 @@ class TestLimit(unittest.TestCase):
         self.assertIsInstance(limit(self.iterable, 0), collections.abc.Iterable)
         self.assertIsInstance(limit(self.iterable, None), collections.abc.Iterable)
 
+    def test_limit_stops_pulling_after_n_values(self):
+        pulled = []
+
+        def stream():
+            for value in self.iterable:
+                pulled.append(value)
+                yield value
+
+        self.assertEqual(tuple(limit(stream(), 2)), (0, 1))
+        self.assertEqual(pulled, [0, 1])
+
 
 if __name__ == '__main__':
     unittest.main()
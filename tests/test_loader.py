@@ -0,0 +1,97 @@
+"""Check that the background loader fills a database that matches one loaded at once.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_loader
+"""
+import pathlib
+import pickle
+import tempfile
+import unittest
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters
+from loader import BackgroundLoader
+from snapshot import MAGIC, snapshot_path
+from tests.common import QUERIES, describe
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class TestBackgroundLoader(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.expected = describe(NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE)))
+
+    def load(self, **kwargs):
+        loader = BackgroundLoader(TEST_NEO_FILE, TEST_CAD_FILE, batch_rows=500, **kwargs)
+        self.addCleanup(loader.database.close)
+        self.assertEqual(loader.progress, 0.0)
+        loader.start()
+        reports = []
+        loader.wait(report=lambda l: reports.append(l.progress))
+        self.assertEqual(reports, sorted(reports))
+        self.assertFalse(loader.loading)
+        self.assertIsNone(loader.error)
+        return loader
+
+    def test_loaded_database_matches_a_fresh_database(self):
+        loader = self.load()
+        self.assertEqual(loader.progress, 1.0)
+        self.assertTrue(loader.neos_loaded.is_set())
+        self.assertEqual(loader.approach_count, len(load_approaches(TEST_CAD_FILE)))
+        self.assertEqual(describe(loader.database), self.expected)
+
+    def test_loaded_database_answers_queries_like_a_fresh_database(self):
+        fresh = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+        for kwargs in ({}, dict(columnar=True)):
+            database = self.load(**kwargs).database
+            for query in QUERIES[1:] + (dict(velocity_min=30), dict(diameter_min=0.5), dict(distance_max=0.01)):
+                with self.subTest(query=query, **kwargs):
+                    filters = create_filters(**query)
+                    self.assertEqual(database._planner.plan(filters).index, fresh._planner.plan(filters).index)
+                    self.assertEqual([str(ca) for ca in database.query(filters)],
+                                     [str(ca) for ca in fresh.query(filters)])
+
+    def test_columnar_database_loaded_in_parallel_matches(self):
+        self.assertEqual(describe(self.load(columnar=True, load_workers=2).database), self.expected)
+
+    def test_snapshot_is_saved_then_read(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.load(cache_dir=tmp)
+            self.assertEqual(len(list(pathlib.Path(tmp).glob('*.snap'))), 1)
+            self.assertEqual(describe(self.load(cache_dir=tmp).database), self.expected)
+
+    def test_snapshot_of_another_layout_falls_back_to_the_data_files(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            snapshot_path(tmp, TEST_NEO_FILE, TEST_CAD_FILE).write_bytes(MAGIC + pickle.dumps([1, 2]))
+            self.assertEqual(describe(self.load(cache_dir=tmp).database), self.expected)
+
+    def test_missing_file_is_reported(self):
+        loader = BackgroundLoader(TEST_NEO_FILE, TESTS_ROOT / 'missing.json')
+        self.addCleanup(loader.database.close)
+        loader.start()
+        loader.wait()
+        self.assertIsInstance(loader.error, OSError)
+        self.assertTrue(loader.neos_loaded.is_set())
+        self.assertIsNotNone(loader.database.get_neo_by_designation('2020 AY1'))
+
+    def test_stopped_loader_keeps_what_it_loaded(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            loader = BackgroundLoader(TEST_NEO_FILE, TEST_CAD_FILE, batch_rows=10, cache_dir=tmp)
+            self.addCleanup(loader.database.close)
+            loader.stop()
+            loader.start()
+            loader.wait()
+            self.assertEqual(list(pathlib.Path(tmp).glob('*.snap')), [])
+        self.assertEqual(loader.approach_count, 0)
+        self.assertEqual(list(loader.database.query()), [])
+        self.assertIsNotNone(loader.database.get_neo_by_designation('2020 AY1'))
+
+
+if __name__ == '__main__':
+    unittest.main()
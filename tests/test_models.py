@@ -0,0 +1,47 @@
+"""Check that the slotted models keep their behaviour.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_models
+"""
+import datetime
+import unittest
+
+from models import NearEarthObject, CloseApproach
+
+
+class TestModels(unittest.TestCase):
+    def setUp(self):
+        self.neo = NearEarthObject('433', 'Eros', 16.84, False)
+        self.approach = CloseApproach('433', '1900-Dec-27 01:30', 0.314, 5.57)
+        self.approach.neo = self.neo
+        self.neo.approaches.append(self.approach)
+
+    def test_models_have_no_instance_dict(self):
+        self.assertFalse(hasattr(self.neo, '__dict__'))
+        self.assertFalse(hasattr(self.approach, '__dict__'))
+
+    def test_time_is_built_from_minutes(self):
+        self.assertEqual(self.approach.time, datetime.datetime(1900, 12, 27, 1, 30))
+        self.assertEqual(self.approach.time_str, '1900-12-27 01:30')
+        self.assertIsInstance(self.approach._minutes, int)
+
+    def test_time_can_be_assigned(self):
+        self.approach.time = datetime.datetime(2020, 1, 1, 0, 54)
+        self.assertEqual(self.approach.time_str, '2020-01-01 00:54')
+
+    def test_from_minutes_matches_calendar_date(self):
+        copy = CloseApproach.from_minutes('433', self.approach._minutes, 0.314, 5.57)
+        self.assertEqual(copy.time, self.approach.time)
+        self.assertEqual(copy.serialize(), self.approach.serialize())
+
+    def test_str_and_serialize(self):
+        self.assertEqual(str(self.approach), "On 1900-12-27 01:30, '433 (Eros)' passes by Earth "
+                                             "at a distance of 0.31 AU and a velocity of 5.57 km/s.")
+        self.assertEqual(self.approach.serialize(),
+                         {'datetime_utc': '1900-12-27 01:30', 'distance_au': 0.314, 'velocity_km_s': 5.57})
+        self.assertEqual(self.neo.approaches, [self.approach])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+"""Check that NEOs can be found by case-insensitive, prefix and approximate name searches.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_names
+"""
+import pathlib
+import tempfile
+import unittest
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from names import NameIndex, edit_distance, normalize, EXACT, PREFIX, FUZZY
+from store import build_index
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class TestEditDistance(unittest.TestCase):
+    def test_distances_within_bound(self):
+        self.assertEqual(edit_distance('halley', 'halley', 2), 0)
+        self.assertEqual(edit_distance('haley', 'halley', 2), 1)
+        self.assertEqual(edit_distance('hallye', 'halley', 2), 2)
+        self.assertEqual(edit_distance('', 'ab', 2), 2)
+
+    def test_distances_beyond_bound_are_capped(self):
+        self.assertEqual(edit_distance('eros', 'halley', 2), 3)
+        self.assertEqual(edit_distance('a', 'abcdef', 1), 2)
+
+    def test_normalize_folds_case_and_whitespace(self):
+        self.assertEqual(normalize('  2020  DB3 '), '2020 db3')
+        self.assertEqual(normalize('Halley'), 'halley')
+
+
+class TestNameIndex(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        designations = ['1P', '433', '2020 DB', '2020 DB1', '2020 DB2', '2019 AB']
+        names = ['Halley', 'Eros', None, None, '', 'Erosa']
+        cls.index = NameIndex(designations, names)
+
+    def test_exact_match_ignores_case(self):
+        matches = self.index.search('HALLEY')
+        self.assertEqual(matches[0].neo, 0)
+        self.assertEqual(matches[0].rank, EXACT)
+        self.assertEqual(self.index.search('1p')[0].neo, 0)
+
+    def test_prefix_matches_follow_exact_match(self):
+        matches = self.index.search('2020 db')
+        self.assertEqual([m.neo for m in matches[:3]], [2, 3, 4])
+        self.assertEqual([m.rank for m in matches[:3]], [EXACT, PREFIX, PREFIX])
+
+    def test_wildcard_only_matches_by_prefix(self):
+        matches = self.index.search('Eros*')
+        self.assertEqual([m.neo for m in matches], [1, 5])
+        self.assertNotIn(FUZZY, [m.rank for m in matches])
+
+    def test_approximate_matches(self):
+        matches = self.index.search('haley')
+        self.assertEqual([(m.neo, m.rank, m.distance) for m in matches], [(0, FUZZY, 1)])
+        self.assertEqual(self.index.search('2019 ab1')[0].neo, 5)
+
+    def test_distance_bound_is_respected(self):
+        self.assertEqual(self.index.search('hally', max_distance=0), [])
+        self.assertEqual(self.index.search('hxllxy'), [])
+
+    def test_limit_and_empty_queries(self):
+        self.assertEqual(len(self.index.search('2020', limit=2)), 2)
+        self.assertEqual(self.index.search(''), [])
+        self.assertEqual(self.index.search('*'), [])
+
+    def test_each_neo_is_returned_once(self):
+        matches = self.index.search('eros')
+        neos = [m.neo for m in matches]
+        self.assertEqual(len(neos), len(set(neos)))
+
+    def test_neo_matching_by_name_and_designation_counts_once_against_the_limit(self):
+        index = NameIndex(['ab1', 'ab3', 'ab4'], ['ab2', None, None])
+        self.assertEqual([m.neo for m in index.search('ab*', limit=2)], [0, 1])
+        self.assertEqual(len(index.search('ab*', limit=3)), 3)
+
+
+class TestSearchNEOs(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.neos = load_neos(TEST_NEO_FILE)
+        cls.approaches = load_approaches(TEST_CAD_FILE)
+        cls.db = NEODatabase(cls.neos, cls.approaches)
+
+    def test_search_by_name_and_designation(self):
+        lemmon = self.db.get_neo_by_name('Lemmon')
+        self.assertIs(self.db.search_neos('lemmon')[0], lemmon)
+        self.assertIs(self.db.search_neos('lemon')[0], lemmon)
+        self.assertIs(self.db.search_neos('2013 tl117')[0], lemmon)
+
+    def test_search_partial_designation(self):
+        matches = self.db.search_neos('2020 DB*', limit=50)
+        self.assertGreater(len(matches), 1)
+        for neo in matches:
+            self.assertTrue(neo.designation.startswith('2020 DB'))
+
+    def test_search_on_index_directory(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            build_index(TEST_NEO_FILE, TEST_CAD_FILE, pathlib.Path(tmp) / 'index')
+            db = NEODatabase.from_index(pathlib.Path(tmp) / 'index')
+            self.assertEqual([neo.designation for neo in db.search_neos('jormungand')],
+                             [neo.designation for neo in self.db.search_neos('jormungand')])
+
+
+if __name__ == '__main__':
+    unittest.main()
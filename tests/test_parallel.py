@@ -0,0 +1,98 @@
+"""Check that full scans split between worker processes answer queries correctly.
+
+A `ParallelScanner` should return exactly the rows that `ApproachColumns.select`
+returns in a single process, in the same order, however the rows are
+partitioned, and a database built with `workers > 1` should pass every query test.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_parallel
+"""
+import itertools
+import pathlib
+import unittest
+from unittest import mock
+
+import parallel
+from columns import ApproachColumns
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters
+from parallel import ParallelScanner
+from tests import test_query
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class TestParallelScanner(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        neos = load_neos(TEST_NEO_FILE)
+        approaches = load_approaches(TEST_CAD_FILE)
+        NEODatabase(neos, approaches)
+        cls.columns = ApproachColumns.from_objects(neos, approaches)
+        cls.scanner = ParallelScanner(cls.columns, 2, partition_rows=100)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.scanner.close()
+
+    def test_scan_matches_single_process_select(self):
+        for filters in (create_filters(distance_max=0.1),
+                        create_filters(diameter_min=0.1),
+                        create_filters(hazardous=False, velocity_min=10),
+                        create_filters(distance_min=10)):
+            with self.subTest(criteria=filters.criteria):
+                expected = self.columns.select(filters)
+                self.assertEqual(list(self.scanner.select(filters)), expected)
+
+    def test_scan_stops_when_results_are_no_longer_consumed(self):
+        filters = create_filters(velocity_min=0)
+        received = list(itertools.islice(self.scanner.select(filters), 5))
+        self.assertEqual(received, [0, 1, 2, 3, 4])
+
+    def test_closed_scan_leaves_the_pool_usable(self):
+        scan = self.scanner.select(create_filters(velocity_min=0))
+        next(scan)
+        scan.close()
+
+        filters = create_filters(distance_max=0.1)
+        self.assertEqual(list(self.scanner.select(filters)), self.columns.select(filters))
+
+    def test_worker_builds_each_filter_once(self):
+        filters = create_filters(distance_max=0.1)
+        with mock.patch.object(parallel, '_worker_columns', self.columns), \
+                mock.patch.object(parallel, '_worker_filter', None):
+            first = parallel._select_partition(filters.criteria, 0, 100)
+            built = parallel._worker_filter
+            second = parallel._select_partition(filters.criteria, 100, 200)
+            self.assertIs(parallel._worker_filter, built)
+            self.assertEqual(first + second, self.columns.select(filters, range(200)))
+
+            parallel._select_partition(create_filters(distance_min=0.1).criteria, 0, 100)
+            self.assertIsNot(parallel._worker_filter, built)
+
+
+class TestParallelQuery(test_query.TestQuery):
+    @classmethod
+    def setUpClass(cls):
+        cls.neos = load_neos(TEST_NEO_FILE)
+        cls.approaches = load_approaches(TEST_CAD_FILE)
+        cls.db = NEODatabase(cls.neos, cls.approaches, workers=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.db.close()
+
+    def test_full_scan_yields_approaches_in_internal_order(self):
+        filters = create_filters(velocity_min=0.0, hazardous=False)
+        expected = [approach for approach in self.approaches
+                    if approach.neo is not None and not approach.neo.hazardous]
+        self.assertEqual(list(self.db.query(filters)), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+"""Check that the query planner estimates selectivity and picks sensible indexes.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_planner
+"""
+import datetime
+import math
+import pathlib
+import unittest
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters, FilterType
+from planner import Histogram
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class TestHistogram(unittest.TestCase):
+    def test_fraction_of_uniform_values(self):
+        histogram = Histogram(range(1000), bins=10)
+        self.assertAlmostEqual(histogram.fraction(), 1.0, places=2)
+        self.assertAlmostEqual(histogram.fraction(0, 499), 0.5, places=2)
+        self.assertAlmostEqual(histogram.fraction(low=900), 0.1, places=2)
+        self.assertEqual(histogram.fraction(2000, 3000), 0.0)
+
+    def test_nan_values_never_match(self):
+        histogram = Histogram([1.0, 2.0, math.nan, math.nan])
+        self.assertAlmostEqual(histogram.fraction(), 0.5)
+
+
+class TestPlanner(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.approaches = load_approaches(TEST_CAD_FILE)
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), cls.approaches)
+        cls.planner = cls.db._planner
+
+    def test_hazardous_selectivity_is_exact(self):
+        hazardous = sum(1 for a in self.approaches if a.neo.hazardous)
+        self.assertAlmostEqual(self.planner.estimate(FilterType.HAZARDOUS, True, True), hazardous / len(self.approaches))
+
+    def test_tiny_date_window_uses_time_index(self):
+        plan = self.planner.plan(create_filters(date=datetime.date(2020, 3, 2), distance_max=0.5))
+        self.assertEqual(plan.index, FilterType.DATE)
+        self.assertEqual(plan.residual.filter_types, [FilterType.DISTANCE])
+
+    def test_hazardous_any_date_uses_hazard_index(self):
+        plan = self.planner.plan(create_filters(hazardous=True))
+        self.assertEqual(plan.index, FilterType.HAZARDOUS)
+        self.assertIsNone(plan.residual)
+
+    def test_unselective_filter_scans(self):
+        plan = self.planner.plan(create_filters(distance_max=10, velocity_min=0))
+        self.assertIsNone(plan.index)
+
+    def test_every_plan_matches_a_full_scan(self):
+        for filters in (create_filters(hazardous=True, velocity_min=10),
+                        create_filters(diameter_min=1, distance_max=0.3),
+                        create_filters(velocity_min=30),
+                        create_filters(distance_max=0.001)):
+            expected = {a for a in self.approaches if filters.check(a)}
+            self.assertEqual(set(self.db.query(filters)), expected)
+
+    def test_each_index_returns_the_rows_of_a_full_scan_in_order(self):
+        plans = {FilterType.DATE: create_filters(date=datetime.date(2020, 3, 2)),
+                 FilterType.DISTANCE: create_filters(distance_max=0.01),
+                 FilterType.VELOCITY: create_filters(velocity_min=30),
+                 FilterType.DIAMETER: create_filters(diameter_min=0.5),
+                 FilterType.HAZARDOUS: create_filters(hazardous=True)}
+        columnar = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE), columnar=True)
+        for index, filters in plans.items():
+            with self.subTest(index=index):
+                self.assertEqual(self.planner.plan(filters).index, index)
+                expected = [a for a in self.approaches if filters.check(a)]
+                self.assertGreater(len(expected), 0)
+                self.assertEqual(list(self.db.query(filters)), expected)
+                self.assertEqual([str(a) for a in columnar.query(filters)], [str(a) for a in expected])
+
+    def test_indexes_are_built_when_a_plan_first_uses_them(self):
+        db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+        self.assertEqual((db._planner._indexes, db._planner._stats), ({}, None))
+        list(db.query(create_filters(date=datetime.date(2020, 3, 2))))
+        self.assertEqual(list(db._planner._indexes), [FilterType.DATE])
+        self.assertEqual(db._planner.stats.row_count, len(db._approaches))
+        self.assertEqual(db._planner.index(FilterType.VELOCITY).keys, self.planner.index(FilterType.VELOCITY).keys)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+"""Check that the phases of a run are timed, nested and counted correctly.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_profiling
+"""
+import io
+import pathlib
+import pstats
+import tempfile
+import time
+import unittest
+
+import profiling
+from profiling import Profiler
+
+
+class TestProfiler(unittest.TestCase):
+    def test_hooks_do_nothing_without_a_profiler(self):
+        stream = iter([1, 2, 3])
+        self.assertIs(profiling.iterate('filter', stream), stream)
+        with profiling.phase('load') as timing:
+            timing.rows = 10
+
+    def test_phases_exclude_the_phases_inside_them(self):
+        with Profiler() as profiler:
+            rows = profiling.iterate('filter', (time.sleep(0.01) or n for n in range(5)))
+            with profiling.phase('write') as timing:
+                timing.rows = len(list(rows))
+                time.sleep(0.02)
+        filter_phase, write_phase = profiler.phases
+
+        self.assertEqual((filter_phase.name, filter_phase.rows), ('filter', 5))
+        self.assertEqual((write_phase.name, write_phase.rows), ('write', 5))
+        self.assertGreaterEqual(filter_phase.wall, 0.05)
+        self.assertGreaterEqual(write_phase.wall, 0.02)
+        self.assertLess(write_phase.wall, 0.05)
+
+    def test_report_prints_and_forgets_the_phases(self):
+        with Profiler() as profiler:
+            with profiling.phase('load_neos', 42):
+                pass
+        output = io.StringIO()
+        profiler.report(output)
+        self.assertIn('load_neos', output.getvalue())
+        self.assertIn('42', output.getvalue())
+        self.assertEqual(profiler.phases, [])
+
+    def test_profile_is_saved(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = pathlib.Path(tmp) / 'run.prof'
+            with Profiler(path):
+                sorted(range(1000), key=lambda n: -n)
+            self.assertGreater(pstats.Stats(str(path)).total_calls, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+"""Check that queries record the work they do, and that it adds up over a session.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_querystats
+"""
+import collections
+import datetime
+import itertools
+import pathlib
+import unittest
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters
+from querystats import QueryRecord, QueryStats
+from resultcache import ResultCache
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class TestQueryStats(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+        cls.columnar = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE), columnar=True)
+
+    def setUp(self):
+        self.stats = QueryStats()
+        self.db.set_stats(self.stats)
+        self.columnar.set_stats(self.stats)
+
+    def tearDown(self):
+        self.db.set_stats(None)
+        self.columnar.set_stats(None)
+        self.db.set_cache(None)
+
+    def test_full_scan_evaluates_criteria_in_order(self):
+        filters = create_filters(distance_min=0.001, velocity_max=40)
+        matches = list(self.db.query(filters))
+        record = self.stats.last
+
+        self.assertEqual(record.index, 'scan')
+        self.assertEqual(record.criteria, ('distance', 'velocity'))
+        self.assertEqual(record.rows_scanned, len(self.db._approaches))
+        self.assertEqual(record.rows_matched, len(matches))
+        first, second = filters.filter_types
+        self.assertEqual(record.evaluations[first.name.lower()], record.rows_scanned)
+        self.assertLess(record.evaluations[second.name.lower()], record.rows_scanned)
+        self.assertGreater(record.seconds, 0)
+
+    def test_index_slice_only_scans_its_rows(self):
+        matches = list(self.db.query(create_filters(date=datetime.date(2020, 3, 2), hazardous=False)))
+        record = self.stats.last
+        self.assertEqual(record.index, 'date')
+        self.assertEqual(record.evaluations['hazardous'], record.rows_scanned)
+        self.assertEqual(record.rows_matched, len(matches))
+        self.assertLess(record.rows_scanned, 100)
+
+    def test_columnar_queries_count_the_same_matches(self):
+        filters = dict(distance_max=0.1, velocity_min=5, diameter_min=0.01)
+        expected = list(self.db.query(create_filters(**filters)))
+        self.assertEqual(len(list(self.columnar.query(create_filters(**filters)))), len(expected))
+        record = self.stats.last
+        self.assertEqual(record.rows_matched, len(expected))
+        # The criterion of the index used is applied by the index, not evaluated per row
+        self.assertEqual(set(record.evaluations) | {record.index}, {'distance', 'velocity', 'diameter'})
+
+    def test_stopped_query_is_recorded_when_closed(self):
+        matches = self.db.query(create_filters(hazardous=True))
+        self.assertEqual(len(list(itertools.islice(matches, 3))), 3)
+        matches.close()
+        self.assertEqual(self.stats.last.rows_matched, 3)
+
+    def test_cached_query_scans_nothing(self):
+        self.db.set_cache(ResultCache())
+        filters = create_filters(velocity_min=20)
+        list(self.db.query(filters))
+        list(self.db.query(filters))
+        self.assertEqual(self.stats.last.index, 'cache')
+        self.assertEqual(self.stats.last.rows_scanned, 0)
+
+    def test_totals_and_recent_window(self):
+        stats = QueryStats(history=2)
+        for seconds, criteria in ((1.0, ('date',)), (2.0, ('date',)), (3.0, ('distance',))):
+            record = QueryRecord(criteria)
+            record.seconds, record.rows_scanned = seconds, 10
+            record.evaluations.update({criteria[0]: 10})
+            stats.add(record)
+        summary = stats.summary()
+
+        self.assertEqual(summary['queries'], 3)
+        self.assertEqual(summary['rows_scanned'], 30)
+        self.assertAlmostEqual(summary['mean_seconds'], 2.0)
+        self.assertAlmostEqual(summary['recent_mean_seconds'], 2.5)
+        self.assertEqual(summary['evaluations'], {'date': 20, 'distance': 10})
+        self.assertEqual(summary['criteria'][('date',)], {'queries': 2, 'seconds': 3.0})
+
+        stats.clear()
+        self.assertEqual(stats.summary()['queries'], 0)
+        self.assertIsNone(stats.last)
+
+    def test_counting_predicate_agrees_with_predicate(self):
+        filters = create_filters(distance_max=0.2, hazardous=True)
+        counts = collections.Counter()
+        predicate = filters.counting_predicate(counts)
+        approaches = self.db._approaches
+        self.assertEqual([predicate(ca) for ca in approaches], [filters.predicate(ca) for ca in approaches])
+        self.assertEqual(counts[filters.filter_types[0].name.lower()], len(approaches))
+
+
+if __name__ == '__main__':
+    unittest.main()
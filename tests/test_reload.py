@@ -0,0 +1,130 @@
+"""Check that changed data files are applied to a live database as differences.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_reload
+"""
+import datetime
+import json
+import os
+import pathlib
+import shutil
+import tempfile
+import unittest
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters
+from reload import Reloader
+from resultcache import ResultCache
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+QUERIES = (None, dict(hazardous=True), dict(date=datetime.date(2020, 3, 2)),
+           dict(distance_max=0.05, diameter_min=0.1))
+
+
+def describe(database):
+    """Return the results of some queries and lookups, as comparable strings."""
+    results = [[str(ca) for ca in database.query(create_filters(**(q or {})) if q else None)] for q in QUERIES]
+    for designation in ('433', '2020 AY1', '99942'):
+        neo = database.get_neo_by_designation(designation)
+        results.append(None if neo is None else [str(neo)] + [str(ca) for ca in neo.approaches])
+    return results
+
+
+class TestDiffAndApply(unittest.TestCase):
+    def setUp(self):
+        self.db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE), columnar=True)
+
+    def edited(self):
+        """Return new data: some NEOs removed or changed, some approaches removed and one added."""
+        neos = load_neos(TEST_NEO_FILE)
+        removed = neos.pop(5)
+        neos[0].diameter = 123.0
+        approaches = load_approaches(TEST_CAD_FILE)
+        del approaches[100:130]
+        approaches.append(type(approaches[0]).from_minutes(neos[0].designation, 0, 0.001, 1.0))
+        return neos, approaches, removed
+
+    def test_update_matches_a_fresh_database(self):
+        neos, approaches, removed = self.edited()
+        self.db.set_cache(ResultCache())
+        describe(self.db)
+
+        changes = self.db.diff(neos, approaches)
+        self.assertEqual((len(changes.changed_neos), len(changes.removed_neos)), (1, 1))
+        self.assertEqual((len(changes.added_approaches), len(changes.removed_approaches)), (1, 30))
+        self.db.apply(changes)
+        self.assertEqual(len(self.db.cache), 0)
+
+        fresh_neos, fresh_approaches, _ = self.edited()
+        self.assertEqual(describe(self.db), describe(NEODatabase(fresh_neos, fresh_approaches)))
+        self.assertIsNone(self.db.get_neo_by_designation(removed.designation))
+
+    def test_diff_leaves_the_database_unchanged(self):
+        before = describe(self.db)
+        neos, approaches, _ = self.edited()
+        changes = self.db.diff(neos, approaches)
+        self.assertTrue(changes)
+        self.assertEqual(describe(self.db), before)
+
+    def test_unchanged_objects_are_kept(self):
+        neo = self.db.get_neo_by_designation('433')
+        changes = self.db.diff(load_neos(TEST_NEO_FILE), None)
+        self.assertFalse(changes)
+        self.db.apply(changes)
+        self.assertIs(self.db.get_neo_by_designation('433'), neo)
+
+
+class TestReloader(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.neo_path = pathlib.Path(self.tmp.name) / 'neos.csv'
+        self.cad_path = pathlib.Path(self.tmp.name) / 'cad.json'
+        shutil.copy(TEST_NEO_FILE, self.neo_path)
+        shutil.copy(TEST_CAD_FILE, self.cad_path)
+        self.db = NEODatabase(load_neos(self.neo_path), load_approaches(self.cad_path))
+        self.reloader = Reloader(self.db, self.neo_path, self.cad_path)
+
+    def tearDown(self):
+        self.reloader.wait()
+        self.tmp.cleanup()
+
+    def rewrite_cad(self, keep):
+        with open(self.cad_path) as cad_file:
+            cad = json.load(cad_file)
+        cad['data'] = cad['data'][:keep]
+        cad['count'] = str(keep)
+        with open(self.cad_path, 'w') as cad_file:
+            json.dump(cad, cad_file)
+        # Make sure the change is seen even on file systems with coarse modification times
+        os.utime(self.cad_path, ns=(0, os.stat(self.cad_path).st_mtime_ns + 10**9))
+
+    def test_changed_file_is_applied_on_a_later_poll(self):
+        self.assertIsNone(self.reloader.poll())
+        self.assertFalse(self.reloader.busy)
+
+        self.rewrite_cad(1000)
+        self.assertIsNone(self.reloader.poll())
+        self.assertTrue(self.reloader.busy)
+        self.reloader.wait()
+        changes = self.reloader.poll()
+
+        self.assertEqual(len(changes.removed_approaches), len(load_approaches(TEST_CAD_FILE)) - 1000)
+        self.assertEqual(sum(1 for _ in self.db.query()), 1000)
+        self.assertFalse(self.reloader.busy)
+
+    def test_unreadable_file_is_reported(self):
+        self.cad_path.write_text('{"data": [')
+        self.reloader.poll()
+        self.reloader.wait()
+        self.assertIsInstance(self.reloader.poll(), Exception)
+        self.assertGreater(sum(1 for _ in self.db.query()), 1000)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+"""Check that query results are cached, reused and evicted correctly.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_resultcache
+"""
+import array
+import datetime
+import itertools
+import pathlib
+import unittest
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters
+from models import CloseApproach
+from querystats import QueryStats
+from resultcache import ResultCache
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class TestResultCache(unittest.TestCase):
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = ResultCache(max_entries=2)
+        cache.put('a', array.array('q', [1]), True)
+        cache.put('b', array.array('q', [2]), True)
+        cache.get('a')
+        cache.put('c', array.array('q', [3]), True)
+
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_memory_cap_is_respected(self):
+        rows = array.array('q', range(1000))
+        cache = ResultCache(max_entries=10, max_bytes=rows.itemsize * 2500)
+        for key in 'abc':
+            cache.put(key, array.array('q', rows), True)
+        self.assertEqual(len(cache), 2)
+        self.assertLessEqual(cache.stats()['bytes'], cache.max_bytes)
+
+        cache.put('huge', array.array('q', range(10000)), True)
+        self.assertIsNone(cache.get('huge'))
+
+    def test_partial_entry_is_only_replaced_by_more_rows(self):
+        cache = ResultCache()
+        cache.put('a', array.array('q', [1, 2]), False)
+        cache.put('a', array.array('q', [1]), False)
+        self.assertEqual(list(cache.get('a').rows), [1, 2])
+
+        cache.put('a', array.array('q', [1, 2, 3]), True)
+        cache.put('a', array.array('q', [1, 2, 3, 4]), False)
+        entry = cache.get('a')
+        self.assertTrue(entry.complete)
+        self.assertEqual(list(entry.rows), [1, 2, 3])
+
+    def test_counters_and_clear(self):
+        cache = ResultCache()
+        cache.get('a')
+        cache.put('a', array.array('q', [1]), True)
+        cache.put('b', array.array('q', [1]), False)
+        cache.get('a')
+        cache.get('b')
+        self.assertEqual({k: cache.stats()[k] for k in ('hits', 'partial_hits', 'misses', 'entries')},
+                         {'hits': 1, 'partial_hits': 1, 'misses': 1, 'entries': 2})
+
+        cache.clear()
+        self.assertEqual(cache.stats()['entries'], 0)
+        self.assertEqual(cache.stats()['bytes'], 0)
+        self.assertEqual(cache.stats()['hits'], 0)
+
+
+class TestCachedQuery(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.neos = load_neos(TEST_NEO_FILE)
+        cls.approaches = load_approaches(TEST_CAD_FILE)
+        cls.db = NEODatabase(cls.neos, cls.approaches)
+
+    def setUp(self):
+        self.cache = ResultCache()
+        self.db.set_cache(self.cache)
+
+    def tearDown(self):
+        self.db.set_cache(None)
+
+    def test_cached_results_match_uncached_results(self):
+        for filters in (None, create_filters(hazardous=True), create_filters(date=datetime.date(2020, 3, 2)),
+                        create_filters(distance_max=0.1, diameter_min=0.1)):
+            self.db.set_cache(None)
+            expected = list(self.db.query(filters))
+            self.db.set_cache(self.cache)
+            self.assertEqual(list(self.db.query(filters)), expected)
+            self.assertEqual(list(self.db.query(filters)), expected)
+
+    def test_equivalent_filters_share_an_entry(self):
+        date = datetime.date(2020, 3, 2)
+        list(self.db.query(create_filters(date=date)))
+        list(self.db.query(create_filters(start_date=date, end_date=date)))
+        self.assertEqual(self.cache.stats()['hits'], 1)
+        self.assertEqual(len(self.cache), 1)
+
+    def test_limited_query_is_extended_by_a_larger_limit(self):
+        filters = create_filters(hazardous=True)
+        self.db.set_cache(None)
+        expected = list(self.db.query(filters))
+        self.db.set_cache(self.cache)
+
+        first = list(itertools.islice(self.db.query(filters), 3))
+        self.assertEqual(first, expected[:3])
+        self.assertFalse(self.cache.get(filters.key).complete)
+
+        self.assertEqual(list(itertools.islice(self.db.query(filters), 10)), expected[:10])
+        self.assertEqual(list(self.db.query(filters)), expected)
+        self.assertTrue(self.cache.get(filters.key).complete)
+
+    def test_larger_limit_evaluates_only_the_rows_after_the_cached_ones(self):
+        filters = create_filters(velocity_min=1)
+        stats = QueryStats()
+        self.db.set_stats(stats)
+        try:
+            expected = list(itertools.islice(self.db.query(filters), 20))
+            self.assertEqual(stats.last.evaluations['velocity'], self.approaches.index(expected[-1]) + 1)
+
+            self.cache.clear()
+            list(itertools.islice(self.db.query(filters), 10))
+            self.assertEqual(list(itertools.islice(self.db.query(filters), 20)), expected)
+        finally:
+            self.db.set_stats(None)
+        self.assertEqual(stats.last.evaluations['velocity'],
+                         self.approaches.index(expected[-1]) - self.approaches.index(expected[9]))
+
+    def test_query_running_while_the_data_changes_is_not_cached(self):
+        db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+        db.set_cache(self.cache)
+        filters = create_filters(hazardous=True)
+        results = db.query(filters)
+        next(results)
+        db.add_approaches([CloseApproach('2020 AA', '2020-Jan-01 00:00', 0.1, 5.0)])
+        results.close()
+        self.assertIsNone(self.cache.get(filters.key))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+"""Check that a snapshot restores the same data as the data files it caches.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_snapshot
+"""
+import math
+import os
+import pathlib
+import pickle
+import shutil
+import tempfile
+import unittest
+
+from extract import load_neos, load_approaches
+from snapshot import MAGIC, snapshot_path, save_snapshot, load_snapshot, load_with_snapshot
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+def neo_tuple(neo):
+    return (neo.designation, neo.name, None if math.isnan(neo.diameter) else neo.diameter, neo.hazardous)
+
+
+def approach_tuple(approach):
+    return (approach._designation, approach.time, approach.distance, approach.velocity)
+
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.tmp = pathlib.Path(tempfile.mkdtemp())
+        self.neo_file = self.tmp / 'neos.csv'
+        self.cad_file = self.tmp / 'cad.json'
+        shutil.copy(TEST_NEO_FILE, self.neo_file)
+        shutil.copy(TEST_CAD_FILE, self.cad_file)
+        self.cache_dir = self.tmp / 'cache'
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_snapshot_round_trip(self):
+        neos, approaches = load_neos(self.neo_file), load_approaches(self.cad_file)
+        path = snapshot_path(self.cache_dir, self.neo_file, self.cad_file)
+        save_snapshot(path, neos, approaches)
+
+        loaded_neos, loaded_approaches = load_snapshot(path)
+        self.assertEqual([neo_tuple(n) for n in loaded_neos], [neo_tuple(n) for n in neos])
+        self.assertEqual([approach_tuple(a) for a in loaded_approaches], [approach_tuple(a) for a in approaches])
+
+    def test_each_save_writes_its_own_temporary_file(self):
+        neos, approaches = load_neos(self.neo_file), load_approaches(self.cad_file)
+        path = snapshot_path(self.cache_dir, self.neo_file, self.cad_file)
+        path.parent.mkdir(parents=True)
+        # Where a save in another process would be writing its temporary file
+        other = path.with_suffix('.tmp')
+        other.write_bytes(b'half of a snapshot')
+
+        save_snapshot(path, neos, approaches)
+        self.assertEqual(other.read_bytes(), b'half of a snapshot')
+        self.assertEqual(sorted(p.name for p in self.cache_dir.iterdir()), sorted([path.name, other.name]))
+        self.assertEqual(len(load_snapshot(path)[1]), len(approaches))
+
+    def test_load_with_snapshot_writes_then_reuses_snapshot(self):
+        first = load_with_snapshot(self.neo_file, self.cad_file, self.cache_dir)
+        path = snapshot_path(self.cache_dir, self.neo_file, self.cad_file)
+        self.assertTrue(path.exists())
+
+        second = load_with_snapshot(self.neo_file, self.cad_file, self.cache_dir)
+        self.assertEqual([approach_tuple(a) for a in second[1]], [approach_tuple(a) for a in first[1]])
+
+    def test_changed_data_file_invalidates_snapshot(self):
+        load_with_snapshot(self.neo_file, self.cad_file, self.cache_dir)
+        old_path = snapshot_path(self.cache_dir, self.neo_file, self.cad_file)
+
+        stat = self.cad_file.stat()
+        os.utime(self.cad_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        new_path = snapshot_path(self.cache_dir, self.neo_file, self.cad_file)
+        self.assertNotEqual(old_path, new_path)
+
+        load_with_snapshot(self.neo_file, self.cad_file, self.cache_dir)
+        self.assertTrue(new_path.exists())
+        self.assertFalse(old_path.exists())
+
+    def test_corrupt_snapshot_falls_back_to_data_files(self):
+        path = snapshot_path(self.cache_dir, self.neo_file, self.cad_file)
+        path.parent.mkdir(parents=True)
+        for content in (b'not a snapshot', MAGIC + pickle.dumps([1, 2]), MAGIC + pickle.dumps({'designation': 0})):
+            with self.subTest(content=content):
+                path.write_bytes(content)
+                neos, approaches = load_with_snapshot(self.neo_file, self.cad_file, self.cache_dir)
+                self.assertEqual(len(neos), 4226)
+                self.assertEqual(len(approaches), 4700)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+"""Check that an index directory round-trips the data files and answers queries correctly.
+
+A database opened with `NEODatabase.from_index` should hold the same NEOs and
+close approaches as one built from the data files, look them up the same way,
+and pass every query test.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_store
+"""
+import json
+import math
+import pathlib
+import tempfile
+import unittest
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from store import build_index, is_index, open_index, MANIFEST_NAME
+from tests import test_query
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class TestIndexDirectory(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.index_dir = pathlib.Path(cls.tmp.name) / 'index'
+        build_index(TEST_NEO_FILE, TEST_CAD_FILE, cls.index_dir)
+
+        cls.neos = load_neos(TEST_NEO_FILE)
+        cls.approaches = load_approaches(TEST_CAD_FILE)
+        cls.expected = NEODatabase(cls.neos, cls.approaches)
+        cls.db = NEODatabase.from_index(cls.index_dir)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def test_directory_is_recognized_as_index(self):
+        self.assertTrue(is_index(self.index_dir))
+        self.assertFalse(is_index(TEST_NEO_FILE))
+        self.assertFalse(is_index(TESTS_ROOT))
+
+    def test_neos_round_trip(self):
+        self.assertEqual(len(self.db._neos), len(self.neos))
+        for mapped, neo in zip(self.db._neos, self.neos):
+            self.assertEqual((mapped.designation, mapped.name, mapped.hazardous),
+                             (neo.designation, neo.name, neo.hazardous))
+            self.assertTrue(mapped.diameter == neo.diameter or math.isnan(neo.diameter))
+
+    def test_approaches_round_trip(self):
+        self.assertEqual(len(self.db._approaches), len(self.approaches))
+        for mapped, approach in zip(self.db._approaches, self.approaches):
+            self.assertEqual((mapped._designation, mapped.time, mapped.distance, mapped.velocity),
+                             (approach._designation, approach.time, approach.distance, approach.velocity))
+
+    def test_objects_are_linked_and_built_once(self):
+        neo = self.db.get_neo_by_designation('1685')
+        self.assertIsNotNone(neo)
+        self.assertIs(self.db.get_neo_by_name('Toro'), neo)
+
+        expected = self.expected.get_neo_by_designation('1685').approaches
+        self.assertEqual(len(neo.approaches), len(expected))
+        for approach in neo.approaches:
+            self.assertIs(approach.neo, neo)
+        self.assertEqual([a.time for a in neo.approaches], [a.time for a in expected])
+        self.assertIs(self.db._approaches[self.approaches.index(expected[0])], neo.approaches[0])
+
+    def test_opening_builds_no_objects(self):
+        db = NEODatabase.from_index(self.index_dir)
+        self.assertEqual((db._neos._objects, db._approaches._objects), ({}, {}))
+        self.assertEqual(db._approaches[-1].time, self.approaches[-1].time)
+        self.assertGreater(len(db._approaches._objects), 0)
+        with self.assertRaises(IndexError):
+            db._approaches[len(self.approaches)]
+
+    def test_statistics_match_the_object_database(self):
+        stats = NEODatabase.from_index(self.index_dir)._planner.stats
+        expected = self.expected._planner.stats
+        self.assertEqual((stats.row_count, stats.linked_rows, stats.hazardous_rows),
+                         (expected.row_count, expected.linked_rows, expected.hazardous_rows))
+        self.assertEqual(stats.histograms.keys(), expected.histograms.keys())
+        for filter_type, histogram in stats.histograms.items():
+            with self.subTest(filter_type=filter_type):
+                other = expected.histograms[filter_type]
+                self.assertEqual((histogram.total, histogram.low, histogram.high, histogram.width, histogram.counts),
+                                 (other.total, other.low, other.high, other.width, other.counts))
+        self.assertEqual([p.suffix for p in self.index_dir.iterdir() if p.name != MANIFEST_NAME],
+                         ['.bin'] * (len(list(self.index_dir.iterdir())) - 1))
+
+    def test_lookups_match_the_object_database(self):
+        for neo in self.neos[::97]:
+            self.assertEqual(self.db.get_neo_by_designation(neo.designation).designation, neo.designation)
+            if neo.name:
+                self.assertEqual(self.db.get_neo_by_name(neo.name).designation, neo.designation)
+
+    def test_missing_lookups_return_none(self):
+        self.assertIsNone(self.db.get_neo_by_designation('not a designation'))
+        self.assertIsNone(self.db.get_neo_by_name(''))
+        self.assertIsNone(self.db.get_neo_by_name('zzzz'))
+
+    def test_approach_of_unknown_neo_keeps_its_designation(self):
+        tmp = pathlib.Path(self.tmp.name)
+        (tmp / 'neos.csv').write_text('pdes,name,diameter,pha\n1,A,1.0,N\n')
+        (tmp / 'cad.json').write_text(json.dumps({
+            'fields': ['des', 'cd', 'dist', 'v_rel'],
+            'data': [['1', '2020-Jan-01 00:00', '0.1', '5'], ['X', '2020-Jan-02 00:00', '0.2', '6']],
+        }))
+        build_index(tmp / 'neos.csv', tmp / 'cad.json', tmp / 'orphans')
+        db = NEODatabase.from_index(tmp / 'orphans')
+
+        orphan = db._approaches[1]
+        self.assertIsNone(orphan.neo)
+        self.assertEqual(orphan._designation, 'X')
+        self.assertIs(db._approaches[0].neo, db.get_neo_by_designation('1'))
+
+    def test_rebuild_replaces_index(self):
+        index_dir = pathlib.Path(self.tmp.name) / 'rebuilt'
+        build_index(TEST_NEO_FILE, TEST_CAD_FILE, index_dir)
+        build_index(TEST_NEO_FILE, TEST_CAD_FILE, index_dir)
+        self.assertEqual(len(open_index(index_dir).neos), len(self.neos))
+        self.assertEqual([p.name for p in index_dir.parent.iterdir() if p.name.startswith('rebuilt.')], [])
+
+    def test_build_refuses_to_replace_other_directory(self):
+        with self.assertRaises(FileExistsError):
+            build_index(TEST_NEO_FILE, TEST_CAD_FILE, TESTS_ROOT)
+
+    def test_other_format_is_rejected(self):
+        index_dir = pathlib.Path(self.tmp.name) / 'old'
+        build_index(TEST_NEO_FILE, TEST_CAD_FILE, index_dir)
+        manifest = json.loads((index_dir / MANIFEST_NAME).read_text())
+        manifest['format'] = 0
+        (index_dir / MANIFEST_NAME).write_text(json.dumps(manifest))
+        with self.assertRaises(ValueError):
+            open_index(index_dir)
+
+
+class TestIndexQuery(test_query.TestQuery):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        index_dir = pathlib.Path(cls.tmp.name) / 'index'
+        build_index(TEST_NEO_FILE, TEST_CAD_FILE, index_dir)
+
+        cls.db = NEODatabase.from_index(index_dir)
+        cls.neos = cls.db._neos
+        cls.approaches = cls.db._approaches
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+"""Check that synthetic data files have the real schemas, load, and are reproducible.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_synthetic
+"""
+import csv
+import json
+import math
+import pathlib
+import tempfile
+import unittest
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+import synthetic
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class TestSynthetic(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.neo_path, cls.cad_path = synthetic.generate(cls.tmp.name, approaches=20000, seed=7)
+        cls.neos = load_neos(cls.neo_path)
+        cls.approaches = load_approaches(cls.cad_path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def test_schemas_match_the_real_files(self):
+        with open(TEST_NEO_FILE, newline='') as real, open(self.neo_path, newline='') as generated:
+            self.assertEqual(next(csv.reader(generated)), next(csv.reader(real)))
+        with open(TEST_CAD_FILE) as real, open(self.cad_path) as generated:
+            real, generated = json.load(real), json.load(generated)
+        self.assertEqual(generated.keys(), real.keys())
+        self.assertEqual(generated['fields'], real['fields'])
+        self.assertEqual(generated['signature'], real['signature'])
+        self.assertEqual(generated['count'], '20000')
+        self.assertTrue(all(len(row) == len(real['fields']) for row in generated['data']))
+
+    def test_sizes_and_linking(self):
+        self.assertEqual(len(self.approaches), 20000)
+        self.assertEqual(len(self.neos), 20000 // synthetic.APPROACHES_PER_NEO)
+        self.assertEqual(len({neo.designation for neo in self.neos}), len(self.neos))
+
+        db = NEODatabase(self.neos, self.approaches)
+        self.assertTrue(all(approach.neo != None for approach in self.approaches))
+        times = [approach.time for approach in self.approaches]
+        self.assertEqual(times, sorted(times))
+        counts = sorted(len(neo.approaches) for neo in self.neos)
+        self.assertGreater(counts[-1], 10 * counts[len(counts) // 2])
+        self.assertIsNotNone(db.get_neo_by_designation(self.neos[-1].designation))
+
+    def test_distributions_are_realistic(self):
+        count = len(self.neos)
+        named = sum(1 for neo in self.neos if neo.name) / count
+        measured = sum(1 for neo in self.neos if not math.isnan(neo.diameter)) / count
+        hazardous = sum(1 for neo in self.neos if neo.hazardous) / count
+        self.assertTrue(0.001 < named < 0.02)
+        self.assertTrue(0.015 < measured < 0.06)
+        self.assertTrue(0.05 < hazardous < 0.12)
+        self.assertTrue(all(0 <= approach.distance <= 0.5 and approach.velocity > 0 for approach in self.approaches))
+
+    def test_same_seed_writes_the_same_files(self):
+        with tempfile.TemporaryDirectory() as first, tempfile.TemporaryDirectory() as second:
+            paths = synthetic.generate(first, approaches=500, seed=1)
+            same = synthetic.generate(second, approaches=500, seed=1)
+            other = synthetic.generate(first + '/other', approaches=500, seed=2)
+            for path, same_path, other_path in zip(paths, same, other):
+                self.assertEqual(path.read_bytes(), same_path.read_bytes())
+                self.assertNotEqual(path.read_bytes(), other_path.read_bytes())
+
+
+if __name__ == '__main__':
+    unittest.main()
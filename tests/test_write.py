@@ -226,5 +226,26 @@ class TestWriteToJSON(unittest.TestCase):
         self.assertIsInstance(approach['neo']['potentially_hazardous'], bool)
 
 
+class TestWriteToJSONLayout(unittest.TestCase):
+    @staticmethod
+    @unittest.mock.patch('write.open')
+    def write(results, mock_file):
+        with UncloseableStringIO() as buf:
+            mock_file.return_value = buf
+            write_to_json(iter(results), None)
+            return buf.getvalue()
+
+    @staticmethod
+    def expected(results):
+        return json.dumps([{**approach.serialize(), 'neo': approach.neo.serialize()} for approach in results], indent=4)
+
+    def test_streamed_output_matches_json_dump(self):
+        results = build_results(5)
+        self.assertEqual(self.write(results), self.expected(results))
+
+    def test_streamed_output_of_no_results_matches_json_dump(self):
+        self.assertEqual(self.write(()), self.expected(()))
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -58,19 +58,20 @@ def write_to_json(results, filename):
     :param filename: A Path-like object pointing to where the data should be saved.
     """
 
-    writable_list = []
-    joined_dict = {}
-
-    for ca in results:
-        if isinstance(ca, CloseApproach):
-            joined_dict = ca.serialize()
-            joined_dict["neo"] = ca.neo.serialize()
-            writable_list.append(joined_dict)
-        #endif
-    #endfor
-
+    # Stream the array one element at a time, laid out exactly as `json.dump(..., indent=4)` would
+    # lay out the whole list, so memory doesn't grow with the number of results.
     with open(filename, "w") as json_file:
-        json.dump(writable_list, json_file, indent=4)
+        json_file.write("[")
+        empty = True
+        for ca in results:
+            if isinstance(ca, CloseApproach):
+                joined_dict = ca.serialize()
+                joined_dict["neo"] = ca.neo.serialize()
+                element = json.dumps(joined_dict, indent=4).replace("\n", "\n    ")
+                json_file.write(("\n    " if empty else ",\n    ") + element)
+                empty = False
+            #endif
+        #endfor
+        json_file.write("]" if empty else "\n]")
     #endwith
 #enddef
-